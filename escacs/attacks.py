@@ -0,0 +1,286 @@
+"""
+Precomputed attack tables.
+
+Moves of the non-sliding pieces only depend on the square they stand
+on, so they are computed once at import time for all 64 squares, both
+as bitboards and as sets of squares.
+
+Sliding pieces (bishops, rooks and queens) use magic bitboards: the
+blockers found on the relevant squares of a slider are multiplied by a
+per-square magic number, and the top bits of the product index a table
+with the resulting attacks. The tables of each square are filled the
+first time it is queried.
+
+"""
+from escacs.bitboard import BLACK
+from escacs.bitboard import FULL
+from escacs.bitboard import popcount
+from escacs.bitboard import to_squares
+from escacs.bitboard import WHITE
+from escacs.square import Square
+from escacs.square import SQUARES
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import random
+
+KNIGHT_DELTAS = ((1, 2), (1, -2), (2, 1), (2, -1), (-1, 2), (-1, -2), (-2, 1), (-2, -1))
+KING_DELTAS = ((1, 0), (1, 1), (1, -1), (0, -1), (0, 1), (-1, 0), (-1, 1), (-1, -1))
+ROOK_DELTAS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+BISHOP_DELTAS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _leaper_attacks(index: int, deltas: Sequence[Tuple[int, int]]) -> int:
+    col, row = index % 8, index // 8
+    mask = 0
+    for x, y in deltas:
+        c, r = col + x, row + y
+        if 0 <= c < 8 and 0 <= r < 8:
+            mask |= 1 << (r * 8 + c)
+    return mask
+
+
+def _pawn_pushes(index: int, color: int) -> int:
+    """Squares a pawn can advance to, double step included"""
+    direction = 1 if color == WHITE else -1
+    start_row = 1 if color == WHITE else 6
+    col, row = index % 8, index // 8
+    mask = 0
+    if 0 <= row + direction < 8:
+        mask |= 1 << ((row + direction) * 8 + col)
+    if row == start_row:
+        mask |= 1 << ((row + 2 * direction) * 8 + col)
+    return mask
+
+
+def _pawn_attacks(index: int, color: int) -> int:
+    direction = 1 if color == WHITE else -1
+    return _leaper_attacks(index, ((-1, direction), (1, direction)))
+
+
+KNIGHT_ATTACKS: List[int] = [_leaper_attacks(i, KNIGHT_DELTAS) for i in range(64)]
+KING_ATTACKS: List[int] = [_leaper_attacks(i, KING_DELTAS) for i in range(64)]
+# Indexed by color first, then by square
+PAWN_ATTACKS: List[List[int]] = [
+    [_pawn_attacks(i, color) for i in range(64)] for color in (WHITE, BLACK)
+]
+PAWN_PUSHES: List[List[int]] = [
+    [_pawn_pushes(i, color) for i in range(64)] for color in (WHITE, BLACK)
+]
+
+
+def _between(index: int) -> List[int]:
+    """Squares strictly between index and every other square, when they
+    share a row, column or diagonal. Empty otherwise.
+    """
+    col, row = index % 8, index // 8
+    between = [0] * 64
+    for x, y in ROOK_DELTAS + BISHOP_DELTAS:
+        c, r = col + x, row + y
+        mask = 0
+        while 0 <= c < 8 and 0 <= r < 8:
+            between[r * 8 + c] = mask
+            mask |= 1 << (r * 8 + c)
+            c, r = c + x, r + y
+    return between
+
+
+# Indexed by both squares, e.g: BETWEEN[a1][d4] is b2 and c3
+BETWEEN: List[List[int]] = [_between(i) for i in range(64)]
+
+
+def _paths(index: int) -> List[Tuple[Square, ...]]:
+    """Ordered squares from index to every other square, the latter
+    included, when they share a row, column or diagonal. Empty
+    otherwise.
+    """
+    col, row = index % 8, index // 8
+    paths: List[Tuple[Square, ...]] = [()] * 64
+    for x, y in ROOK_DELTAS + BISHOP_DELTAS:
+        c, r = col + x, row + y
+        path: Tuple[Square, ...] = ()
+        while 0 <= c < 8 and 0 <= r < 8:
+            path += (SQUARES[r * 8 + c],)
+            paths[r * 8 + c] = path
+            c, r = c + x, r + y
+    return paths
+
+
+# Same, as tuples of squares, e.g: PATHS[a1][d4] is b2, c3 and d4 and
+# BETWEEN_SQUARES[a1][d4] is b2 and c3
+PATHS: Tuple[Tuple[Tuple[Square, ...], ...], ...] = tuple(
+    tuple(_paths(i)) for i in range(64)
+)
+BETWEEN_SQUARES: Tuple[Tuple[Tuple[Square, ...], ...], ...] = tuple(
+    tuple(path[:-1] for path in paths) for paths in PATHS
+)
+
+KNIGHT_MOVES: Tuple[FrozenSet[Square], ...] = tuple(
+    to_squares(mask) for mask in KNIGHT_ATTACKS
+)
+KING_MOVES: Tuple[FrozenSet[Square], ...] = tuple(
+    to_squares(mask) for mask in KING_ATTACKS
+)
+PAWN_MOVES: Tuple[Tuple[FrozenSet[Square], ...], ...] = tuple(
+    tuple(to_squares(pushes | attacks) for pushes, attacks in zip(*tables))
+    for tables in zip(PAWN_PUSHES, PAWN_ATTACKS)
+)
+
+
+# Magic numbers found with _find_magic. Any number it returns is valid.
+# fmt: off
+ROOK_MAGICS: Tuple[int, ...] = (
+    0x9480048020400010, 0x0040100020004008, 0x0200084022001480, 0x02000410200A0040,
+    0x9100100800030004, 0x4080020004008001, 0x0480088002000100, 0x82000A0080204409,
+    0x4004802040088003, 0xE840400020005000, 0x4002802000100080, 0x040A00100A002242,
+    0x0084800800040080, 0x0CC8808002004400, 0x0004000408018210, 0x2A0200004C008112,
+    0x008006400A200140, 0x5000404010002000, 0x1050808010002006, 0x0100808008001006,
+    0x2680808004000800, 0x8001080104104020, 0x0040040088104102, 0x0A02220000804124,
+    0x38C0009180022040, 0x0040500040002008, 0x0010080020002400, 0x0802001200230840,
+    0x0100080100050011, 0x08A20022000810E4, 0x0460088400310210, 0x800000820018510C,
+    0x8080002001400040, 0x4010002000400044, 0x0002224082001200, 0xA008081001002102,
+    0x4108002004040040, 0x0524800400800200, 0x0040021084000108, 0x0000004082002401,
+    0x0400400080208000, 0x0020062250004000, 0x2100401082020020, 0x048020400A020010,
+    0x0000040008008080, 0x0802001004020009, 0x8010880110040002, 0x000200805102000C,
+    0x0000400480002480, 0x22C0008020004880, 0x0210200010088080, 0x8000680180100280,
+    0x0100800800040080, 0x4240020004008080, 0x0019004200444100, 0x80800300846C0200,
+    0x104B034020328001, 0x0201060040221086, 0x0209E2804012002A, 0x0001002004100209,
+    0x000A002008041002, 0x0001000802040001, 0x4400024091100804, 0x8000040033014182,
+)
+
+BISHOP_MAGICS: Tuple[int, ...] = (
+    0x0011343002820010, 0x5002020841010010, 0x8110294200200A00, 0x8008204C40001080,
+    0x0404042010002080, 0x41420E0621004400, 0x000A06100A480004, 0x0002028044108408,
+    0x0088949002880702, 0x1128047004304880, 0x0800900400404820, 0x6900080A00280004,
+    0x0020141045080058, 0x0020108220200200, 0x0120040128084400, 0x1000420101019000,
+    0x0042000810011229, 0x1084000204880A00, 0x60100082041110A0, 0x0006000422020081,
+    0x1002100401200020, 0x2180200410080800, 0x0014003120B80404, 0xB004804042180140,
+    0x021010400A60010A, 0xC121200404081220, 0x40008200100C0010, 0x2002040042010A00,
+    0x0001080501004001, 0x0010008007008080, 0x1402140000A40100, 0x0005004002022890,
+    0x10D0021000214440, 0x000A080232210A21, 0x0201004120080801, 0xB420A00800490104,
+    0x0921010104040040, 0x0010100020044402, 0x2A10490050011402, 0x400222A100120440,
+    0x2002411008204003, 0x0002091082010808, 0x95420022110A0800, 0x0488094010401200,
+    0x0002400102100900, 0x0061010512020300, 0x4004C10825000205, 0x0408312400200888,
+    0x0111011002222004, 0x0020A2081A089104, 0x4001003084101180, 0x0000448042020002,
+    0x0040014008288400, 0x108210201800C81C, 0x8042040112020400, 0x12100401084A0020,
+    0x0002010120822000, 0x2020002088081940, 0x0C02040041044104, 0x0480018480421206,
+    0x0002880204050408, 0x1081402005013200, 0x3004608404080260, 0x8224103030470440,
+)
+# fmt: on
+
+
+def _sliding_attacks(
+    index: int, occupied: int, deltas: Sequence[Tuple[int, int]]
+) -> int:
+    """Walks every ray from index until the board edge or the first
+    blocker (included).
+    """
+    col, row = index % 8, index // 8
+    mask = 0
+    for x, y in deltas:
+        c, r = col + x, row + y
+        while 0 <= c < 8 and 0 <= r < 8:
+            square = 1 << (r * 8 + c)
+            mask |= square
+            if occupied & square:
+                break
+            c, r = c + x, r + y
+    return mask
+
+
+def _relevant_mask(index: int, deltas: Sequence[Tuple[int, int]]) -> int:
+    """Squares whose occupancy can change the attacks of a slider: its
+    rays without the last square, which is attacked either way.
+    """
+    col, row = index % 8, index // 8
+    mask = 0
+    for x, y in deltas:
+        c, r = col + x, row + y
+        while 0 <= c + x < 8 and 0 <= r + y < 8:
+            mask |= 1 << (r * 8 + c)
+            c, r = c + x, r + y
+    return mask
+
+
+def _subsets(mask: int) -> Iterator[int]:
+    """Yields all subsets of mask (Carry-Rippler trick)"""
+    subset = 0
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if not subset:
+            return
+
+
+def _find_magic(index: int, deltas: Sequence[Tuple[int, int]], seed: int = 0) -> int:
+    """Looks for a magic number that maps every blockers configuration
+    of a square to a table entry without destructive collisions.
+    """
+    rand = random.Random(seed)
+    mask = _relevant_mask(index, deltas)
+    shift = 64 - popcount(mask)
+    blockers = list(_subsets(mask))
+    attacks = [_sliding_attacks(index, occupied, deltas) for occupied in blockers]
+    while True:
+        magic = rand.getrandbits(64) & rand.getrandbits(64) & rand.getrandbits(64)
+        if popcount(((mask * magic) & FULL) >> 56) < 6:
+            continue
+        table: Dict[int, int] = {}
+        for occupied, attack in zip(blockers, attacks):
+            key = ((occupied * magic) & FULL) >> shift
+            if table.setdefault(key, attack) != attack:
+                break
+        else:
+            return magic
+
+
+class _MagicTable:
+    """Attacks of a sliding piece, for every square and blockers"""
+
+    def __init__(self, deltas: Sequence[Tuple[int, int]], magics: Sequence[int]):
+        self.deltas = deltas
+        self.magics = magics
+        self.masks = [_relevant_mask(index, deltas) for index in range(64)]
+        self.shifts = [64 - popcount(mask) for mask in self.masks]
+        self.tables: List[Optional[List[int]]] = [None] * 64
+
+    def _build(self, index: int) -> List[int]:
+        magic, shift = self.magics[index], self.shifts[index]
+        table = [0] * (1 << (64 - shift))
+        for occupied in _subsets(self.masks[index]):
+            key = ((occupied * magic) & FULL) >> shift
+            table[key] = _sliding_attacks(index, occupied, self.deltas)
+        self.tables[index] = table
+        return table
+
+    def __call__(self, index: int, occupied: int) -> int:
+        table = self.tables[index]
+        if table is None:
+            table = self._build(index)
+        key = ((occupied & self.masks[index]) * self.magics[index]) & FULL
+        return table[key >> self.shifts[index]]
+
+
+rook_attacks = _MagicTable(ROOK_DELTAS, ROOK_MAGICS)
+bishop_attacks = _MagicTable(BISHOP_DELTAS, BISHOP_MAGICS)
+
+
+def queen_attacks(index: int, occupied: int) -> int:
+    return rook_attacks(index, occupied) | bishop_attacks(index, occupied)
+
+
+# Moves of the sliding pieces on an empty board
+ROOK_MOVES: Tuple[FrozenSet[Square], ...] = tuple(
+    to_squares(_sliding_attacks(i, 0, ROOK_DELTAS)) for i in range(64)
+)
+BISHOP_MOVES: Tuple[FrozenSet[Square], ...] = tuple(
+    to_squares(_sliding_attacks(i, 0, BISHOP_DELTAS)) for i in range(64)
+)
+QUEEN_MOVES: Tuple[FrozenSet[Square], ...] = tuple(
+    rook | bishop for rook, bishop in zip(ROOK_MOVES, BISHOP_MOVES)
+)
@@ -0,0 +1,375 @@
+"""
+Batch analysis of positions, with NumPy.
+
+Positions are turned into arrays, one row per position, and analysed
+all at once with vectorized operations instead of one Game at a time:
+
+- bitboards: (N, 12) uint64, the piece bitboards of every position (see
+  escacs.bitboard.piece_index).
+- planes: (N, 12, 64) uint8, the same bitboards unpacked, one 0/1
+  entry per square.
+
+features computes, for both colors of every position:
+
+- material: points of the pieces (see Piece.points).
+- mobility: number of moves of the pieces, leaving aside whether they
+  leave their king in check. Castling and en passant are not counted,
+  and promotions count once.
+- attacks: number of pieces attacking every square.
+
+Sliding pieces are handled with Kogge-Stone fills, one direction at a
+time: in a given direction, a square is attacked by one piece at most,
+so attack counts are sums of bitboards.
+
+    >>> result = features(["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"])
+    >>> result.mobility
+    array([[20, 20]], dtype=int32)
+
+Positions can be given as FEN strings, games, an array of bitboards or
+positions packed with escacs.encoding.encode_positions, the fastest.
+
+Requires NumPy (pip install escacs[numpy]).
+
+"""
+from escacs.bitboard import BISHOP
+from escacs.bitboard import BLACK
+from escacs.bitboard import FILE_A
+from escacs.bitboard import FILE_H
+from escacs.bitboard import KING
+from escacs.bitboard import KNIGHT
+from escacs.bitboard import PAWN
+from escacs.bitboard import QUEEN
+from escacs.bitboard import RANK_3
+from escacs.bitboard import RANK_6
+from escacs.bitboard import ROOK
+from escacs.bitboard import WHITE
+from escacs.board import iter_placement
+from escacs.encoding import POSITION_SIZE
+from escacs.exceptions import InvalidEncoding
+from escacs.exceptions import InvalidFen
+from escacs.game import CASTLING_FLAGS
+from escacs.game import Game
+from escacs.movegen import valid_castling
+from escacs.movegen import valid_ep_square
+from escacs.pieces import PIECE_CLASSES
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+
+# Layout of escacs.encoding packed positions
+_POSITION = np.dtype(
+    [
+        ("occupied", "<u8"),
+        ("pieces", "u1", 16),
+        ("flags", "u1"),
+        ("ep", "u1"),
+        ("halfmove_clock", "<u2"),
+        ("fullmove_number", "<u2"),
+        ("padding", "V2"),
+    ]
+)
+assert _POSITION.itemsize == POSITION_SIZE
+
+_POINTS = np.array([klass.points for klass in PIECE_CLASSES], dtype=np.int32)
+
+_FULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+_NOT_A = np.uint64(~FILE_A & 0xFFFFFFFFFFFFFFFF)
+_NOT_H = np.uint64(~FILE_H & 0xFFFFFFFFFFFFFFFF)
+_NOT_AB = np.uint64(~(FILE_A | FILE_A << 1) & 0xFFFFFFFFFFFFFFFF)
+_NOT_GH = np.uint64(~(FILE_H | FILE_H >> 1) & 0xFFFFFFFFFFFFFFFF)
+_RANK_3 = np.uint64(RANK_3)
+_RANK_6 = np.uint64(RANK_6)
+
+# Shifts of every direction, with the squares the pieces can land on
+# (the ones they would wrap around the board edge to excluded)
+_ROOK_DIRECTIONS = ((8, _FULL), (-8, _FULL), (1, _NOT_A), (-1, _NOT_H))
+_BISHOP_DIRECTIONS = ((9, _NOT_A), (7, _NOT_H), (-7, _NOT_A), (-9, _NOT_H))
+_KNIGHT_DIRECTIONS = (
+    (17, _NOT_A),
+    (15, _NOT_H),
+    (10, _NOT_AB),
+    (6, _NOT_GH),
+    (-6, _NOT_AB),
+    (-10, _NOT_GH),
+    (-15, _NOT_A),
+    (-17, _NOT_H),
+)
+
+Positions = Union["PositionArrays", np.ndarray, bytes, Iterable[Union[str, Game]]]
+
+
+class PositionArrays(NamedTuple):
+    """
+    Positions as arrays, one row per position.
+
+    Attributes
+    ----------
+    bitboards: ndarray
+        (N, 12) uint64, piece bitboards.
+    turn: ndarray
+        (N,) uint8, side to move: 0 for white, 1 for black.
+    castling: ndarray
+        (N,) uint8, castling rights bitmask (see escacs.movegen).
+    ep: ndarray
+        (N,) int8, en passant square index, -1 if none.
+
+    """
+
+    bitboards: np.ndarray
+    turn: np.ndarray
+    castling: np.ndarray
+    ep: np.ndarray
+
+
+class Features(NamedTuple):
+    """
+    Features of a batch of positions, for white then black.
+
+    Attributes
+    ----------
+    material: ndarray
+        (N, 2) int32, points of the pieces of each color.
+    mobility: ndarray
+        (N, 2) int32, number of moves of the pieces of each color.
+    attacks: ndarray
+        (N, 2, 64) uint8, number of pieces of each color attacking
+        every square.
+
+    """
+
+    material: np.ndarray
+    mobility: np.ndarray
+    attacks: np.ndarray
+
+
+def _parse_fen(fen: str) -> Tuple[List[int], int, int, int]:
+    """Bitboards, turn, castling rights and en passant square of a FEN,
+    without building a game.
+    """
+    fields = fen.split()
+    if len(fields) not in (4, 6) or fields[1] not in ("w", "b"):
+        raise InvalidFen(fen)
+    bitboards = [0] * 12
+    for char, index in iter_placement(fields[0]):
+        bitboards["PNBRQKpnbrqk".index(char)] |= 1 << index
+    turn = WHITE if fields[1] == "w" else BLACK
+    castling = 0
+    if fields[2] != "-":
+        for flag in fields[2]:
+            if flag not in CASTLING_FLAGS:
+                raise InvalidFen(fen)
+            castling |= 1 << CASTLING_FLAGS.index(flag)
+    castling = valid_castling(bitboards, castling)
+    ep = -1
+    if fields[3] != "-":
+        name = fields[3]
+        if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "36":
+            raise InvalidFen(fen)
+        index = (ord(name[1]) - 49) * 8 + ord(name[0]) - 97
+        # Only kept when a pawn can capture en passant, as Game does
+        if valid_ep_square(bitboards, index, turn):
+            ep = index
+    return bitboards, turn, castling, ep
+
+
+def game_row(game: Game) -> Tuple[List[int], int, int, int]:
+    """Bitboards, turn, castling rights and en passant square of a game"""
+    ep_square = game.ep_square
+    return (
+        list(game.board._bitboards),
+        WHITE if game.turn == "white" else BLACK,
+        game.castling,
+        ep_square.index if ep_square is not None else -1,
+    )
+
+
+def _from_packed(data: bytes) -> PositionArrays:
+    """Unpacks positions packed with escacs.encoding.encode_positions"""
+    if len(data) % POSITION_SIZE:
+        raise InvalidEncoding(data)
+    records = np.frombuffer(data, dtype=_POSITION)
+    occupied = np.unpackbits(
+        np.ascontiguousarray(records["occupied"]).view(np.uint8).reshape(-1, 8),
+        axis=1,
+        bitorder="little",
+    )
+    nibbles = np.empty((len(records), 32), dtype=np.uint8)
+    nibbles[:, ::2] = records["pieces"] & 15
+    nibbles[:, 1::2] = records["pieces"] >> 4
+    # Pieces are stored in square order: the nth occupied square holds
+    # the nth nibble
+    order = np.cumsum(occupied, axis=1, dtype=np.int64) - 1
+    codes = np.take_along_axis(nibbles, np.clip(order, 0, 31), axis=1)
+    if (order[:, -1] > 31).any() or (codes[occupied == 1] > 11).any():
+        raise InvalidEncoding(data)
+    planes = (codes[:, None, :] == np.arange(12, dtype=np.uint8)[None, :, None]) & (
+        occupied[:, None, :] == 1
+    )
+    ep = records["ep"].astype(np.int8)
+    ep[records["ep"] == 255] = -1
+    return PositionArrays(
+        from_planes(planes.astype(np.uint8)),
+        records["flags"] & 1,
+        records["flags"] >> 1,
+        ep,
+    )
+
+
+def to_arrays(positions: Positions) -> PositionArrays:
+    """Turns positions into arrays. Positions can be PositionArrays, an
+    (N, 12) array of bitboards (white to move, no castling rights nor en
+    passant square), packed positions (see escacs.encoding) or an
+    iterable of FEN strings and games.
+    """
+    if isinstance(positions, PositionArrays):
+        return positions
+    if isinstance(positions, np.ndarray):
+        if positions.ndim != 2 or positions.shape[1] != 12:
+            raise ValueError(f"expected (N, 12) bitboards, got {positions.shape}")
+        size = len(positions)
+        return PositionArrays(
+            positions.astype(np.uint64),
+            np.zeros(size, dtype=np.uint8),
+            np.zeros(size, dtype=np.uint8),
+            np.full(size, -1, dtype=np.int8),
+        )
+    if isinstance(positions, (bytes, bytearray, memoryview)):
+        return _from_packed(bytes(positions))
+
+    bitboards: List[List[int]] = []
+    turns: List[int] = []
+    castlings: List[int] = []
+    eps: List[int] = []
+    for position in positions:
+        if isinstance(position, str):
+            boards, turn, castling, ep = _parse_fen(position)
+        else:
+            boards, turn, castling, ep = game_row(position)
+        bitboards.append(boards)
+        turns.append(turn)
+        castlings.append(castling)
+        eps.append(ep)
+    return PositionArrays(
+        np.array(bitboards, dtype=np.uint64).reshape(-1, 12),
+        np.array(turns, dtype=np.uint8),
+        np.array(castlings, dtype=np.uint8),
+        np.array(eps, dtype=np.int8),
+    )
+
+
+def planes(bitboards: np.ndarray) -> np.ndarray:
+    """Unpacks (N, 12) bitboards into (N, 12, 64) 0/1 planes, square
+    a1 first.
+    """
+    data = np.ascontiguousarray(bitboards, dtype="<u8")
+    return np.unpackbits(data.view(np.uint8), axis=-1, bitorder="little").reshape(
+        data.shape + (64,)
+    )
+
+
+def from_planes(planes: np.ndarray) -> np.ndarray:
+    """Packs (N, 12, 64) 0/1 planes back into (N, 12) bitboards"""
+    packed = np.packbits(planes.astype(bool), axis=-1, bitorder="little")
+    return packed.view("<u8").reshape(planes.shape[:-1]).astype(np.uint64)
+
+
+def _shift(bitboard: np.ndarray, shift: int) -> np.ndarray:
+    if shift > 0:
+        return np.left_shift(bitboard, np.uint64(shift))
+    return np.right_shift(bitboard, np.uint64(-shift))
+
+
+def _slide(sliders: np.ndarray, empty: np.ndarray, shift: int, mask: np.uint64):
+    """Attacks of sliding pieces in one direction (Kogge-Stone fill)"""
+    propagator = empty & mask
+    sliders = sliders | (propagator & _shift(sliders, shift))
+    propagator = propagator & _shift(propagator, shift)
+    sliders = sliders | (propagator & _shift(sliders, 2 * shift))
+    propagator = propagator & _shift(propagator, 2 * shift)
+    sliders = sliders | (propagator & _shift(sliders, 4 * shift))
+    return _shift(sliders, shift) & mask
+
+
+def _popcount(bitboard: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitboard).astype(np.int32)
+    data = np.ascontiguousarray(bitboard, dtype="<u8").view(np.uint8)
+    return (
+        np.unpackbits(data.reshape(bitboard.shape + (8,)), axis=-1)
+        .sum(axis=-1)
+        .astype(np.int32)
+    )
+
+
+def _attack_sets(
+    bitboards: np.ndarray, color: int, empty: np.ndarray
+) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Attacks of the pieces of a color, split so that every square is
+    attacked at most once in each set: the ones of the pawns and the
+    ones of the other pieces.
+    """
+    base = color * 6
+    pawns = bitboards[:, base + PAWN]
+    if color == WHITE:
+        pawn_sets = [_shift(pawns, 7) & _NOT_H, _shift(pawns, 9) & _NOT_A]
+    else:
+        pawn_sets = [_shift(pawns, -9) & _NOT_H, _shift(pawns, -7) & _NOT_A]
+    knights = bitboards[:, base + KNIGHT]
+    king = bitboards[:, base + KING]
+    queens = bitboards[:, base + QUEEN]
+    rooks = bitboards[:, base + ROOK] | queens
+    bishops = bitboards[:, base + BISHOP] | queens
+    piece_sets = [_shift(knights, shift) & mask for shift, mask in _KNIGHT_DIRECTIONS]
+    for directions, sliders in (
+        (_ROOK_DIRECTIONS, rooks),
+        (_BISHOP_DIRECTIONS, bishops),
+    ):
+        for shift, mask in directions:
+            piece_sets.append(_slide(sliders, empty, shift, mask))
+            piece_sets.append(_shift(king, shift) & mask)
+    return pawn_sets, piece_sets
+
+
+def features(positions: Positions) -> Features:
+    """Computes the material, mobility and attack counts of both colors
+    of a batch of positions (see to_arrays).
+    """
+    bitboards = to_arrays(positions).bitboards
+    size = len(bitboards)
+    material = (_popcount(bitboards).reshape(size, 2, 6) * _POINTS).sum(
+        axis=2, dtype=np.int32
+    )
+    occupancy = [
+        np.bitwise_or.reduce(bitboards[:, color * 6 : color * 6 + 6], axis=1)  # noqa
+        for color in (WHITE, BLACK)
+    ]
+    occupied = occupancy[WHITE] | occupancy[BLACK]
+    empty = ~occupied
+
+    mobility = np.zeros((size, 2), dtype=np.int32)
+    attacks = np.zeros((size, 2, 64), dtype=np.uint8)
+    for color in (WHITE, BLACK):
+        own = occupancy[color]
+        theirs = occupancy[color ^ 1]
+        pawn_sets, piece_sets = _attack_sets(bitboards, color, empty)
+        for attacked in pawn_sets + piece_sets:
+            attacks[:, color] += planes(attacked)
+        for attacked in pawn_sets:
+            mobility[:, color] += _popcount(attacked & theirs)
+        for attacked in piece_sets:
+            mobility[:, color] += _popcount(attacked & ~own)
+
+        # Pawn pushes
+        pawns = bitboards[:, color * 6 + PAWN]
+        if color == WHITE:
+            single = _shift(pawns, 8) & empty
+            double = _shift(single & _RANK_3, 8) & empty
+        else:
+            single = _shift(pawns, -8) & empty
+            double = _shift(single & _RANK_6, -8) & empty
+        mobility[:, color] += _popcount(single) + _popcount(double)
+    return Features(material, mobility, attacks)
@@ -0,0 +1,72 @@
+"""
+Helpers to work with bitboards.
+
+A bitboard is a 64-bit integer where every bit stands for a square of
+the board: bit 0 is a1, bit 7 is h1, bit 8 is a2 and bit 63 is h8. That
+is, the bit index of a square is ``row * 8 + col``.
+
+"""
+from escacs.square import Square
+from escacs.square import SQUARES
+from typing import FrozenSet
+from typing import Iterator
+
+WHITE = 0
+BLACK = 1
+COLORS = ("white", "black")
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+PIECE_ABBRS = "PNBRQK"
+
+EMPTY = 0
+FULL = 0xFFFFFFFFFFFFFFFF
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+DARK_SQUARES = 0xAA55AA55AA55AA55
+LIGHT_SQUARES = ~DARK_SQUARES & FULL
+
+
+def color_index(color: str) -> int:
+    return BLACK if color == "black" else WHITE
+
+
+def piece_index(kind: int, color: int) -> int:
+    """Index of the bitboard holding the pieces of a given kind and
+    color: white pieces first (0-5), then black ones (6-11).
+    """
+    return color * 6 + kind
+
+
+def bit(index: int) -> int:
+    return 1 << index
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def lsb(mask: int) -> int:
+    """Index of the least significant bit set. Mask must not be empty."""
+    return (mask & -mask).bit_length() - 1
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yields the indexes of the bits set in mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def to_squares(mask: int) -> FrozenSet[Square]:
+    """Converts a bitboard into the set of squares it has set"""
+    return frozenset([SQUARES[index] for index in iter_bits(mask)])
@@ -1,25 +1,109 @@
-from copy import copy
+from escacs import movegen
+from escacs.attacks import BETWEEN_SQUARES
+from escacs.attacks import PATHS
+from escacs.bitboard import BLACK
+from escacs.bitboard import color_index
+from escacs.bitboard import COLORS
+from escacs.bitboard import iter_bits
+from escacs.bitboard import KING
+from escacs.bitboard import lsb
+from escacs.bitboard import PIECE_ABBRS
+from escacs.bitboard import piece_index
+from escacs.bitboard import popcount
+from escacs.bitboard import WHITE
+from escacs.evaluation import PIECE_SQUARE_TABLES
+from escacs.exceptions import InvalidFen
 from escacs.exceptions import PieceNotFound
 from escacs.pieces import Piece
+from escacs.pieces import PIECE_CLASSES
 from escacs.square import Square
+from escacs.square import SQUARES
 from escacs.types import Coordinate
 from escacs.utils import get_square
+from escacs.zobrist import PIECE_KEYS
+from typing import Callable
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 _none = object()
 
+STARTING_BOARD_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
+
+# Piece class, color and bitboard index, by FEN character
+_FEN_PIECES: Dict[str, Tuple[Callable[..., Piece], str, int]] = {
+    (abbr if color == WHITE else abbr.lower()): (
+        klass,
+        COLORS[color],
+        piece_index(kind, color),
+    )
+    for kind, (abbr, klass) in enumerate(zip(PIECE_ABBRS, PIECE_CLASSES))
+    for color in (WHITE, BLACK)
+}
+
+
+def iter_placement(fen: str) -> Iterator[Tuple[str, int]]:
+    """Yields the FEN character and square index of each piece of the
+    piece placement field of a FEN string, from a8 to h1. Raises
+    InvalidFen unless it describes 8 ranks of 8 squares.
+    """
+    row, col = 7, 0
+    for char in fen:
+        if char == "/":
+            if col != 8 or not row:
+                raise InvalidFen(fen)
+            row -= 1
+            col = 0
+        elif "1" <= char <= "8":
+            col += ord(char) - 48
+        else:
+            if char not in _FEN_PIECES or col > 7:
+                raise InvalidFen(fen)
+            yield char, row * 8 + col
+            col += 1
+    if row or col != 8:
+        raise InvalidFen(fen)
+
 
 class Board:
     """
     Stores the position of the pieces along the game.
 
+    The position itself is kept in bitboards (see escacs.bitboard):
+    one 64-bit integer per piece type and color plus the occupancy of
+    each color. Next to them, a flat list keeps the piece objects, so
+    that the board can be queried square by square.
+
+    Bitboards double as per color and type piece sets: finding the
+    king or iterating over the pieces (see king, pieces and items)
+    costs as much as the number of pieces, not the size of the board.
+
+    The piece objects still make a Board weigh kilobytes. Positions
+    only fit in about a hundred bytes once packed by escacs.encoding
+    (POSITION_SIZE bytes each), which is what code keeping many of them
+    around should store.
+
     Attributes
     ----------
-    _board: dict
-        dictionary which has the squares of a chess board as keys and
-        the pieces of the chess as values.
+    _pieces: list
+        64 entries (one per square, a1 first) with the piece placed on
+        each square, if any.
+    _bitboards: list
+        twelve bitboards, one per piece type and color. See
+        escacs.bitboard.piece_index.
+    _occupied: list
+        occupancy bitboards of the white and black pieces.
+    zobrist: int
+        Zobrist key of the pieces on the board (see escacs.zobrist),
+        updated as pieces are placed and removed.
+    _material: list
+        points (see Piece.points) of the white and black pieces on the
+        board.
+    _psqt: list
+        piece-square tables bonus of the white and black pieces (see
+        escacs.evaluation).
 
     """
 
@@ -27,42 +111,155 @@ class Board:
         self.clear()
 
     def clear(self):
-        self._board: Dict[Square, Optional[Piece]] = {
-            Square(col=col, row=row): None for col in range(8) for row in range(8)
-        }
+        self._pieces: List[Optional[Piece]] = [None] * 64
+        self._bitboards: List[int] = [0] * 12
+        self._occupied: List[int] = [0, 0]
+        self.zobrist: int = 0
+        self._material: List[int] = [0, 0]
+        self._psqt: List[int] = [0, 0]
 
     def __getitem__(self, pos: Coordinate) -> Optional[Piece]:
-        return self._board[get_square(pos)]
+        return self._pieces[get_square(pos).index]
 
     def __setitem__(self, pos: Coordinate, piece: Optional[Piece]) -> None:
         sq = get_square(pos)
+        self._remove(sq.index)
         if piece:
             piece.board = self
             piece.move(sq)
-        self._board[sq] = piece
+            self._put(sq.index, piece)
 
     get_piece = __getitem__
     place_piece = __setitem__
 
-    def path(self, _from: Coordinate, _to: Coordinate) -> List[Square]:
-        """Returns the ordered list of squares that conform the shortest path
-        between 2 board coordinates.
+    def _put(self, index: int, piece: Piece) -> None:
+        """Places piece on an empty square, given by its bit index"""
+        self._pieces[index] = piece
+        if not isinstance(piece, Piece):
+            # Not a chess piece (e.g: a test double). Nothing to track.
+            return
+        mask = 1 << index
+        color = color_index(piece.color)
+        i = piece_index(piece.kind, color)
+        self._bitboards[i] |= mask
+        self._occupied[color] |= mask
+        self.zobrist ^= PIECE_KEYS[i][index]
+        self._material[color] += piece.points
+        self._psqt[color] += PIECE_SQUARE_TABLES[i][index]
+
+    def _remove(self, index: int) -> Optional[Piece]:
+        """Removes the piece found on a square, given by its bit index,
+        and returns it.
         """
-        src: Square = get_square(_from)
-        dst: Square = get_square(_to)
-        path = []
-        while src != dst:
-            for attr in ("row", "col"):
-                srcx = getattr(src, attr)
-                dstx = getattr(dst, attr)
-                if srcx == dstx:
+        piece = self._pieces[index]
+        if piece is None:
+            return None
+        self._pieces[index] = None
+        if not isinstance(piece, Piece):
+            return piece
+        mask = ~(1 << index)
+        color = color_index(piece.color)
+        i = piece_index(piece.kind, color)
+        self._bitboards[i] &= mask
+        self._occupied[color] &= mask
+        self.zobrist ^= PIECE_KEYS[i][index]
+        self._material[color] -= piece.points
+        self._psqt[color] -= PIECE_SQUARE_TABLES[i][index]
+        return piece
+
+    @property
+    def occupied(self) -> int:
+        """Bitboard with all occupied squares"""
+        return self._occupied[WHITE] | self._occupied[BLACK]
+
+    def occupancy(self, color: str) -> int:
+        """Bitboard with the squares occupied by color pieces"""
+        return self._occupied[color_index(color)]
+
+    def bitboard(self, kind: int, color: str) -> int:
+        """Bitboard with the squares occupied by the pieces of a given
+        kind and color.
+        """
+        return self._bitboards[piece_index(kind, color_index(color))]
+
+    def set_fen(self, fen: str) -> None:
+        """Sets up the board from the piece placement field of a FEN
+        string (e.g: rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR), in a
+        single pass.
+        """
+        pieces: List[Optional[Piece]] = [None] * 64
+        bitboards = [0] * 12
+        zobrist = 0
+        material = [0, 0]
+        psqt = [0, 0]
+        for char, index in iter_placement(fen):
+            klass, color, i = _FEN_PIECES[char]
+            piece = pieces[index] = klass(color, board=self, pos=SQUARES[index])
+            bitboards[i] |= 1 << index
+            zobrist ^= PIECE_KEYS[i][index]
+            material[i >= 6] += piece.points
+            psqt[i >= 6] += PIECE_SQUARE_TABLES[i][index]
+
+        self._pieces = pieces
+        self._bitboards = bitboards
+        self._occupied = [
+            bitboards[0]
+            | bitboards[1]
+            | bitboards[2]
+            | bitboards[3]
+            | bitboards[4]
+            | bitboards[5],
+            bitboards[6]
+            | bitboards[7]
+            | bitboards[8]
+            | bitboards[9]
+            | bitboards[10]
+            | bitboards[11],
+        ]
+        self.zobrist = zobrist
+        self._material = material
+        self._psqt = psqt
+
+    def fen(self) -> str:
+        """Returns the piece placement field of the FEN string of the
+        board.
+        """
+        rows = []
+        pieces = self._pieces
+        for start in range(56, -1, -8):
+            row = ""
+            empty = 0
+            end = start + 8
+            for piece in pieces[start:end]:
+                if piece is None:
+                    empty += 1
                     continue
-                if srcx > dstx:
-                    setattr(src, attr, srcx - 1)
-                else:
-                    setattr(src, attr, srcx + 1)
-            path.append(copy(src))
-        return path
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += piece.abbr if piece.color == "white" else piece.abbr.lower()
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        return "/".join(rows)
+
+    def material(self, color: str) -> int:
+        """Points of the color pieces on the board"""
+        return self._material[color_index(color)]
+
+    def path(self, _from: Coordinate, _to: Coordinate) -> List[Square]:
+        """Returns the ordered list of squares that conform the path
+        between 2 board coordinates, the destination included. Empty if
+        they do not share a row, column or diagonal.
+        """
+        return list(PATHS[get_square(_from).index][get_square(_to).index])
+
+    def between(self, _from: Coordinate, _to: Coordinate) -> Tuple[Square, ...]:
+        """Returns the ordered squares strictly between 2 board
+        coordinates, the ones a sliding piece goes through. Empty if
+        they do not share a row, column or diagonal.
+        """
+        return BETWEEN_SQUARES[get_square(_from).index][get_square(_to).index]
 
     def move_piece(self, _from: Coordinate, _to: Coordinate):
         """Moves whichever piece is found in _from to _to positions. If no
@@ -73,19 +270,63 @@ class Board:
         """
         src: Square = get_square(_from)
         dst: Square = get_square(_to)
-        piece: Optional[Piece] = self[src]
+        piece: Optional[Piece] = self._remove(src.index)
         if not piece:
             # No piece found
             return
 
-        self[src] = None
-        self[dst] = piece
+        self._remove(dst.index)
+        self._put(dst.index, piece)
         piece.move(dst)
 
     def get_square(self, piece: Piece) -> Square:
-        for square, p in self._board.items():
-            if not p:
-                continue
-            if p == piece:
+        if isinstance(piece, Piece):
+            # Pieces know their square: just check they are there
+            square = piece.pos
+            if self._pieces[square.index] is piece:
                 return square
+            raise PieceNotFound(piece)
+        for index, p in enumerate(self._pieces):
+            if p is not None and p == piece:
+                return SQUARES[index]
         raise PieceNotFound(piece)
+
+    def pieces(self, kind: int, color: str) -> List[Piece]:
+        """Pieces of a given kind and color on the board"""
+        bitboard = self._bitboards[piece_index(kind, color_index(color))]
+        return [self._pieces[index] for index in iter_bits(bitboard)]  # type: ignore
+
+    def squares(self, kind: int, color: str) -> List[Square]:
+        """Squares occupied by the pieces of a given kind and color"""
+        bitboard = self._bitboards[piece_index(kind, color_index(color))]
+        return [SQUARES[index] for index in iter_bits(bitboard)]
+
+    def count(self, kind: int, color: str) -> int:
+        return popcount(self._bitboards[piece_index(kind, color_index(color))])
+
+    def attackers(self, pos: Coordinate, color: str) -> List[Square]:
+        """Squares of the color pieces that attack a square"""
+        bitboard = movegen.attackers(
+            self._bitboards,
+            get_square(pos).index,
+            color_index(color),
+            self._occupied[WHITE] | self._occupied[BLACK],
+        )
+        return [SQUARES[index] for index in iter_bits(bitboard)]
+
+    def king(self, color: str) -> Optional[Square]:
+        """Square of the color king, if it is on the board"""
+        kings = self._bitboards[piece_index(KING, color_index(color))]
+        return SQUARES[lsb(kings)] if kings else None
+
+    def items(self, color: Optional[str] = None) -> Iterator[Tuple[Square, Piece]]:
+        """Iterates over the (square, piece) pairs of the pieces on the
+        board, of a single color if given.
+        """
+        if color is None:
+            occupied = self._occupied[WHITE] | self._occupied[BLACK]
+        else:
+            occupied = self._occupied[color_index(color)]
+        pieces = self._pieces
+        for index in iter_bits(occupied):
+            yield SQUARES[index], pieces[index]  # type: ignore
@@ -0,0 +1,191 @@
+"""
+Compact binary encoding of moves, positions and games.
+
+Moves are encoded in 16 bits: their move code (see escacs.move.Move),
+which holds the from square, the to square and the promotion piece.
+Castling and en passant need no flag, as they follow from the position.
+
+Positions are packed in POSITION_SIZE (32) bytes, little-endian:
+
+- 8 bytes: occupancy bitboard.
+- 16 bytes: a nibble per occupied square, from a1 to h8, with the
+  bitboard index of its piece (see escacs.bitboard.piece_index). The
+  low nibble of every byte comes first.
+- 1 byte: side to move (bit 0, set for black) and castling rights
+  (bits 1 to 4).
+- 1 byte: en passant square index, 255 if none.
+- 2 bytes: halfmove clock.
+- 2 bytes: fullmove number.
+- 2 bytes: padding.
+
+Games are their initial position followed by their moves.
+
+    >>> data = encode_game(game)
+    >>> decode_game(data).fen() == game.fen()
+    True
+
+"""
+from array import array
+from escacs.bitboard import COLORS
+from escacs.bitboard import iter_bits
+from escacs.board import Board
+from escacs.exceptions import InvalidEncoding
+from escacs.game import Game
+from escacs.move import Move
+from escacs.pieces import Piece
+from escacs.pieces import PIECE_CLASSES
+from escacs.square import SQUARES
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+import struct
+import sys
+
+_POSITION = struct.Struct("<Q16sBBHH2x")
+POSITION_SIZE = _POSITION.size
+
+# Piece class and color, by bitboard index
+_PIECES: List[Tuple[Callable[..., Piece], str]] = [
+    (klass, color) for color in COLORS for klass in PIECE_CLASSES
+]
+
+# Move codes take up to 15 bits
+_MAX_CODE = 1 << 15
+# Promotion piece, if any, by index in PIECE_ABBRS: knight to queen
+_MAX_PROMOTION = 4
+
+
+def _to_bytes(codes: array) -> bytes:
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return codes.tobytes()
+
+
+def _from_bytes(data: bytes) -> array:
+    codes = array("H")
+    codes.frombytes(data)
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return codes
+
+
+def encode_move(move: Move) -> int:
+    return move.code
+
+
+def decode_move(value: int) -> Move:
+    if not 0 <= value < _MAX_CODE or value >> 12 > _MAX_PROMOTION:
+        raise InvalidEncoding(value)
+    return Move.from_code(value)
+
+
+def encode_moves(moves: Iterable[Move]) -> bytes:
+    """Packs moves in 2 bytes each"""
+    return _to_bytes(array("H", [move.code for move in moves]))
+
+
+def decode_moves(data: bytes) -> List[Move]:
+    if len(data) % 2:
+        raise InvalidEncoding(data)
+    return [decode_move(code) for code in _from_bytes(data)]
+
+
+def encode_position(game: Game) -> bytes:
+    """Packs the current position of a game in POSITION_SIZE bytes"""
+    board = game.board
+    occupied = board._occupied[0] | board._occupied[1]
+    codes = [0] * 64
+    for i, bitboard in enumerate(board._bitboards):
+        for index in iter_bits(bitboard):
+            codes[index] = i
+    nibbles = [codes[index] for index in iter_bits(occupied)]
+    if len(nibbles) > 32:
+        raise InvalidEncoding(game.fen())
+    nibbles.append(0)
+    pieces = bytes(low | high << 4 for low, high in zip(nibbles[::2], nibbles[1::2]))
+    ep_square = game.ep_square
+    return _POSITION.pack(
+        occupied,
+        pieces,
+        (game.turn == "black") | game.castling << 1,
+        ep_square.index if ep_square is not None else 255,
+        game.halfmove_clock,
+        game.fullmove_number,
+    )
+
+
+def decode_position(data: bytes, offset: int = 0) -> Game:
+    """Returns a game at the position packed in data, at offset"""
+    if len(data) < offset + POSITION_SIZE:
+        raise InvalidEncoding(data)
+    (
+        occupied,
+        pieces,
+        flags,
+        ep,
+        halfmove_clock,
+        fullmove_number,
+    ) = _POSITION.unpack_from(data, offset)
+    if flags >> 5 or (ep != 255 and ep > 63):
+        raise InvalidEncoding(data)
+    board = Board()
+    for i, index in enumerate(iter_bits(occupied)):
+        code = pieces[i >> 1] >> (4 * (i & 1)) & 15
+        if code > 11:
+            raise InvalidEncoding(data)
+        klass, color = _PIECES[code]
+        board._put(index, klass(color, board=board, pos=SQUARES[index]))
+
+    game = Game.__new__(Game)
+    game.board = board
+    game._reset()
+    if flags & 1:
+        game.pass_turn()
+    game.castling = flags >> 1
+    if ep != 255:
+        game.ep_square = SQUARES[ep]
+    game.halfmove_clock = halfmove_clock
+    game.fullmove_number = fullmove_number
+    return game
+
+
+def encode_positions(games: Iterable[Game]) -> bytes:
+    """Packs the current positions of several games back to back"""
+    return b"".join(encode_position(game) for game in games)
+
+
+def decode_positions(data: bytes) -> Iterator[Game]:
+    if len(data) % POSITION_SIZE:
+        raise InvalidEncoding(data)
+    for offset in range(0, len(data), POSITION_SIZE):
+        yield decode_position(data, offset)
+
+
+def encode_game(game: Game) -> bytes:
+    """Packs a game: its initial position, followed by its moves. The
+    game is taken back to its initial position and left as it was.
+    """
+    moves = list(game.moves)
+    for _ in moves:
+        game.pop()
+    try:
+        position = encode_position(game)
+    finally:
+        for move in moves:
+            game.push(move)
+    return position + encode_moves(moves)
+
+
+def decode_game(data: bytes) -> Game:
+    """Returns the game packed in data, with all its moves played. Moves
+    must be legal.
+    """
+    game = decode_position(data)
+    for move in decode_moves(data[POSITION_SIZE:]):
+        if move.code not in game.legal_codes():
+            raise InvalidEncoding(data)
+        game.push(move)
+    return game
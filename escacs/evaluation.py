@@ -0,0 +1,113 @@
+"""
+Static evaluation of positions.
+
+The evaluation is the material balance plus piece-square tables
+bonuses, which reward pieces for standing on good squares (knights on
+the center, pawns advancing, king sheltered...). The board keeps both
+terms up to date as pieces are placed and removed, so evaluating a
+position is O(1).
+
+Tables are the ones of Tomasz Michniewski's Simplified Evaluation
+Function, written as seen from white's side (8th row first).
+
+"""
+from escacs.bitboard import BLACK
+from escacs.bitboard import piece_index
+from escacs.bitboard import WHITE
+from typing import List
+from typing import Tuple
+
+# fmt: off
+_PAWN = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+)
+_KNIGHT = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+_BISHOP = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+_ROOK = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+)
+_QUEEN = (
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+)
+_KING = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+)
+# fmt: on
+
+_TABLES: Tuple[Tuple[int, ...], ...] = (_PAWN, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING)
+
+
+def _piece_square_tables() -> List[List[int]]:
+    """Bonus of every piece (by bitboard index, see escacs.bitboard) on
+    every square (by bit index).
+    """
+    tables = [[0] * 64 for _ in range(12)]
+    for kind, table in enumerate(_TABLES):
+        for index in range(64):
+            col, row = index % 8, index // 8
+            tables[piece_index(kind, WHITE)][index] = table[(7 - row) * 8 + col]
+            tables[piece_index(kind, BLACK)][index] = table[row * 8 + col]
+    return tables
+
+
+PIECE_SQUARE_TABLES: List[List[int]] = _piece_square_tables()
+
+# Value of a point of material (see Piece.points), in centipawns
+PAWN_VALUE = 100
+
+
+def evaluate(game) -> int:
+    """Static evaluation of the game position, in centipawns, from the
+    point of view of the side to move.
+    """
+    board = game.board
+    material = board._material
+    psqt = board._psqt
+    score = PAWN_VALUE * (material[WHITE] - material[BLACK]) + psqt[WHITE] - psqt[BLACK]
+    return score if game.turn == "white" else -score
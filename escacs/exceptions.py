@@ -8,6 +8,21 @@ class PieceNotFound(Exception):
         self._from = _from
 
 
+class InvalidFen(Exception):
+    def __init__(self, fen):
+        self.fen = fen
+
+
+class InvalidNotation(Exception):
+    def __init__(self, text):
+        self.text = text
+
+
+class InvalidEncoding(Exception):
+    def __init__(self, data):
+        self.data = data
+
+
 class InvalidMove(Exception):
     def __init__(self, _from, _to):
         self._from = _from
@@ -0,0 +1,317 @@
+"""
+Export of positions as NumPy arrays, for training models.
+
+Games are replayed and every position reached before a move is written
+with the move played from it and the result of the game, in shards of
+at most shard_size positions. Each shard is three .npy files, loaded
+memory mapped by read_shards:
+
+- PREFIX-NNNNN.planes.npy: (N, PLANES, 8, 8) uint8, 0/1 planes, square
+  a1 at [0, 0]. The first 12 are the pieces (see
+  escacs.bitboard.piece_index), then side to move (all ones if black),
+  the four castling rights (K, Q, k, q) and the en passant square.
+- PREFIX-NNNNN.moves.npy: (N,) uint16, code of the move played (see
+  Move.code).
+- PREFIX-NNNNN.results.npy: (N,) int8, result of the game for white:
+  1 for a win, 0 for a draw and -1 for a loss.
+
+Games without a known result are skipped, and so are the ones with an
+illegal move.
+
+    >>> export("lichess_db.pgn.bz2", "shards", workers=8)
+    >>> for shard in read_shards("shards"):
+    ...     train(shard.planes, shard.moves, shard.results)
+
+Only the positions of the shard being filled are kept in memory, as
+bitboards: planes are only unpacked when a shard is written. With
+several workers, games are replayed in chunks by a pool of processes,
+as in escacs.replay, and the shards written in archive order.
+
+Or run `python -m escacs.export ARCHIVE DIRECTORY [--workers N]`.
+
+Requires NumPy (pip install escacs[numpy]).
+
+"""
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from escacs.batch import game_row
+from escacs.batch import planes as piece_planes
+from escacs.batch import PositionArrays
+from escacs.exceptions import InvalidMove
+from escacs.exceptions import InvalidNotation
+from escacs.game import Game
+from escacs.notation import parse_san
+from escacs.pgn import PgnGame
+from escacs.pgn import read_games
+from escacs.pgn import Source
+from escacs.replay import CHUNK_SIZE
+from escacs.replay import Job
+from escacs.replay import job_chunks
+from typing import Deque
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+import argparse
+import collections
+import glob
+import numpy as np
+import os
+import sys
+import time
+
+PLANES = 18
+SHARD_SIZE = 1 << 16
+
+# Points of a game result for white
+RESULTS = {"1-0": 1, "1/2-1/2": 0, "0-1": -1}
+
+# Positions as gathered while replaying: bitboards, turn, castling
+# rights and en passant square of each, then the labels
+_Rows = Tuple[List[List[int]], List[int], List[int], List[int], List[int], List[int]]
+
+
+class Shard(NamedTuple):
+    """
+    A shard of exported positions.
+
+    Attributes
+    ----------
+    planes: ndarray
+        (N, PLANES, 8, 8) uint8 planes of the positions.
+    moves: ndarray
+        (N,) uint16 codes of the moves played from them.
+    results: ndarray
+        (N,) int8 results of their games for white.
+
+    """
+
+    planes: np.ndarray
+    moves: np.ndarray
+    results: np.ndarray
+
+
+def encode_planes(positions: PositionArrays) -> np.ndarray:
+    """Returns the (N, PLANES, 8, 8) planes of positions"""
+    size = len(positions.bitboards)
+    planes = np.zeros((size, PLANES, 64), dtype=np.uint8)
+    planes[:, :12] = piece_planes(positions.bitboards)
+    planes[:, 12] = positions.turn[:, None]
+    for flag in range(4):
+        planes[:, 13 + flag] = (positions.castling[:, None] >> flag) & 1
+    has_ep = positions.ep >= 0
+    planes[np.flatnonzero(has_ep), 17, positions.ep[has_ep]] = 1
+    return planes.reshape(size, PLANES, 8, 8)
+
+
+def _replay(pgn_game: PgnGame, rows: _Rows) -> bool:
+    """Appends the positions of a game to rows. Returns False, leaving
+    rows as they were, if it can not be exported.
+    """
+    result = RESULTS.get(pgn_game.result)
+    if result is None:
+        return False
+    bitboards, turns, castlings, eps, moves, results = rows
+    start = len(moves)
+    game = pgn_game.start()
+    try:
+        for text in pgn_game.sans():
+            move = parse_san(game, text)
+            boards, turn, castling, ep = game_row(game)
+            bitboards.append(boards)
+            turns.append(turn)
+            castlings.append(castling)
+            eps.append(ep)
+            moves.append(move.code)
+            results.append(result)
+            game.push(move)
+    except (InvalidNotation, InvalidMove):
+        for column in rows:
+            del column[start:]
+        return False
+    return True
+
+
+def _replay_chunk(jobs: List[Job]) -> _Rows:
+    """Worker side: replays a chunk of games"""
+    rows: _Rows = ([], [], [], [], [], [])
+    for _, headers, movetext in jobs:
+        try:
+            _replay(PgnGame(headers, movetext), rows)
+        except Exception:
+            # E.g. an invalid FEN tag
+            continue
+    return rows
+
+
+class ShardWriter:
+    """
+    Writes positions to shards of .npy files.
+
+    Attributes
+    ----------
+    directory: str
+        where shards are written.
+    prefix: str
+        name of the shard files, before their number.
+    shard_size: int
+        number of positions per shard, all but the last one.
+    shards: list
+        paths of the shards written so far, without their
+        ".planes.npy" (or ".moves.npy", ".results.npy") suffix.
+    positions: int
+        number of positions written or buffered.
+
+    """
+
+    def __init__(
+        self, directory: str, prefix: str = "positions", shard_size: int = SHARD_SIZE
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.shards: List[str] = []
+        self.positions = 0
+        self._rows: _Rows = ([], [], [], [], [], [])
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def add(self, game: Game, move: int, result: int) -> None:
+        """Adds the position of a game, labelled with the code of the
+        move played from it and the result for white.
+        """
+        boards, turn, castling, ep = game_row(game)
+        self._add_rows(([boards], [turn], [castling], [ep], [move], [result]))
+
+    def add_pgn_game(self, pgn_game: PgnGame) -> bool:
+        """Adds the positions of a game read from a PGN file, replaying
+        it. Returns whether it could be exported.
+        """
+        rows: _Rows = ([], [], [], [], [], [])
+        exported = _replay(pgn_game, rows)
+        self._add_rows(rows)
+        return exported
+
+    def _add_rows(self, rows: _Rows) -> None:
+        for column, values in zip(self._rows, rows):
+            column.extend(values)  # type: ignore
+        self.positions += len(rows[4])
+        while len(self._rows[4]) >= self.shard_size:
+            self._flush(self.shard_size)
+
+    def _flush(self, size: int) -> None:
+        """Writes the first size positions buffered as a shard"""
+        bitboards, turns, castlings, eps, moves, results = (
+            column[:size] for column in self._rows
+        )
+        positions = PositionArrays(
+            np.array(bitboards, dtype=np.uint64).reshape(-1, 12),
+            np.array(turns, dtype=np.uint8),
+            np.array(castlings, dtype=np.uint8),
+            np.array(eps, dtype=np.int8),
+        )
+        path = os.path.join(self.directory, f"{self.prefix}-{len(self.shards):05d}")
+        for name, array in (
+            ("planes", encode_planes(positions)),
+            ("moves", np.array(moves, dtype=np.uint16)),
+            ("results", np.array(results, dtype=np.int8)),
+        ):
+            tmp = f"{path}.{name}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, f"{path}.{name}.npy")
+        self.shards.append(path)
+        for column in self._rows:
+            del column[:size]
+
+    def close(self) -> None:
+        """Writes the positions left as a last, smaller shard"""
+        if self._rows[4]:
+            self._flush(len(self._rows[4]))
+
+
+def read_shards(
+    directory: str, prefix: str = "positions", mmap_mode: Optional[str] = "r"
+) -> Iterator[Shard]:
+    """Yields the shards of a directory in order, memory mapped unless
+    mmap_mode is None.
+    """
+    pattern = os.path.join(glob.escape(directory), f"{prefix}-*.planes.npy")
+    for path in sorted(glob.glob(pattern)):
+        path = path[: -len(".planes.npy")]  # noqa: E203
+        yield Shard(
+            *(
+                np.load(f"{path}.{name}.npy", mmap_mode=mmap_mode)  # type: ignore
+                for name in ("planes", "moves", "results")
+            )
+        )
+
+
+def export(
+    source: Source,
+    directory: str,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    shard_size: int = SHARD_SIZE,
+    prefix: str = "positions",
+) -> ShardWriter:
+    """Exports the positions of all games of a PGN archive to shards in
+    a directory. Returns the closed writer. With a single worker, games
+    are replayed in the current process.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = job_chunks(read_games(source), chunk_size)
+    with ShardWriter(directory, prefix, shard_size) as writer:
+        if workers == 1:
+            for chunk in chunks:
+                writer._add_rows(_replay_chunk(chunk))
+            return writer
+
+        with ProcessPoolExecutor(workers) as executor:
+            pending: Deque[Future] = collections.deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_replay_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    writer._add_rows(pending.popleft().result())
+            while pending:
+                writer._add_rows(pending.popleft().result())
+    return writer
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export PGN positions to NumPy")
+    parser.add_argument("archive", help="PGN file, optionally .gz or .bz2")
+    parser.add_argument("directory", help="where to write the shards")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--prefix", default="positions")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    writer = export(
+        args.archive,
+        args.directory,
+        args.workers,
+        args.chunk_size,
+        args.shard_size,
+        args.prefix,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"positions {writer.positions} shards {len(writer.shards)} "
+        f"time {elapsed:.2f}s "
+        f"positions/s {writer.positions / elapsed if elapsed else 0:.0f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,58 @@
+from escacs import movegen
+from escacs.attacks import PAWN_ATTACKS
+from escacs.bitboard import BISHOP
+from escacs.bitboard import color_index
+from escacs.bitboard import DARK_SQUARES
+from escacs.bitboard import KING
+from escacs.bitboard import KNIGHT
+from escacs.bitboard import LIGHT_SQUARES
+from escacs.bitboard import lsb
+from escacs.bitboard import PAWN
+from escacs.bitboard import popcount
+from escacs.bitboard import QUEEN
+from escacs.bitboard import ROOK
 from escacs.board import Board
+from escacs.board import STARTING_BOARD_FEN
+from escacs.exceptions import CheckMate
+from escacs.exceptions import Draw
+from escacs.exceptions import InvalidFen
 from escacs.exceptions import InvalidMove
-from escacs.pieces import Bishop
-from escacs.pieces import King
-from escacs.pieces import Knight
-from escacs.pieces import Pawn
+from escacs.exceptions import InvalidSquare
+from escacs.exceptions import Stalemate
+from escacs.move import Move
 from escacs.pieces import Piece
-from escacs.pieces import Queen
-from escacs.pieces import Rook
+from escacs.pieces import PIECE_CLASSES
+from escacs.polyglot import OpeningBook
+from escacs.search import analyse
+from escacs.search import Limit
+from escacs.search import TranspositionTable
 from escacs.square import Square
+from escacs.square import SQUARES
 from escacs.types import Color
 from escacs.types import Coordinate
+from escacs.utils import get_square
+from escacs.zobrist import CASTLING_KEYS
+from escacs.zobrist import EP_KEYS
+from escacs.zobrist import TURN_KEY
+from typing import Dict
 from typing import List
+from typing import NamedTuple
 from typing import Optional
 from typing import Tuple
 
+CASTLING_FLAGS = "KQkq"
+STARTING_FEN = f"{STARTING_BOARD_FEN} w KQkq - 0 1"
+
+
+class Undo(NamedTuple):
+    """What it takes to revert a move, besides the move itself"""
+
+    piece: Piece
+    captured: Optional[Piece]
+    castling: int
+    ep_square: Optional[Square]
+    halfmove_clock: int
+
 
 class Game:
     """
@@ -24,9 +63,28 @@ class Game:
     _turn: Color
         states which player is next in the current moment.
     moves: list
-        history of moves already realized in the game.
+        history of moves already realized in the game. Moves are
+        pushed to and popped from it (see push and pop).
+    _undo: list
+        undo records of the moves in the history, in the same order.
     board: Board
         object of the class Board.
+    castling: int
+        castling rights still available, as a bitmask (see
+        escacs.movegen.WHITE_KINGSIDE and friends).
+    ep_square: Square
+        square a pawn can be captured en passant on, if any.
+    halfmove_clock: int
+        number of moves since the last capture or pawn move.
+    fullmove_number: int
+        number of the current move. Starts at 1 and increases after
+        every black move.
+    _repetitions: dict
+        number of times each position of the history was left, by
+        Zobrist key, for repetitions to be told without replaying it.
+    _legal: tuple
+        Zobrist key of the last position legal moves were generated
+        for, and their codes. See legal_codes.
 
     """
 
@@ -34,10 +92,83 @@ class Game:
         self.start()
 
     def start(self):
-        self._turn: Color = "white"
-        self.moves: List[Tuple[Square, Square]] = []
+        self._reset()
+        self.castling = movegen.ALL_CASTLING
         self.initialize_board()
 
+    def _reset(self):
+        self._turn: Color = "white"
+        self.moves: List[Move] = []
+        self._undo: List[Undo] = []
+        # Zobrist key of the turn, castling rights and en passant
+        # square. See zobrist_key
+        self._key: int = TURN_KEY
+        self._castling: int = 0
+        self._ep_square: Optional[Square] = None
+        self.halfmove_clock: int = 0
+        self.fullmove_number: int = 1
+        self._repetitions: Dict[int, int] = {}
+        self._legal: Tuple[Optional[int], Tuple[int, ...]] = (None, ())
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Game":
+        """Builds a game from the position described by a FEN string"""
+        game = cls.__new__(cls)
+        game.board = Board()
+        game.set_fen(fen)
+        return game
+
+    def set_fen(self, fen: str) -> None:
+        """Sets up the position described by a FEN string, in a single
+        pass. The history of moves is cleared.
+        """
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise InvalidFen(fen)
+        self._reset()
+        placement, turn, castling, ep = fields[:4]
+        self.board.set_fen(placement)
+        try:
+            if turn not in ("w", "b"):
+                raise InvalidFen(fen)
+            if turn == "b":
+                self.pass_turn()
+            bitboards = self.board._bitboards
+            if castling != "-":
+                rights = 0
+                for flag in castling:
+                    rights |= 1 << CASTLING_FLAGS.index(flag)
+                # Rights whose king or rook moved away are dropped
+                self.castling = movegen.valid_castling(bitboards, rights)
+            if ep != "-":
+                # Only kept when a pawn can capture en passant
+                ep_square = Square(ep)
+                us = color_index(self._turn)
+                if movegen.valid_ep_square(bitboards, ep_square.index, us):
+                    self.ep_square = ep_square
+            if len(fields) == 6:
+                self.halfmove_clock = int(fields[4])
+                self.fullmove_number = int(fields[5])
+        except (ValueError, InvalidSquare):
+            raise InvalidFen(fen)
+
+    def fen(self) -> str:
+        """Returns the FEN string of the current position"""
+        castling = "".join(
+            flag for i, flag in enumerate(CASTLING_FLAGS) if self._castling & (1 << i)
+        )
+        ep_square = self._ep_square
+        return " ".join(
+            [
+                self.board.fen(),
+                "w" if self._turn == "white" else "b",
+                castling or "-",
+                str(ep_square) if ep_square is not None else "-",
+                str(self.halfmove_clock),
+                str(self.fullmove_number),
+            ]
+        )
+
     def place_piece(self, piece_klas, color: Color, pos: Coordinate):
         piece = piece_klas(color, board=self.board, pos=pos)
         self.board.place_piece(pos, piece)
@@ -49,33 +180,11 @@ class Game:
         return points - opponent_points
 
     def get_points(self, color: Color) -> int:
-        points = 0
-        for _, piece in self.board._board.items():
-            if piece and piece.color == color:
-                points += piece.points
-        return points
+        return self.board.material(color)
 
     def initialize_board(self):
         self.board: Board = Board()
-        for col in "abcdefgh":
-            self.place_piece(Pawn, "white", f"{col}2")
-            self.place_piece(Pawn, "black", f"{col}7")
-        self.place_piece(Rook, "white", "a1")
-        self.place_piece(Rook, "white", "h1")
-        self.place_piece(Rook, "black", "a8")
-        self.place_piece(Rook, "black", "h8")
-        self.place_piece(Knight, "white", "b1")
-        self.place_piece(Knight, "white", "g1")
-        self.place_piece(Knight, "black", "b8")
-        self.place_piece(Knight, "black", "g8")
-        self.place_piece(Bishop, "white", "c1")
-        self.place_piece(Bishop, "white", "f1")
-        self.place_piece(Bishop, "black", "c8")
-        self.place_piece(Bishop, "black", "f8")
-        self.place_piece(Queen, "white", "d1")
-        self.place_piece(Queen, "black", "d8")
-        self.place_piece(King, "white", "e1")
-        self.place_piece(King, "black", "e8")
+        self.board.set_fen(STARTING_BOARD_FEN)
 
     @property
     def turn(self) -> Color:
@@ -86,14 +195,79 @@ class Game:
             self._turn = "black"  # type: ignore
         else:
             self._turn = "white"  # type: ignore
+        self._key ^= TURN_KEY
+
+    @property
+    def castling(self) -> int:
+        return self._castling
+
+    @castling.setter
+    def castling(self, castling: int) -> None:
+        self._key ^= CASTLING_KEYS[self._castling] ^ CASTLING_KEYS[castling]
+        self._castling = castling
+
+    @property
+    def ep_square(self) -> Optional[Square]:
+        return self._ep_square
+
+    @ep_square.setter
+    def ep_square(self, ep_square: Optional[Square]) -> None:
+        if self._ep_square is not None:
+            self._key ^= EP_KEYS[self._ep_square.col]
+        if ep_square is not None:
+            self._key ^= EP_KEYS[ep_square.col]
+        self._ep_square = ep_square
+
+    @property
+    def zobrist_key(self) -> int:
+        """64-bit Zobrist key of the current position (see escacs.zobrist)"""
+        return self.board.zobrist ^ self._key
+
+    def legal_codes(self) -> Tuple[int, ...]:
+        """Returns the codes of all legal moves of the player in turn.
+
+        They are generated on first use and cached until the position
+        changes: any change to the board, the turn, the castling rights
+        or the en passant square changes the Zobrist key they are
+        cached by.
+        """
+        key = self.zobrist_key
+        cached, codes = self._legal
+        if cached != key:
+            codes = tuple(movegen.legal_moves(self))
+            self._legal = (key, codes)
+        return codes
+
+    def legal_moves(self) -> List[Move]:
+        """Returns all legal moves of the player in turn"""
+        return [Move.from_code(code) for code in self.legal_codes()]
+
+    def best_move(
+        self,
+        limit: Limit = Limit(depth=4),
+        table: Optional[TranspositionTable] = None,
+        book: Optional[OpeningBook] = None,
+    ) -> Optional[Move]:
+        """Searches the best move for the player in turn, within the
+        given depth, nodes and/or time limit. Book moves are played
+        without searching. See escacs.search.
+        """
+        return analyse(self, limit, table, book).move
 
-    def player_move(self, _from: Square, _to: Square) -> Optional[Piece]:
+    def player_move(
+        self, _from: Coordinate, _to: Coordinate, promotion: Optional[str] = None
+    ) -> Optional[Piece]:
         """Move a piece from a square to another one. Checks agains valid
         moves. Returns the eaten piece, if any.
 
+        Pawns reaching the last row promote to queen, unless another
+        promotion piece abbreviation is given.
+
         """
         # Check that there is a piece in source square
-        piece = self.board.get_piece(_from)
+        src = get_square(_from)
+        dst = get_square(_to)
+        piece = self.board.get_piece(src)
         if not piece:
             # No piece found
             raise InvalidMove(_from, _to)
@@ -102,19 +276,178 @@ class Game:
         if piece.color != self.turn:
             raise InvalidMove(_from, _to)
 
-        # Check that it's a valid piece move
-        if _to not in piece.all_moves():
+        if piece.kind == PAWN and dst.row in (0, 7):
+            promotion = promotion or "Q"
+        elif promotion:
             raise InvalidMove(_from, _to)
 
-        if not piece.is_legal_move(_to):
+        # Check that it's a legal move
+        try:
+            code = Move(src, dst, promotion).code
+        except ValueError:
+            # Unknown promotion piece
+            raise InvalidMove(_from, _to)
+        if code not in self.legal_codes():
             raise InvalidMove(_from, _to)
 
-        # TODO: Take into account moves where can take!
-        # TODO: check that the move doesn't crash against any other
-        # piece.
-        # TODO: prevent moves that leave the king on check.
-        # TODO: check for stalemate.
-        taken: Optional[Piece] = self.board.move_piece(_from, _to)
-        self.moves.append((_from, _to))
+        captured = self._push(code)
+        if not self.legal_codes():
+            if self.is_check():
+                raise CheckMate(piece.color)
+            raise Stalemate()
+        if self.is_draw():
+            raise Draw()
+        return captured
+
+    def is_check(self) -> bool:
+        """Tells whether the king of the player in turn is attacked"""
+        board = self.board
+        us = color_index(self._turn)
+        kings = board._bitboards[us * 6 + KING]
+        if not kings:
+            return False
+        occupied = board._occupied[0] | board._occupied[1]
+        return movegen.is_attacked(board._bitboards, lsb(kings), us ^ 1, occupied)
+
+    def is_checkmate(self) -> bool:
+        return self.is_check() and not self.legal_codes()
+
+    def is_stalemate(self) -> bool:
+        return not self.is_check() and not self.legal_codes()
+
+    def repetitions(self) -> int:
+        """Number of times the current position has been reached, this
+        one included. Positions are the same when their pieces, turn,
+        castling rights and en passant capture are.
+        """
+        return self._repetitions.get(self.zobrist_key, 0) + 1
+
+    def is_repetition(self, count: int = 3) -> bool:
+        return self.repetitions() >= count
+
+    def is_fifty_moves(self) -> bool:
+        """Tells whether 50 moves by each player went by without any
+        capture or pawn move.
+        """
+        return self.halfmove_clock >= 100
+
+    def is_insufficient_material(self) -> bool:
+        """Tells whether neither player has the pieces to mate: only
+        kings with at most a knight, or bishops all on squares of the
+        same color.
+        """
+        bitboards = self.board._bitboards
+        for kind in (PAWN, ROOK, QUEEN):
+            if bitboards[kind] or bitboards[6 + kind]:
+                return False
+        knights = bitboards[KNIGHT] | bitboards[6 + KNIGHT]
+        bishops = bitboards[BISHOP] | bitboards[6 + BISHOP]
+        if not bishops:
+            return popcount(knights) <= 1
+        return not knights and (
+            not bishops & DARK_SQUARES or not bishops & LIGHT_SQUARES
+        )
+
+    def is_draw(self) -> bool:
+        """Tells whether the game is drawn by threefold repetition, the
+        fifty-move rule or insufficient material.
+        """
+        return (
+            self.is_fifty_moves()
+            or self.is_insufficient_material()
+            or self.is_repetition()
+        )
+
+    def push(self, move: Move) -> Optional[Piece]:
+        """Plays a move in place, without checking that it is legal (see
+        player_move). Returns the captured piece, if any. The move can
+        be taken back with pop.
+        """
+        return self._push(move.code)
+
+    def _push(self, code: int) -> Optional[Piece]:
+        """Plays a move, given its code. See push"""
+        src = code & 63
+        dst = (code >> 6) & 63
+        promotion = code >> 12
+        board = self.board
+        us = color_index(self._turn)
+        key = board.zobrist ^ self._key
+
+        piece = board._remove(src)
+        if piece is None:
+            raise InvalidMove(SQUARES[src], SQUARES[dst])
+        moved = piece
+        captured = board._remove(dst)
+        ep_square = self.ep_square
+        self.ep_square = None
+        pawn_move = piece.kind == PAWN
+        if pawn_move:
+            if ep_square is not None and dst == ep_square.index:
+                captured = board._remove(dst - 8 if us == 0 else dst + 8)
+            elif abs(dst - src) == 16:
+                # Only keep the en passant square when it can be used
+                middle = (src + dst) // 2
+                if PAWN_ATTACKS[us][middle] & board._bitboards[(us ^ 1) * 6 + PAWN]:
+                    self.ep_square = SQUARES[middle]
+            if promotion:
+                piece = PIECE_CLASSES[promotion](
+                    piece.color, board=board, pos=SQUARES[dst]
+                )
+        elif piece.kind == KING and abs(dst - src) == 2:
+            rook_src, rook_dst = movegen.CASTLING_ROOK_SQUARES[dst]
+            rook = board._remove(rook_src)
+            board._put(rook_dst, rook)  # type: ignore
+            rook.move(SQUARES[rook_dst])  # type: ignore
+        board._put(dst, piece)
+        piece.move(SQUARES[dst])
+        self._undo.append(
+            Undo(moved, captured, self.castling, ep_square, self.halfmove_clock)
+        )
+
+        self.castling &= (
+            movegen.CASTLING_RIGHTS_MASK[src] & movegen.CASTLING_RIGHTS_MASK[dst]
+        )
+        if pawn_move or captured is not None:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if us == 1:
+            self.fullmove_number += 1
+        self.moves.append(Move.from_code(code))
+        self._repetitions[key] = self._repetitions.get(key, 0) + 1
+        self.pass_turn()
+        return captured
+
+    def pop(self) -> Move:
+        """Takes back the last move played and returns it"""
+        move = self.moves.pop()
+        piece, captured, castling, ep_square, halfmove_clock = self._undo.pop()
         self.pass_turn()
-        return taken
+        src = move.from_square.index
+        dst = move.to_square.index
+        board = self.board
+
+        board._remove(dst)
+        board._put(src, piece)
+        piece.move(move.from_square)
+        if captured is not None:
+            if piece.kind == PAWN and ep_square is not None and dst == ep_square.index:
+                dst = dst - 8 if self._turn == "white" else dst + 8
+            board._put(dst, captured)
+        elif piece.kind == KING and abs(dst - src) == 2:
+            rook_src, rook_dst = movegen.CASTLING_ROOK_SQUARES[dst]
+            rook = board._remove(rook_dst)
+            board._put(rook_src, rook)  # type: ignore
+            rook.move(SQUARES[rook_src])  # type: ignore
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        if self._turn == "black":
+            self.fullmove_number -= 1
+        key = self.zobrist_key
+        count = self._repetitions.pop(key) - 1
+        if count:
+            self._repetitions[key] = count
+        return move
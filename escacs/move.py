@@ -0,0 +1,58 @@
+from escacs.bitboard import PIECE_ABBRS
+from escacs.square import Square
+from escacs.square import SQUARES
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+
+
+class Move(NamedTuple):
+    """
+    A chess move. Castling is represented as the two squares move of
+    the king, e.g: e1g1.
+
+    Attributes
+    ----------
+    from_square: Square
+        square where the moving piece stands.
+    to_square: Square
+        square where the moving piece lands.
+    promotion: str
+        abbreviation of the piece a pawn promotes to, if any.
+
+    Internally, moves are handled as integer codes: bits 0-5 hold the
+    from square index, bits 6-11 the to square index and bits 12-14 the
+    kind of the promotion piece (0 if none).
+
+    """
+
+    from_square: Square
+    to_square: Square
+    promotion: Optional[str] = None
+
+    @classmethod
+    def from_code(cls, code: int) -> "Move":
+        move = _MOVES.get(code)
+        if move is None:
+            promotion = code >> 12
+            move = _MOVES[code] = cls(
+                SQUARES[code & 63],
+                SQUARES[(code >> 6) & 63],
+                PIECE_ABBRS[promotion] if promotion else None,
+            )
+        return move
+
+    @property
+    def code(self) -> int:
+        code = self.from_square.index | self.to_square.index << 6
+        if self.promotion:
+            code |= PIECE_ABBRS.index(self.promotion.upper()) << 12
+        return code
+
+    def __str__(self) -> str:
+        promotion = (self.promotion or "").lower()
+        return f"{self.from_square}{self.to_square}{promotion}"
+
+
+# Moves are immutable: decoded moves are reused
+_MOVES: Dict[int, Move] = {}
@@ -0,0 +1,352 @@
+"""
+Legal move generation.
+
+Moves are generated straight from the board bitboards, as integer move
+codes (see escacs.move.Move). Pseudo-legal moves are generated first
+and the ones that would leave the own king in check are filtered out
+afterwards, with the pins and checks of the position (see legal_moves).
+
+"""
+from escacs.attacks import BETWEEN
+from escacs.attacks import bishop_attacks
+from escacs.attacks import KING_ATTACKS
+from escacs.attacks import KNIGHT_ATTACKS
+from escacs.attacks import PAWN_ATTACKS
+from escacs.attacks import rook_attacks
+from escacs.bitboard import BISHOP
+from escacs.bitboard import color_index
+from escacs.bitboard import FILE_A
+from escacs.bitboard import FILE_H
+from escacs.bitboard import FULL
+from escacs.bitboard import iter_bits
+from escacs.bitboard import KING
+from escacs.bitboard import KNIGHT
+from escacs.bitboard import lsb
+from escacs.bitboard import PAWN
+from escacs.bitboard import QUEEN
+from escacs.bitboard import RANK_1
+from escacs.bitboard import RANK_3
+from escacs.bitboard import RANK_6
+from escacs.bitboard import RANK_8
+from escacs.bitboard import ROOK
+from escacs.bitboard import WHITE
+from typing import Dict
+from typing import List
+
+# Castling rights, as a bitmask
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING = 15
+
+# Castling rights that are kept after a move from or to a square
+CASTLING_RIGHTS_MASK: List[int] = [ALL_CASTLING] * 64
+CASTLING_RIGHTS_MASK[0] &= ~WHITE_QUEENSIDE  # a1
+CASTLING_RIGHTS_MASK[4] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)  # e1
+CASTLING_RIGHTS_MASK[7] &= ~WHITE_KINGSIDE  # h1
+CASTLING_RIGHTS_MASK[56] &= ~BLACK_QUEENSIDE  # a8
+CASTLING_RIGHTS_MASK[60] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)  # e8
+CASTLING_RIGHTS_MASK[63] &= ~BLACK_KINGSIDE  # h8
+
+# Rook from and to squares, by the king destination square of a castling
+CASTLING_ROOK_SQUARES = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+# King and rook squares of every castling right
+_CASTLING_SQUARES = ((4, 7), (4, 0), (60, 63), (60, 56))
+
+_PROMOTIONS = (QUEEN << 12, ROOK << 12, BISHOP << 12, KNIGHT << 12)
+
+
+def valid_castling(bitboards: List[int], castling: int) -> int:
+    """Castling rights, keeping only the ones whose king and rook are on
+    their initial squares.
+    """
+    for flag, (king, rook) in enumerate(_CASTLING_SQUARES):
+        color = flag // 2
+        if not (
+            bitboards[color * 6 + KING] >> king & 1
+            and bitboards[color * 6 + ROOK] >> rook & 1
+        ):
+            castling &= ~(1 << flag)
+    return castling
+
+
+def valid_ep_square(bitboards: List[int], index: int, us: int) -> bool:
+    """Tells whether a square can be the en passant square with us to
+    move: right behind an enemy pawn that just made a double step from
+    an empty square, and attacked by one of our pawns.
+    """
+    if index // 8 != (5 if us == WHITE else 2):
+        return False
+    them = us ^ 1
+    occupied = 0
+    for bitboard in bitboards:
+        occupied |= bitboard
+    step = -8 if us == WHITE else 8
+    return bool(
+        not occupied >> index & 1
+        and not occupied >> (index - step) & 1
+        and bitboards[them * 6 + PAWN] >> (index + step) & 1
+        and PAWN_ATTACKS[them][index] & bitboards[us * 6 + PAWN]
+    )
+
+
+def is_attacked(
+    bitboards: List[int], index: int, by: int, occupied: int, exclude: int = 0
+) -> bool:
+    """Tells whether any piece of color index `by` attacks the square
+    index, given the occupancy of the board. Pieces on the exclude
+    bitboard are not taken into account (e.g: they were just captured).
+    """
+    base = by * 6
+    keep = ~exclude
+    return bool(
+        KNIGHT_ATTACKS[index] & bitboards[base + KNIGHT] & keep
+        or PAWN_ATTACKS[by ^ 1][index] & bitboards[base + PAWN] & keep
+        or KING_ATTACKS[index] & bitboards[base + KING]
+        or bishop_attacks(index, occupied)
+        & (bitboards[base + BISHOP] | bitboards[base + QUEEN])
+        & keep
+        or rook_attacks(index, occupied)
+        & (bitboards[base + ROOK] | bitboards[base + QUEEN])
+        & keep
+    )
+
+
+def is_safe(game, code: int) -> bool:
+    """Tells whether a pseudo-legal move, other than castling, leaves the
+    king of the side to move out of check. Cheaper than generating all
+    legal moves when only a few moves need to be checked.
+    """
+    board = game.board
+    bitboards = board._bitboards
+    us = color_index(game.turn)
+    them = us ^ 1
+    kings = bitboards[us * 6 + KING]
+    if not kings:
+        return True
+    occupied = board._occupied[0] | board._occupied[1]
+    src = code & 63
+    to = (code >> 6) & 63
+    king = lsb(kings)
+    if src == king:
+        return not is_attacked(
+            bitboards, to, them, (occupied ^ (1 << src)) | (1 << to), 1 << to
+        )
+    after = (occupied & ~(1 << src)) | (1 << to)
+    captured = 1 << to
+    ep_square = game.ep_square
+    if (
+        ep_square is not None
+        and to == ep_square.index
+        and bitboards[us * 6 + PAWN] >> src & 1
+    ):
+        captured = 1 << (to - 8 if us == WHITE else to + 8)
+        after &= ~captured
+    return not is_attacked(bitboards, king, them, after, captured)
+
+
+def pseudo_legal_moves(game) -> List[int]:
+    """Returns the codes of all moves of the side to move, including
+    the ones that leave its own king in check.
+    """
+    board = game.board
+    bitboards = board._bitboards
+    us = color_index(game.turn)
+    them = us ^ 1
+    ours = board._occupied[us]
+    theirs = board._occupied[them]
+    occupied = ours | theirs
+    targets = ~ours & FULL
+    base = us * 6
+    moves: List[int] = []
+    append = moves.append
+
+    # Pawns
+    pawns = bitboards[base + PAWN]
+    empty = ~occupied & FULL
+    if us == WHITE:
+        single = (pawns << 8) & empty
+        pawn_targets = (
+            (single, 8),
+            (((single & RANK_3) << 8) & empty, 16),
+            (((pawns & ~FILE_A) << 7) & theirs, 7),
+            (((pawns & ~FILE_H) << 9) & theirs, 9),
+        )
+        last_rank = RANK_8
+    else:
+        single = (pawns >> 8) & empty
+        pawn_targets = (
+            (single, -8),
+            (((single & RANK_6) >> 8) & empty, -16),
+            (((pawns & ~FILE_A) >> 9) & theirs, -9),
+            (((pawns & ~FILE_H) >> 7) & theirs, -7),
+        )
+        last_rank = RANK_1
+    for pawn_moves, delta in pawn_targets:
+        for to in iter_bits(pawn_moves & ~last_rank):
+            append((to - delta) | to << 6)
+        for to in iter_bits(pawn_moves & last_rank):
+            code = (to - delta) | to << 6
+            moves.extend([code | promotion for promotion in _PROMOTIONS])
+    ep_square = game.ep_square
+    if ep_square is not None:
+        ep = ep_square.index
+        for src in iter_bits(PAWN_ATTACKS[them][ep] & pawns):
+            append(src | ep << 6)
+
+    # Pieces
+    for src in iter_bits(bitboards[base + KNIGHT]):
+        for to in iter_bits(KNIGHT_ATTACKS[src] & targets):
+            append(src | to << 6)
+    for src in iter_bits(bitboards[base + BISHOP] | bitboards[base + QUEEN]):
+        for to in iter_bits(bishop_attacks(src, occupied) & targets):
+            append(src | to << 6)
+    for src in iter_bits(bitboards[base + ROOK] | bitboards[base + QUEEN]):
+        for to in iter_bits(rook_attacks(src, occupied) & targets):
+            append(src | to << 6)
+    for src in iter_bits(bitboards[base + KING]):
+        for to in iter_bits(KING_ATTACKS[src] & targets):
+            append(src | to << 6)
+
+    # Castling. The king can not castle out of, through or into check.
+    castling = game.castling >> (2 * us)
+    king = 4 + 56 * us
+    if castling & 3 and bitboards[base + KING] >> king & 1:
+        rooks = bitboards[base + ROOK]
+        if (
+            castling & 1
+            and rooks & (1 << (king + 3))
+            and not occupied & (3 << (king + 1))
+            and not any(
+                is_attacked(bitboards, i, them, occupied)
+                for i in (king, king + 1, king + 2)
+            )
+        ):
+            append(king | (king + 2) << 6)
+        if (
+            castling & 2
+            and rooks & (1 << (king - 4))
+            and not occupied & (7 << (king - 3))
+            and not any(
+                is_attacked(bitboards, i, them, occupied)
+                for i in (king, king - 1, king - 2)
+            )
+        ):
+            append(king | (king - 2) << 6)
+    return moves
+
+
+def attackers(bitboards: List[int], index: int, by: int, occupied: int) -> int:
+    """Bitboard of the pieces of color index `by` that attack the square
+    index, given the occupancy of the board.
+    """
+    base = by * 6
+    return (
+        KNIGHT_ATTACKS[index] & bitboards[base + KNIGHT]
+        | PAWN_ATTACKS[by ^ 1][index] & bitboards[base + PAWN]
+        | KING_ATTACKS[index] & bitboards[base + KING]
+        | bishop_attacks(index, occupied)
+        & (bitboards[base + BISHOP] | bitboards[base + QUEEN])
+        | rook_attacks(index, occupied)
+        & (bitboards[base + ROOK] | bitboards[base + QUEEN])
+    )
+
+
+def attack_map(bitboards: List[int], by: int, occupied: int) -> int:
+    """Bitboard of all the squares attacked by the pieces of color index
+    `by`, given the occupancy of the board.
+    """
+    base = by * 6
+    pawns = bitboards[base + PAWN]
+    if by == WHITE:
+        attacked = ((pawns & ~FILE_A) << 7 | (pawns & ~FILE_H) << 9) & FULL
+    else:
+        attacked = (pawns & ~FILE_A) >> 9 | (pawns & ~FILE_H) >> 7
+    for index in iter_bits(bitboards[base + KNIGHT]):
+        attacked |= KNIGHT_ATTACKS[index]
+    for index in iter_bits(bitboards[base + BISHOP] | bitboards[base + QUEEN]):
+        attacked |= bishop_attacks(index, occupied)
+    for index in iter_bits(bitboards[base + ROOK] | bitboards[base + QUEEN]):
+        attacked |= rook_attacks(index, occupied)
+    for index in iter_bits(bitboards[base + KING]):
+        attacked |= KING_ATTACKS[index]
+    return attacked
+
+
+def pins(bitboards: List[int], king: int, us: int, occupied: int) -> Dict[int, int]:
+    """Pieces of color index `us` pinned to their king, on the king
+    square index: the squares each of them can still move to (the pin
+    line, pinner included), by pinned piece square index.
+    """
+    base = (us ^ 1) * 6
+    queens = bitboards[base + QUEEN]
+    snipers = rook_attacks(king, 0) & (bitboards[base + ROOK] | queens) | (
+        bishop_attacks(king, 0) & (bitboards[base + BISHOP] | queens)
+    )
+    ours = 0
+    for i in range(us * 6, us * 6 + 6):
+        ours |= bitboards[i]
+    pinned = {}
+    between = BETWEEN[king]
+    for sniper in iter_bits(snipers):
+        blockers = between[sniper] & occupied
+        if blockers and not blockers & (blockers - 1) and blockers & ours:
+            pinned[lsb(blockers)] = between[sniper] | 1 << sniper
+    return pinned
+
+
+def legal_moves(game) -> List[int]:
+    """Returns the codes of all legal moves of the side to move.
+
+    Pseudo-legal moves are filtered with the attack map of the opponent
+    (king moves), the checks mask (the checker and the squares between
+    it and the king) and the pin lines, without playing them. Only en
+    passant captures, which remove two pieces from a row, are tried.
+    """
+    moves = pseudo_legal_moves(game)
+    board = game.board
+    bitboards = board._bitboards
+    us = color_index(game.turn)
+    them = us ^ 1
+    kings = bitboards[us * 6 + KING]
+    if not kings:
+        # Not a real chess position: nothing to keep safe
+        return moves
+
+    occupied = board._occupied[0] | board._occupied[1]
+    king = lsb(kings)
+    checkers = attackers(bitboards, king, them, occupied)
+    # Squares the king can not move to, with the king out of the way of
+    # the sliders it would hide squares from
+    attacked = attack_map(bitboards, them, occupied ^ kings)
+    if checkers & (checkers - 1):
+        # Double check: only the king can move
+        return [
+            move
+            for move in moves
+            if move & 63 == king and not attacked >> (move >> 6 & 63) & 1
+        ]
+    targets = BETWEEN[king][lsb(checkers)] | checkers if checkers else FULL
+    pinned = pins(bitboards, king, us, occupied)
+    ep_square = game.ep_square
+    ep = ep_square.index if ep_square is not None else -1
+    pawns = bitboards[us * 6 + PAWN]
+
+    legal = []
+    for move in moves:
+        src = move & 63
+        to = (move >> 6) & 63
+        if src == king:
+            # Castling is checked on generation
+            if abs(to - src) == 2 or not attacked >> to & 1:
+                legal.append(move)
+        elif to == ep and pawns >> src & 1:
+            captured = 1 << (to - 8 if us == WHITE else to + 8)
+            after = (occupied & ~(1 << src) & ~captured) | (1 << to)
+            if not is_attacked(bitboards, king, them, after, captured):
+                legal.append(move)
+        elif targets >> to & 1 and (src not in pinned or pinned[src] >> to & 1):
+            legal.append(move)
+    return legal
@@ -0,0 +1,265 @@
+"""
+Move notation.
+
+Standard Algebraic Notation (SAN) is the one used by humans and in PGN
+files: the piece letter (none for pawns), the disambiguation square
+file and/or row when several pieces of the same kind can reach the
+destination, an "x" for captures, the destination square, the
+promotion piece and "+" or "#" when the move gives check or mate,
+e.g: Nbd7, exd5, e8=Q+, O-O.
+
+UCI notation is the one of engines: the from and to squares and the
+promotion piece, if any, e.g: g1f3, e7e8q, e1g1 (castling).
+
+    >>> game = Game()
+    >>> san(game, Move(Square("g1"), Square("f3")))
+    'Nf3'
+    >>> str(parse_san(game, "e4"))
+    'e2e4'
+    >>> str(parse_move(game, "g1f3"))
+    'g1f3'
+
+Parsing does not generate all the legal moves of the position: only
+the pieces that attack the destination square are looked at, and only
+their moves are checked for legality. Both SAN generation and parsing
+results are cached by position Zobrist key, as the same positions (and
+moves) show up over and over in game collections.
+
+"""
+from escacs import movegen
+from escacs.attacks import bishop_attacks
+from escacs.attacks import KING_ATTACKS
+from escacs.attacks import KNIGHT_ATTACKS
+from escacs.attacks import PAWN_ATTACKS
+from escacs.attacks import queen_attacks
+from escacs.attacks import rook_attacks
+from escacs.bitboard import BISHOP
+from escacs.bitboard import FILE_A
+from escacs.bitboard import iter_bits
+from escacs.bitboard import KING
+from escacs.bitboard import KNIGHT
+from escacs.bitboard import PAWN
+from escacs.bitboard import PIECE_ABBRS
+from escacs.bitboard import RANK_1
+from escacs.bitboard import ROOK
+from escacs.bitboard import WHITE
+from escacs.exceptions import InvalidNotation
+from escacs.move import Move
+from escacs.square import SQUARES
+from typing import Dict
+from typing import Tuple
+
+import re
+
+_SAN_RE = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+_UCI_RE = re.compile(r"^([a-h][1-8])([a-h][1-8])([nbrq])?$")
+_CASTLING = {"O-O": 2, "0-0": 2, "O-O-O": -2, "0-0-0": -2}
+_NAMES = [str(square) for square in SQUARES]
+
+# Cached SAN of moves and move codes of SAN strings, by position key
+CACHE_SIZE = 1 << 16
+_SAN_CACHE: Dict[Tuple[int, int], str] = {}
+_MOVE_CACHE: Dict[Tuple[int, str], int] = {}
+
+
+def clear_cache() -> None:
+    _SAN_CACHE.clear()
+    _MOVE_CACHE.clear()
+
+
+def _sources(game, kind: int, dst: int) -> int:
+    """Bitboard of the pieces of the given kind of the side to move that
+    can move to the dst square index, leaving aside whether the move
+    would leave their king in check. Castling is not taken into account.
+    """
+    board = game.board
+    us = 0 if game.turn == "white" else 1
+    ours = board._occupied[us]
+    if ours >> dst & 1:
+        return 0
+    theirs = board._occupied[us ^ 1]
+    occupied = ours | theirs
+    pieces = board._bitboards[us * 6 + kind]
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[dst] & pieces
+    if kind == BISHOP:
+        return bishop_attacks(dst, occupied) & pieces
+    if kind == ROOK:
+        return rook_attacks(dst, occupied) & pieces
+    if kind == KING:
+        return KING_ATTACKS[dst] & pieces
+    if kind != PAWN:
+        return queen_attacks(dst, occupied) & pieces
+
+    ep_square = game.ep_square
+    if theirs >> dst & 1 or (ep_square is not None and dst == ep_square.index):
+        return PAWN_ATTACKS[us ^ 1][dst] & pieces
+    if occupied >> dst & 1:
+        return 0
+    step = -8 if us == WHITE else 8
+    src = dst + step
+    if not 0 <= src < 64:
+        return 0
+    if pieces >> src & 1:
+        return 1 << src
+    if not occupied >> src & 1 and dst // 8 == (3 if us == WHITE else 4):
+        return pieces & (1 << (src + step))
+    return 0
+
+
+def _is_legal(game, code: int) -> bool:
+    src = code & 63
+    dst = (code >> 6) & 63
+    promotion = code >> 12
+    piece = game.board._pieces[src]
+    if piece is None or piece.color != game.turn:
+        return False
+    if piece.kind == KING and abs(dst - src) == 2:
+        return code in game.legal_codes()
+    if (piece.kind == PAWN and dst // 8 in (0, 7)) != bool(promotion):
+        return False
+    return bool(_sources(game, piece.kind, dst) >> src & 1) and movegen.is_safe(
+        game, code
+    )
+
+
+def san(game, move: Move) -> str:
+    """Returns the SAN of a legal move in the current game position"""
+    code = move.code
+    key = (game.zobrist_key, code)
+    text = _SAN_CACHE.get(key)
+    if text is None:
+        if not _is_legal(game, code):
+            raise InvalidNotation(str(move))
+        if len(_SAN_CACHE) >= CACHE_SIZE:
+            _SAN_CACHE.clear()
+        text = _SAN_CACHE[key] = _san(game, code)
+    return text
+
+
+def _san(game, code: int) -> str:
+    pieces = game.board._pieces
+    src = code & 63
+    dst = (code >> 6) & 63
+    kind = pieces[src].kind
+
+    if kind == KING and abs(dst - src) == 2:
+        text = "O-O" if dst > src else "O-O-O"
+    elif kind == PAWN:
+        text = ""
+        if src % 8 != dst % 8:
+            # Captures, en passant ones included, change the file
+            text = f"{_NAMES[src][0]}x"
+        text += _NAMES[dst]
+        if code >> 12:
+            text += "=" + PIECE_ABBRS[code >> 12]
+    else:
+        text = PIECE_ABBRS[kind]
+        # Other pieces of the same kind that can move to the same square
+        others = [
+            other
+            for other in iter_bits(_sources(game, kind, dst) & ~(1 << src))
+            if movegen.is_safe(game, other | dst << 6)
+        ]
+        if others:
+            if all(other % 8 != src % 8 for other in others):
+                text += _NAMES[src][0]
+            elif all(other // 8 != src // 8 for other in others):
+                text += _NAMES[src][1]
+            else:
+                text += _NAMES[src]
+        if pieces[dst] is not None:
+            text += "x"
+        text += _NAMES[dst]
+
+    game._push(code)
+    try:
+        if game.is_check():
+            text += "+" if movegen.legal_moves(game) else "#"
+    finally:
+        game.pop()
+    return text
+
+
+def parse_san(game, text: str) -> Move:
+    """Returns the legal move of the current game position described by
+    a SAN string. Check, mate and annotation suffixes are ignored.
+    """
+    key = (game.zobrist_key, text)
+    code = _MOVE_CACHE.get(key)
+    if code is None:
+        if len(_MOVE_CACHE) >= CACHE_SIZE:
+            _MOVE_CACHE.clear()
+        code = _MOVE_CACHE[key] = _parse_san(game, text)
+    return Move.from_code(code)
+
+
+def _parse_san(game, text: str) -> int:
+    stripped = text.rstrip("+#!?")
+    castling = _CASTLING.get(stripped)
+    if castling is not None:
+        king = 4 if game.turn == "white" else 60
+        code = king | (king + castling) << 6
+        if not _is_legal(game, code):
+            raise InvalidNotation(text)
+        return code
+
+    match = _SAN_RE.match(stripped)
+    if match is None:
+        raise InvalidNotation(text)
+    abbr, col, row, name, promotion = match.groups()
+    kind = PIECE_ABBRS.index(abbr) if abbr else PAWN
+    dst = (ord(name[1]) - 49) * 8 + ord(name[0]) - 97
+    if (kind == PAWN and dst // 8 in (0, 7)) != bool(promotion):
+        raise InvalidNotation(text)
+    sources = _sources(game, kind, dst)
+    if kind == PAWN:
+        # Pushes stay on the destination file, captures (given by their
+        # source file) leave it
+        if col is None:
+            sources &= FILE_A << (dst % 8)
+        elif ord(col) - 97 == dst % 8:
+            raise InvalidNotation(text)
+    if col is not None:
+        sources &= FILE_A << (ord(col) - 97)
+    if row is not None:
+        sources &= RANK_1 << 8 * (ord(row) - 49)
+    code = dst << 6 | (PIECE_ABBRS.index(promotion) << 12 if promotion else 0)
+    candidates = [
+        src | code for src in iter_bits(sources) if movegen.is_safe(game, src | code)
+    ]
+    if len(candidates) != 1:
+        # Illegal or ambiguous
+        raise InvalidNotation(text)
+    return candidates[0]
+
+
+def uci(move: Move) -> str:
+    """Returns the UCI notation of a move"""
+    return str(move)
+
+
+def parse_uci(game, text: str) -> Move:
+    """Returns the legal move of the current game position described by
+    a UCI string.
+    """
+    match = _UCI_RE.match(text)
+    if match is None:
+        raise InvalidNotation(text)
+    src, dst, promotion = match.groups()
+    code = _NAMES.index(src) | _NAMES.index(dst) << 6
+    if promotion:
+        code |= PIECE_ABBRS.index(promotion.upper()) << 12
+    if not _is_legal(game, code):
+        raise InvalidNotation(text)
+    return Move.from_code(code)
+
+
+def parse_move(game, text: str) -> Move:
+    """Returns the legal move of the current game position described by
+    either a UCI or a SAN string.
+    """
+    text = text.strip()
+    if _UCI_RE.match(text):
+        return parse_uci(game, text)
+    return parse_san(game, text)
@@ -0,0 +1,108 @@
+"""
+Perft: counts the leaf nodes of the legal moves tree up to a given
+depth. Node counts are well known for a handful of positions, so they
+validate the move generator, and timing them measures its speed.
+
+Run the benchmark with:
+
+    python -m escacs.perft [--depth N]
+
+"""
+from escacs import movegen
+from escacs.game import Game
+from typing import Dict
+from typing import NamedTuple
+
+import argparse
+import time
+
+
+class ReferencePosition(NamedTuple):
+    name: str
+    fen: str
+    nodes: Dict[int, int]
+
+
+# See https://www.chessprogramming.org/Perft_Results
+REFERENCE_POSITIONS = (
+    ReferencePosition(
+        "initial",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609},
+    ),
+    ReferencePosition(
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        {1: 48, 2: 2039, 3: 97862, 4: 4085603},
+    ),
+    ReferencePosition(
+        "position3",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624},
+    ),
+    ReferencePosition(
+        "position4",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        {1: 6, 2: 264, 3: 9467, 4: 422333},
+    ),
+    ReferencePosition(
+        "position5",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        {1: 44, 2: 1486, 3: 62379, 4: 2103487},
+    ),
+    ReferencePosition(
+        "position6",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        {1: 46, 2: 2079, 3: 89890, 4: 3894594},
+    ),
+)
+
+
+def perft(game: Game, depth: int) -> int:
+    """Number of leaf nodes of the legal moves tree of the game
+    position, depth plies deep.
+    """
+    moves = movegen.legal_moves(game)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        game._push(move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+    return nodes
+
+
+def run(depth: int) -> bool:
+    """Runs perft on all reference positions and prints the node counts
+    and speed. Returns whether all the counts were right.
+    """
+    ok = True
+    total_nodes = 0
+    total_time = 0.0
+    for position in REFERENCE_POSITIONS:
+        game = Game.from_fen(position.fen)
+        depth_ = min(depth, max(position.nodes))
+        start = time.perf_counter()
+        nodes = perft(game, depth_)
+        elapsed = time.perf_counter() - start
+        expected = position.nodes[depth_]
+        status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+        ok = ok and nodes == expected
+        total_nodes += nodes
+        total_time += elapsed
+        print(
+            f"{position.name:<10} depth {depth_}: {nodes:>9} nodes "
+            f"{elapsed:8.2f}s {nodes / elapsed:>9.0f} nodes/s  {status}"
+        )
+    print(
+        f"{'total':<10} {total_nodes:>18} nodes {total_time:8.2f}s {total_nodes / total_time:>9.0f} nodes/s"
+    )
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move generator perft benchmark")
+    parser.add_argument("--depth", type=int, default=3)
+    args = parser.parse_args()
+    exit(0 if run(args.depth) else 1)
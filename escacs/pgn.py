@@ -0,0 +1,257 @@
+"""
+PGN import and export.
+
+Games are read one at a time from a stream of lines, so archives of any
+size are processed in constant memory. Files ending in .gz or .bz2 are
+decompressed on the fly.
+
+    >>> for pgn_game in read_games("lichess_db.pgn.bz2"):
+    ...     pgn_game.headers["White"], pgn_game.result
+    ...     for move in pgn_game.moves():
+    ...         ...
+
+Only the headers are parsed when reading: the movetext of every game
+is kept as raw text, and its moves are parsed and replayed lazily, when
+iterated. Scanning headers only (see read_headers) does not even keep
+the movetext.
+
+"""
+from escacs.game import Game
+from escacs.game import STARTING_FEN
+from escacs.move import Move
+from escacs.notation import parse_san
+from escacs.notation import san
+from typing import Dict
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+import bz2
+import gzip
+import os
+import re
+
+# Tags every game is exported with, in this order
+SEVEN_TAG_ROSTER = (
+    ("Event", "?"),
+    ("Site", "?"),
+    ("Date", "????.??.??"),
+    ("Round", "?"),
+    ("White", "?"),
+    ("Black", "?"),
+    ("Result", "*"),
+)
+# Exported movetext lines are at most this long
+LINE_LENGTH = 79
+
+_HEADER_RE = re.compile(r'^\[([A-Za-z0-9_]+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_ESCAPED_RE = re.compile(r"\\(.)")
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>\{[^}]*\}|;[^\n]*)
+    | (?P<open>\()
+    | (?P<close>\))
+    | (?P<nag>\$\d+)
+    | (?P<result>1-0|0-1|1/2-1/2|\*)
+    | (?P<number>\d+\.+)
+    | (?P<san>[^\s{}();$]+)
+    """,
+    re.VERBOSE,
+)
+
+Source = Union[str, "os.PathLike[str]", IO[str]]
+
+
+def open_pgn(path: Union[str, "os.PathLike[str]"], mode: str = "r") -> IO[str]:
+    """Opens a PGN file in text mode, compressed or not depending on its
+    extension (.gz, .bz2).
+    """
+    name = os.fspath(path)
+    mode = mode.replace("t", "") + "t"
+    if name.endswith(".gz"):
+        return gzip.open(name, mode, encoding="utf-8", errors="replace")  # type: ignore
+    if name.endswith(".bz2"):
+        return bz2.open(name, mode, encoding="utf-8", errors="replace")  # type: ignore
+    return open(name, mode, encoding="utf-8", errors="replace")
+
+
+class PgnGame:
+    """
+    A game read from a PGN file.
+
+    Attributes
+    ----------
+    headers: dict
+        tag pairs of the game, e.g: {"White": "Carlsen, Magnus"}.
+    movetext: str
+        raw movetext of the game, comments and variations included.
+        None if the game was read with headers only.
+
+    """
+
+    def __init__(self, headers: Dict[str, str], movetext: Optional[str] = None):
+        self.headers = headers
+        self.movetext = movetext
+
+    def __repr__(self) -> str:
+        white = self.headers.get("White", "?")
+        black = self.headers.get("Black", "?")
+        return f"<PgnGame {white} - {black} {self.result}>"
+
+    @property
+    def result(self) -> str:
+        return self.headers.get("Result", "*")
+
+    def start(self) -> Game:
+        """Returns the game at its initial position: the one of the FEN
+        tag, if any, or the standard one.
+        """
+        fen = self.headers.get("FEN")
+        return Game.from_fen(fen) if fen else Game()
+
+    def sans(self) -> Iterator[str]:
+        """Yields the SAN of the mainline moves, without replaying them.
+        Comments, variations and annotations are skipped.
+        """
+        if not self.movetext:
+            return
+        depth = 0
+        for match in _TOKEN_RE.finditer(self.movetext):
+            kind = match.lastgroup
+            if kind == "open":
+                depth += 1
+            elif kind == "close":
+                depth -= 1
+            elif kind == "san" and not depth:
+                yield match.group()
+
+    def moves(self) -> Iterator[Move]:
+        """Yields the mainline moves, parsing them as they are replayed.
+        Raises InvalidNotation on illegal or unreadable moves.
+        """
+        game = self.start()
+        for text in self.sans():
+            move = parse_san(game, text)
+            game.push(move)
+            yield move
+
+    def game(self) -> Game:
+        """Returns the game with all its mainline moves played"""
+        game = self.start()
+        for text in self.sans():
+            game.push(parse_san(game, text))
+        return game
+
+
+def _unescape(value: str) -> str:
+    return _ESCAPED_RE.sub(r"\1", value)
+
+
+def _read(lines: Iterable[str], headers_only: bool) -> Iterator[PgnGame]:
+    headers: Dict[str, str] = {}
+    movetext: List[str] = []
+    in_movetext = False
+    for line in lines:
+        if line[:1] == "[":
+            match = _HEADER_RE.match(line)
+            if match is not None:
+                if in_movetext:
+                    # Tags after the movetext start the next game
+                    yield PgnGame(headers, None if headers_only else "".join(movetext))
+                    headers = {}
+                    movetext = []
+                    in_movetext = False
+                headers[match.group(1)] = _unescape(match.group(2))
+                continue
+        if line[:1] == "%" or not line.strip():
+            # Escaped and blank lines
+            continue
+        in_movetext = True
+        if not headers_only:
+            movetext.append(line)
+    if headers or in_movetext:
+        yield PgnGame(headers, None if headers_only else "".join(movetext))
+
+
+def read_games(source: Source, headers_only: bool = False) -> Iterator[PgnGame]:
+    """Yields the games of a PGN file, given its path or an open text
+    stream. When headers_only is set, the movetext of the games is
+    skipped without being kept.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open_pgn(source) as stream:
+            yield from _read(stream, headers_only)
+    else:
+        yield from _read(source, headers_only)
+
+
+def read_headers(source: Source) -> Iterator[Dict[str, str]]:
+    """Yields the headers of the games of a PGN file"""
+    for pgn_game in read_games(source, headers_only=True):
+        yield pgn_game.headers
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _wrap(tokens: Iterable[str]) -> Iterator[str]:
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_LENGTH:
+            yield line
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    if line:
+        yield line
+
+
+def to_pgn(game: Game, headers: Optional[Dict[str, str]] = None) -> str:
+    """Returns the PGN of a game, with its moves in SAN. The game is
+    replayed from its initial position and left as it was.
+    """
+    headers = dict(headers or {})
+    moves = list(game.moves)
+    for _ in moves:
+        game.pop()
+    fen = game.fen()
+    tokens = []
+    try:
+        for i, move in enumerate(moves):
+            if game.turn == "white":
+                tokens.append(f"{game.fullmove_number}.")
+            elif not i:
+                tokens.append(f"{game.fullmove_number}...")
+            tokens.append(san(game, move))
+            game.push(move)
+    finally:
+        # Leave the game as it was, even on illegal moves
+        pushed = len(game.moves)
+        for move in moves[pushed:]:
+            game.push(move)
+
+    tags = [(name, headers.pop(name, default)) for name, default in SEVEN_TAG_ROSTER]
+    if fen != STARTING_FEN:
+        headers.setdefault("SetUp", "1")
+        headers.setdefault("FEN", fen)
+    tags.extend(headers.items())
+    result = dict(tags)["Result"]
+    tokens.append(result)
+    lines = [f'[{name} "{_escape(value)}"]' for name, value in tags]
+    lines.append("")
+    lines.extend(_wrap(tokens))
+    return "\n".join(lines) + "\n"
+
+
+def write_game(
+    stream: IO[str], game: Game, headers: Optional[Dict[str, str]] = None
+) -> None:
+    """Writes the PGN of a game to a text stream, followed by the blank
+    line that separates games (see to_pgn).
+    """
+    stream.write(to_pgn(game, headers))
+    stream.write("\n")
@@ -1,13 +1,23 @@
 from abc import ABCMeta
 from abc import abstractmethod
+from escacs import bitboard
+from escacs.attacks import bishop_attacks
+from escacs.attacks import BISHOP_MOVES
+from escacs.attacks import KING_ATTACKS
+from escacs.attacks import KING_MOVES
+from escacs.attacks import KNIGHT_ATTACKS
+from escacs.attacks import KNIGHT_MOVES
+from escacs.attacks import PAWN_ATTACKS
+from escacs.attacks import PAWN_MOVES
+from escacs.attacks import queen_attacks
+from escacs.attacks import QUEEN_MOVES
+from escacs.attacks import rook_attacks
+from escacs.attacks import ROOK_MOVES
 from escacs.square import Square
 from escacs.types import Color
 from escacs.types import Coordinate
 from escacs.utils import get_square
-from typing import List
-from typing import Optional
-from typing import Set
-from typing import Tuple
+from typing import AbstractSet
 
 
 class Piece(metaclass=ABCMeta):
@@ -26,19 +36,16 @@ class Piece(metaclass=ABCMeta):
         object of the class Board.
     pos: Square
         object of the class Square.
-    _deltas: list
-        list of tuples which represent the sense of the directions in
-        which the piece can move. Not always used. See Pawn, Knight
-        and King pieces.
     abbr: str
         Abbreviation of the piece.
+    kind: int
+        Piece type index, as used by the board bitboards.
     points: int
         Points of the piece.
     """
 
-    # Used to compute all possible moves per piece
-    _deltas: Optional[List[Tuple[int, int]]] = None
     abbr: str = ""
+    kind: int
     points: int = 0
 
     def __init__(self, color: Color, board, pos: Coordinate):
@@ -57,34 +64,23 @@ class Piece(metaclass=ABCMeta):
         return kls_name
 
     @abstractmethod
-    def all_moves(self) -> Set[Square]:
+    def all_moves(self) -> AbstractSet[Square]:
         """Returns all possible squares of the piece given the current
         position (this includes ilegal moves too)
 
         """
         ...
 
-    def _all_moves(self) -> Set[Square]:
-        moves = set({})
-        for vector in self._deltas or []:
-            x, y = vector
-            factor = 1
-            while True:
-                col = self.pos.col
-                row = self.pos.row
-                if x != 0:
-                    col += x * factor
-                if y != 0:
-                    row += y * factor
-                factor = factor + 1
-                if not self._in_board(col, row):
-                    break
-                else:
-                    moves.update({Square(col=col, row=row)})
-        return moves
-
-    def _in_board(self, col, row) -> bool:
-        return col in range(8) and row in range(8)
+    @abstractmethod
+    def attacks(self) -> int:
+        """Returns the bitboard of squares attacked by the piece on its
+        current board, taking blocking pieces into account.
+
+        """
+        ...
+
+    def attacked_squares(self) -> AbstractSet[Square]:
+        return bitboard.to_squares(self.attacks())
 
     def move(self, pos: Coordinate) -> None:
         _pos: Square = get_square(pos)
@@ -107,30 +103,19 @@ class Pawn(Piece):
     """
 
     abbr = "P"
+    kind = bitboard.PAWN
     points = 1
 
     def init(self):
         self.direction = 1 if self.color == "white" else -1
         self.start_row = 1 if self.color == "white" else 6
+        self._color_index = bitboard.color_index(self.color)
 
-    def all_moves(self) -> Set[Square]:
-        moves = set({})
-
-        # On starting position, pawn can jump 2 squares
-        pos = self.pos
-        if pos.row == self.start_row:
-            col = pos.col
-            row = pos.row + (self.direction * 2)
-            moves.update({Square(col=col, row=row)})
-
-        # Moving one square ahead + capturing moves
-        for side in (-1, 0, 1):
-            row = pos.row + self.direction
-            col = pos.col + side
-            if self._in_board(col, row):
-                moves.update({Square(col=col, row=row)})
+    def all_moves(self) -> AbstractSet[Square]:
+        return PAWN_MOVES[self._color_index][self.pos.index]
 
-        return moves
+    def attacks(self) -> int:
+        return PAWN_ATTACKS[self._color_index][self.pos.index]
 
 
 class Knight(Piece):
@@ -139,26 +124,14 @@ class Knight(Piece):
     """
 
     abbr = "N"
+    kind = bitboard.KNIGHT
     points = 3
 
-    def all_moves(self) -> Set[Square]:
-        moves = set({})
-        for (x, y) in [
-            [1, 2],
-            [1, -2],
-            [2, 1],
-            [2, -1],
-            [-1, 2],
-            [-1, -2],
-            [-2, 1],
-            [-2, -1],
-        ]:
-            col = self.pos.col + x
-            row = self.pos.row + y
-            if not self._in_board(col, row):
-                continue
-            moves.update({Square(col=col, row=row)})
-        return moves
+    def all_moves(self) -> AbstractSet[Square]:
+        return KNIGHT_MOVES[self.pos.index]
+
+    def attacks(self) -> int:
+        return KNIGHT_ATTACKS[self.pos.index]
 
 
 class Bishop(Piece):
@@ -167,11 +140,14 @@ class Bishop(Piece):
     """
 
     abbr = "B"
+    kind = bitboard.BISHOP
     points = 3
-    _deltas = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
 
-    def all_moves(self) -> Set[Square]:
-        return self._all_moves()
+    def all_moves(self) -> AbstractSet[Square]:
+        return BISHOP_MOVES[self.pos.index]
+
+    def attacks(self) -> int:
+        return bishop_attacks(self.pos.index, self.board.occupied)
 
 
 class Rook(Piece):
@@ -180,11 +156,14 @@ class Rook(Piece):
     """
 
     abbr = "R"
+    kind = bitboard.ROOK
     points = 5
-    _deltas = [(0, 1), (0, -1), (1, 0), (-1, 0)]
 
-    def all_moves(self) -> Set[Square]:
-        return self._all_moves()
+    def all_moves(self) -> AbstractSet[Square]:
+        return ROOK_MOVES[self.pos.index]
+
+    def attacks(self) -> int:
+        return rook_attacks(self.pos.index, self.board.occupied)
 
 
 class Queen(Piece):
@@ -193,11 +172,14 @@ class Queen(Piece):
     """
 
     abbr = "Q"
+    kind = bitboard.QUEEN
     points = 9
-    _deltas = Rook._deltas + Bishop._deltas
 
-    def all_moves(self) -> Set[Square]:
-        return self._all_moves()
+    def all_moves(self) -> AbstractSet[Square]:
+        return QUEEN_MOVES[self.pos.index]
+
+    def attacks(self) -> int:
+        return queen_attacks(self.pos.index, self.board.occupied)
 
 
 class King(Piece):
@@ -206,22 +188,14 @@ class King(Piece):
     """
 
     abbr = "K"
+    kind = bitboard.KING
+
+    def all_moves(self) -> AbstractSet[Square]:
+        return KING_MOVES[self.pos.index]
+
+    def attacks(self) -> int:
+        return KING_ATTACKS[self.pos.index]
+
 
-    def all_moves(self) -> Set[Square]:
-        moves = set({})
-        for (x, y) in [
-            [1, 0],
-            [1, 1],
-            [1, -1],
-            [0, -1],
-            [0, 1],
-            [-1, 0],
-            [-1, 1],
-            [-1, -1],
-        ]:
-            col = self.pos.col + x
-            row = self.pos.row + y
-            if not self._in_board(col, row):
-                continue
-            moves.update({Square(col=col, row=row)})
-        return moves
+# Piece classes, by their kind
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
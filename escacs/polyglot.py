@@ -0,0 +1,149 @@
+"""
+Polyglot opening books.
+
+A Polyglot book (.bin) is a sequence of 16 bytes big-endian entries,
+sorted by key:
+
+- 8 bytes: Zobrist key of the position. Game.zobrist_key computes the
+  very same keys (see escacs.zobrist).
+- 2 bytes: move. Bits 0-5 hold the to square index, bits 6-11 the from
+  square index and bits 12-14 the promotion piece kind. Castling moves
+  are encoded as the king capturing its own rook, e.g: e1h1.
+- 2 bytes: weight of the move. The higher, the better.
+- 4 bytes: learning data, unused.
+
+Books are mapped in memory and binary searched, so they are not loaded
+and can be shared by several processes.
+
+    >>> with OpeningBook("performance.bin") as book:
+    ...     book.find_all(game)
+    ...     book.weighted_choice(game)
+
+Searches skip positions found in a book (see escacs.search.analyse).
+
+"""
+from escacs import movegen
+from escacs.bitboard import KING
+from escacs.exceptions import InvalidEncoding
+from escacs.move import Move
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+import mmap
+import os
+import random
+import struct
+
+_ENTRY = struct.Struct(">QHHI")
+_KEY = struct.Struct(">Q")
+ENTRY_SIZE = _ENTRY.size
+
+# King destination square of castling moves, by the king and rook
+# squares they are encoded with
+_CASTLING = {(4, 7): 6, (4, 0): 2, (60, 63): 62, (60, 56): 58}
+
+
+class BookEntry(NamedTuple):
+    move: Move
+    weight: int
+    learn: int
+
+
+class OpeningBook:
+    """
+    Read-only, memory mapped Polyglot opening book.
+
+    Attributes
+    ----------
+    path: str
+        path of the book file.
+
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size % ENTRY_SIZE:
+                raise InvalidEncoding(path)
+            # Empty files can not be mapped
+            self._mmap = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+        self._size = size // ENTRY_SIZE
+
+    def __reduce__(self):
+        # Processes map the file on their own instead of copying it
+        return (OpeningBook, (self.path,))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+
+    def _bisect(self, key: int) -> int:
+        """Index of the first entry with a key not lower than key"""
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(self._mmap, middle * ENTRY_SIZE)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find_all(self, game) -> List[BookEntry]:
+        """Returns the book entries of the game position, highest weight
+        first. Entries whose move is not legal (e.g: key collisions) are
+        skipped.
+        """
+        key = game.zobrist_key
+        legal = set(movegen.legal_moves(game))
+        pieces = game.board._pieces
+        entries = []
+        for index in range(self._bisect(key), self._size):
+            entry_key, raw, weight, learn = _ENTRY.unpack_from(
+                self._mmap, index * ENTRY_SIZE
+            )
+            if entry_key != key:
+                break
+            src = (raw >> 6) & 63
+            dst = raw & 63
+            piece = pieces[src]
+            if piece is not None and piece.kind == KING:
+                dst = _CASTLING.get((src, dst), dst)
+            code = src | dst << 6 | ((raw >> 12) & 7) << 12
+            if code in legal:
+                entries.append(BookEntry(Move.from_code(code), weight, learn))
+        entries.sort(key=lambda entry: entry.weight, reverse=True)
+        return entries
+
+    def __contains__(self, game) -> bool:
+        return bool(self.find_all(game))
+
+    def weighted_choice(
+        self, game, rng: Optional[random.Random] = None
+    ) -> Optional[Move]:
+        """Picks a book move of the game position, at random, with the
+        probabilities given by their weights. None if the position is not
+        in the book, or only with zero weight moves.
+        """
+        entries = self.find_all(game)
+        total = sum(entry.weight for entry in entries)
+        if not total:
+            return None
+        pick = (rng or random).randrange(total)
+        for entry in entries:
+            pick -= entry.weight
+            if pick < 0:
+                return entry.move
+        return None
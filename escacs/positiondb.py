@@ -0,0 +1,353 @@
+"""
+On-disk database of positions statistics.
+
+For every position (by Zobrist key, see escacs.zobrist) and move played
+from it, the database counts the games that went through them and
+their results. Games that ended in a position are counted on a null
+move (code 0).
+
+The file is a small header followed by fixed-size records, sorted by
+key and move:
+
+- header: 8 bytes magic, 8 bytes number of records.
+- record (RECORD_SIZE bytes, little-endian): 8 bytes key, 2 bytes move
+  code, 2 bytes padding, then 4 bytes each for the number of games,
+  white wins, draws and black wins. Counters saturate at 2**32 - 1.
+
+Readers map the file in memory and binary search it, so lookups only
+touch a handful of pages, whatever the size of the database, and
+several processes share the same pages through the OS page cache.
+
+    >>> with PositionDatabaseBuilder("explorer.db") as builder:
+    ...     for pgn_game in read_games("lichess_db.pgn.bz2"):
+    ...         builder.add_pgn_game(pgn_game)
+    >>> db = PositionDatabase("explorer.db")
+    >>> db.get(Game())
+    PositionStats(games=..., white=..., draws=..., black=...)
+
+Builders aggregate counts in memory, spilling sorted runs to temporary
+files when they grow past max_entries, and merge them on close.
+
+"""
+from escacs.exceptions import InvalidEncoding
+from escacs.exceptions import InvalidFen
+from escacs.exceptions import InvalidMove
+from escacs.exceptions import InvalidNotation
+from escacs.game import Game
+from escacs.move import Move
+from escacs.notation import parse_san
+from escacs.pgn import PgnGame
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b"ESCPDB\x00\x01"
+_HEADER = struct.Struct("<8sQ")
+_RECORD = struct.Struct("<QH2xIIII")
+_KEY = struct.Struct("<Q")
+_MAX_COUNT = (1 << 32) - 1
+HEADER_SIZE = _HEADER.size
+RECORD_SIZE = _RECORD.size
+
+# Index of the counter of each result, after the games one
+RESULTS = {"1-0": 1, "1/2-1/2": 2, "0-1": 3}
+
+_Entry = Tuple[int, int, int, int, int, int]
+
+
+class PositionStats(NamedTuple):
+    """Number of games that reached a position, and their results"""
+
+    games: int
+    white: int
+    draws: int
+    black: int
+
+
+class MoveStats(NamedTuple):
+    """Number of games a move was played in, and their results"""
+
+    move: Move
+    games: int
+    white: int
+    draws: int
+    black: int
+
+
+def _key(position: Union[int, Game]) -> int:
+    return position if isinstance(position, int) else position.zobrist_key
+
+
+class PositionDatabase:
+    """
+    Read-only, memory mapped position database.
+
+    Attributes
+    ----------
+    path: str
+        path of the database file.
+
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                raise InvalidEncoding(path)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._size = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or len(self._mmap) != HEADER_SIZE + self._size * RECORD_SIZE:
+            self._mmap.close()
+            raise InvalidEncoding(path)
+
+    def __reduce__(self):
+        # Pickled by path: a worker reopens (and validates) the database
+        # rather than receiving a copy of its records
+        return (PositionDatabase, (self.path,))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __enter__(self) -> "PositionDatabase":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __contains__(self, position: Union[int, Game]) -> bool:
+        key = _key(position)
+        index = self._bisect(key)
+        return index < self._size and self._key_at(index) == key
+
+    def _key_at(self, index: int) -> int:
+        return _KEY.unpack_from(self._mmap, HEADER_SIZE + index * RECORD_SIZE)[0]
+
+    def _bisect(self, key: int) -> int:
+        """Index of the first record with a key not lower than key"""
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _records(self, key: int) -> Iterator[_Entry]:
+        index = self._bisect(key)
+        offset = HEADER_SIZE + index * RECORD_SIZE
+        end = HEADER_SIZE + self._size * RECORD_SIZE
+        while offset < end:
+            record = _RECORD.unpack_from(self._mmap, offset)
+            if record[0] != key:
+                return
+            yield record
+            offset += RECORD_SIZE
+
+    def get(self, position: Union[int, Game]) -> Optional[PositionStats]:
+        """Returns the statistics of a position, given its Zobrist key or
+        a game in it, or None if it is not in the database.
+        """
+        totals = [0, 0, 0, 0]
+        found = False
+        for record in self._records(_key(position)):
+            found = True
+            for i in range(4):
+                totals[i] += record[i + 2]
+        return PositionStats(*totals) if found else None
+
+    def moves(self, position: Union[int, Game]) -> List[MoveStats]:
+        """Returns the statistics of the moves played from a position,
+        most played first.
+        """
+        stats = [
+            MoveStats(Move.from_code(record[1]), *record[2:])
+            for record in self._records(_key(position))
+            if record[1]
+        ]
+        stats.sort(key=lambda stat: stat.games, reverse=True)
+        return stats
+
+
+class PositionDatabaseBuilder:
+    """
+    Builds a position database file from games.
+
+    Attributes
+    ----------
+    path: str
+        path of the database file to write.
+    max_entries: int
+        number of (position, move) counters kept in memory before they
+        are spilled to a temporary file.
+    max_ply: int
+        only the first max_ply moves of every game are counted, if set.
+
+    """
+
+    def __init__(
+        self, path: str, max_entries: int = 1 << 20, max_ply: Optional[int] = None
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_ply = max_ply
+        self._counts: Dict[Tuple[int, int], List[int]] = {}
+        self._runs: List[BinaryIO] = []
+
+    def __enter__(self) -> "PositionDatabaseBuilder":
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def add(self, key: int, move: int, result: str) -> None:
+        """Counts a game that went through a position and move (0 if
+        the game ended there) with a result ("1-0", "0-1", "1/2-1/2" or
+        "*" if unknown).
+        """
+        counts = self._counts.get((key, move))
+        if counts is None:
+            if len(self._counts) >= self.max_entries:
+                self._spill()
+            counts = self._counts[(key, move)] = [0, 0, 0, 0]
+        counts[0] += 1
+        index = RESULTS.get(result)
+        if index is not None:
+            counts[index] += 1
+
+    def add_game(self, game: Game, result: Optional[str] = None) -> None:
+        """Counts the positions and moves of a game, from its initial
+        position. The game is left as it was.
+        """
+        result = result or "*"
+        moves = list(game.moves)
+        for _ in moves:
+            game.pop()
+        try:
+            for move in moves:
+                if self.max_ply is not None and len(game.moves) >= self.max_ply:
+                    break
+                self.add(game.zobrist_key, move.code, result)
+                game.push(move)
+            else:
+                self.add(game.zobrist_key, 0, result)
+        finally:
+            pushed = len(game.moves)
+            for move in moves[pushed:]:
+                game.push(move)
+
+    def add_pgn_game(self, pgn_game: PgnGame) -> bool:
+        """Counts the positions and moves of a game read from a PGN file.
+        The whole game is replayed first: games with an illegal move
+        (or an invalid FEN tag) are skipped, counting nothing. Returns
+        whether the game was counted.
+        """
+        entries: List[Tuple[int, int]] = []
+        try:
+            game = pgn_game.start()
+            for text in pgn_game.sans():
+                move = parse_san(game, text)
+                entries.append((game.zobrist_key, move.code))
+                game.push(move)
+        except (InvalidFen, InvalidNotation, InvalidMove):
+            return False
+        entries.append((game.zobrist_key, 0))
+        if self.max_ply is not None and len(entries) > self.max_ply + 1:
+            # Only the first moves, without the final position
+            entries = entries[: self.max_ply]  # noqa: E203
+        result = pgn_game.result
+        for key, code in entries:
+            self.add(key, code, result)
+        return True
+
+    def _spill(self) -> None:
+        """Writes the counters in memory to a sorted temporary run"""
+        run = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(self.path)))
+        run.write(
+            b"".join(
+                _pack((key, move, *counts))  # type: ignore
+                for (key, move), counts in sorted(self._counts.items())
+            )
+        )
+        run.seek(0)
+        self._runs.append(run)
+        self._counts = {}
+
+    def _merged(self) -> Iterator[_Entry]:
+        runs = [_read_run(run) for run in self._runs]
+        memory = (
+            (key, move, *counts) for (key, move), counts in sorted(self._counts.items())
+        )
+        merged: Iterator[_Entry] = heapq.merge(memory, *runs)  # type: ignore
+        current = next(merged, None)
+        if current is None:
+            return
+        for entry in merged:
+            if entry[0] == current[0] and entry[1] == current[1]:
+                # Same position and move, counted in several runs
+                current = (
+                    current[0],
+                    current[1],
+                    current[2] + entry[2],
+                    current[3] + entry[3],
+                    current[4] + entry[4],
+                    current[5] + entry[5],
+                )
+            else:
+                yield current
+                current = entry
+        yield current
+
+    def close(self) -> None:
+        """Merges all counters and writes the database file"""
+        size = 0
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, 0))
+            for entry in self._merged():
+                f.write(_pack(entry))
+                size += 1
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, size))
+        os.replace(tmp, self.path)
+        self._discard()
+
+    def _discard(self) -> None:
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._counts = {}
+
+
+def _pack(entry: _Entry) -> bytes:
+    if entry[2] > _MAX_COUNT:
+        # No result is counted more often than games
+        key, move, *counts = entry
+        return _RECORD.pack(key, move, *(min(count, _MAX_COUNT) for count in counts))
+    return _RECORD.pack(*entry)
+
+
+def _read_run(run: BinaryIO, chunk: int = 4096) -> Iterator[_Entry]:
+    unpack = _RECORD.iter_unpack
+    while True:
+        data = run.read(chunk * RECORD_SIZE)
+        if not data:
+            return
+        yield from unpack(data)
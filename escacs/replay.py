@@ -0,0 +1,184 @@
+"""
+Parallel replay of PGN archives.
+
+Every game of an archive is replayed move by move through
+Game.player_move, which validates that its moves are legal. Games are
+sharded in chunks over a pool of worker processes. Only text crosses
+process boundaries: the tags and raw movetext of the games to the
+workers, and a small ReplayResult back. Games and boards are rebuilt
+inside each worker and never pickled.
+
+    >>> for result in replay("lichess_db.pgn.bz2", workers=8):
+    ...     if result.error:
+    ...         print(result.number, result.error)
+
+Or run `python -m escacs.replay ARCHIVE [--workers N] [--chunk-size N]`.
+
+"""
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from escacs.exceptions import CheckMate
+from escacs.exceptions import Draw
+from escacs.exceptions import InvalidMove
+from escacs.exceptions import InvalidNotation
+from escacs.exceptions import Stalemate
+from escacs.notation import parse_san
+from escacs.pgn import PgnGame
+from escacs.pgn import read_games
+from escacs.pgn import Source
+from typing import Deque
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+import argparse
+import collections
+import itertools
+import os
+import sys
+import time
+
+# Games sent to a worker at once
+CHUNK_SIZE = 64
+
+# A game as sent to the workers: its number in the archive, its tags and
+# its raw movetext
+Job = Tuple[int, Dict[str, str], Optional[str]]
+
+
+class ReplayResult(NamedTuple):
+    """
+    Outcome of replaying a game.
+
+    Attributes
+    ----------
+    number: int
+        number of the game in the archive, starting at 1.
+    headers: dict
+        tags of the game.
+    moves: int
+        number of moves (plies) replayed.
+    fen: str
+        FEN of the last position reached.
+    error: str
+        why the game could not be replayed until the end, if it could not.
+    advantage: tuple
+        material advantage of white (see Game.advantage) after each move.
+
+    """
+
+    number: int
+    headers: Dict[str, str]
+    moves: int
+    fen: str
+    error: Optional[str]
+    advantage: Tuple[int, ...]
+
+
+def replay_game(pgn_game: PgnGame, number: int = 1) -> ReplayResult:
+    """Replays a game through Game.player_move"""
+    game = pgn_game.start()
+    advantage: List[int] = []
+    error = None
+    try:
+        for text in pgn_game.sans():
+            move = parse_san(game, text)
+            try:
+                game.player_move(move.from_square, move.to_square, move.promotion)
+            except (CheckMate, Stalemate, Draw):
+                # Players can play on instead of claiming a draw. After
+                # a mate or a stalemate, any move left is illegal.
+                pass
+            advantage.append(game.advantage("white"))  # type: ignore
+    except (InvalidNotation, InvalidMove):
+        dots = "." if game.turn == "white" else "..."
+        error = f"illegal move {game.fullmove_number}{dots} {text}"
+    return ReplayResult(
+        number, pgn_game.headers, len(advantage), game.fen(), error, tuple(advantage)
+    )
+
+
+def _replay_chunk(jobs: List[Job]) -> List[ReplayResult]:
+    """Worker side: replays a chunk of games"""
+    results = []
+    for number, headers, movetext in jobs:
+        try:
+            result = replay_game(PgnGame(headers, movetext), number)
+        except Exception as exc:
+            # E.g. an invalid FEN tag
+            result = ReplayResult(number, headers, 0, "", repr(exc), ())
+        results.append(result)
+    return results
+
+
+def job_chunks(games: Iterable[PgnGame], size: int) -> Iterator[List[Job]]:
+    """Yields the games as jobs for the workers, in chunks of at most
+    size games.
+    """
+    jobs = ((i, g.headers, g.movetext) for i, g in enumerate(games, 1))
+    while True:
+        chunk = list(itertools.islice(jobs, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def replay(
+    source: Source, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE
+) -> Iterator[ReplayResult]:
+    """Replays all games of a PGN archive, yielding their results in
+    archive order. Games are read lazily: only a few chunks per worker
+    are in flight at any time. With a single worker, games are replayed
+    in the current process.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = job_chunks(read_games(source), chunk_size)
+    if workers == 1:
+        for chunk in chunks:
+            yield from _replay_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending: Deque[Future] = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_replay_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay and validate PGN archives")
+    parser.add_argument("archive", help="PGN file, optionally .gz or .bz2")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--fens", action="store_true", help="print the final FEN of every game"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    games = moves = errors = 0
+    for result in replay(args.archive, args.workers, args.chunk_size):
+        games += 1
+        moves += result.moves
+        if result.error:
+            errors += 1
+            print(f"game {result.number}: {result.error}", file=sys.stderr)
+        if args.fens:
+            print(result.fen)
+    elapsed = time.perf_counter() - start
+    print(
+        f"games {games} errors {errors} moves {moves} time {elapsed:.2f}s "
+        f"games/s {games / elapsed if elapsed else 0:.0f}"
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+"""
+Move search.
+
+Iterative deepening negamax alpha-beta search, with a quiescence search
+on captures at the leaves. Searched positions are remembered in a
+fixed-size transposition table indexed by their Zobrist key, and moves
+are tried in order: the best move found for the position so far first,
+then captures (most valuable victim, least valuable attacker), killer
+moves and finally quiet moves by their history score.
+
+    >>> game = Game()
+    >>> result = analyse(game, Limit(depth=4))
+    >>> result.move, result.score, result.nps
+
+Or run `python -m escacs.search [FEN] [--depth N] [--time S] [--book BIN]`.
+
+"""
+from escacs import movegen
+from escacs.bitboard import color_index
+from escacs.evaluation import evaluate
+from escacs.move import Move
+from escacs.polyglot import OpeningBook
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+import argparse
+import time
+
+MATE = 100000
+INFINITY = 1000000
+# Scores above this one are mates, found at MATE - score plies
+MATE_THRESHOLD = MATE - 1000
+MAX_PLY = 64
+
+# Transposition table entry flags
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# How often (in nodes) the time limit is checked. The node limit is
+# checked on every node
+CHECK_EVERY = 1024
+
+
+class Limit(NamedTuple):
+    """Search limits. The search stops at whichever comes first."""
+
+    depth: Optional[int] = None
+    nodes: Optional[int] = None
+    time: Optional[float] = None
+
+
+class SearchResult(NamedTuple):
+    """
+    Outcome of a search.
+
+    Attributes
+    ----------
+    move: Move
+        best move found, if there is any legal move.
+    score: int
+        score of the position, in centipawns, from the point of view
+        of the side to move.
+    depth: int
+        depth of the last completed iteration.
+    nodes: int
+        number of positions visited.
+    time: float
+        elapsed time, in seconds.
+    pv: list
+        principal variation: best line of play found.
+
+    """
+
+    move: Optional[Move]
+    score: int
+    depth: int
+    nodes: int
+    time: float
+    pv: List[Move]
+
+    @property
+    def nps(self) -> float:
+        """Nodes searched per second"""
+        return self.nodes / self.time if self.time else 0.0
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of searched positions, indexed by the low
+    bits of their Zobrist key.
+
+    An entry is replaced when the new one comes from a deeper search,
+    when it belongs to the same position or when it was stored by an
+    older search (see new_search).
+
+    Entries are (key, depth, score, flag, move, age) tuples.
+
+    """
+
+    def __init__(self, size: int = 1 << 18):
+        # Round size to a power of 2, so that indexing is a mask
+        size = 1 << max(size - 1, 1).bit_length()
+        self._mask = size - 1
+        self._entries: List[Optional[Tuple[int, int, int, int, int, int]]] = [
+            None
+        ] * size
+        self.age = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def new_search(self) -> None:
+        self.age += 1
+
+    def clear(self) -> None:
+        self._entries = [None] * len(self._entries)
+
+    def get(self, key: int) -> Optional[Tuple[int, int, int, int, int, int]]:
+        entry = self._entries[key & self._mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: int) -> None:
+        index = key & self._mask
+        entry = self._entries[index]
+        if (
+            entry is None
+            or entry[0] == key
+            or entry[5] != self.age
+            or depth >= entry[1]
+        ):
+            self._entries[index] = (key, depth, score, flag, move, self.age)
+
+
+class _Abort(Exception):
+    """Raised when the search hits its time or nodes limit"""
+
+
+class Searcher:
+    """
+    Searches the best move of a game position. The game is explored in
+    place, with push and pop, and left as it was.
+
+    Attributes
+    ----------
+    game: Game
+        game to search.
+    table: TranspositionTable
+        positions already searched. Can be shared by several searches.
+    killers: list
+        per ply, the last two quiet moves that caused a beta cutoff.
+    history: list
+        per side to move and from/to squares, how good quiet moves have
+        proven in the search so far.
+
+    """
+
+    def __init__(self, game, table: Optional[TranspositionTable] = None):
+        self.game = game
+        self.table = table if table is not None else TranspositionTable()
+        self.killers: List[List[int]] = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.history: List[List[int]] = [[0] * 4096, [0] * 4096]
+        self.nodes = 0
+        self._max_nodes: Optional[int] = None
+        self._deadline: Optional[float] = None
+        self._root_move = 0
+
+    def search(self, limit: Limit = Limit(depth=4)) -> SearchResult:
+        start = time.perf_counter()
+        self.nodes = 0
+        self._max_nodes = limit.nodes
+        self._deadline = start + limit.time if limit.time is not None else None
+        self.table.new_search()
+        max_depth = min(limit.depth or MAX_PLY, MAX_PLY)
+
+        best: Optional[int] = None
+        score = 0
+        depth = 0
+        for current in range(1, max_depth + 1):
+            try:
+                iteration_score = self._negamax(current, -INFINITY, INFINITY, 0)
+            except _Abort:
+                break
+            score = iteration_score
+            depth = current
+            best = self._root_move or best
+            if abs(score) >= MATE_THRESHOLD:
+                # Forced mate found: searching deeper will not change it
+                break
+
+        if best is None:
+            # Not even the first iteration finished: any legal move
+            moves = movegen.legal_moves(self.game)
+            best = moves[0] if moves else None
+        pv = self._principal_variation(best, depth)
+        return SearchResult(
+            pv[0] if pv else None,
+            score,
+            depth,
+            self.nodes,
+            time.perf_counter() - start,
+            pv,
+        )
+
+    def _principal_variation(self, best: Optional[int], depth: int) -> List[Move]:
+        """Follows the best moves stored in the transposition table"""
+        game = self.game
+        pv: List[Move] = []
+        move = best
+        while move and len(pv) < max(depth, 1) and move in movegen.legal_moves(game):
+            game._push(move)
+            pv.append(Move.from_code(move))
+            entry = self.table.get(game.zobrist_key)
+            move = entry[4] if entry is not None else None
+        for _ in pv:
+            game.pop()
+        return pv
+
+    def _count_node(self) -> None:
+        self.nodes += 1
+        if self._max_nodes is not None and self.nodes >= self._max_nodes:
+            raise _Abort()
+        if (
+            self.nodes % CHECK_EVERY == 0
+            and self._deadline is not None
+            and time.perf_counter() >= self._deadline
+        ):
+            raise _Abort()
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        game = self.game
+        if depth <= 0:
+            return self._quiescence(alpha, beta, ply)
+        self._count_node()
+
+        if ply and game.halfmove_clock >= 100:
+            return 0
+
+        key = game.zobrist_key
+        tt_move = 0
+        entry = self.table.get(key)
+        if entry is not None:
+            tt_move = entry[4]
+            if ply and entry[1] >= depth:
+                tt_score = _score_from_table(entry[2], ply)
+                flag = entry[3]
+                if flag == EXACT:
+                    return tt_score
+                if flag == LOWER and tt_score >= beta:
+                    return tt_score
+                if flag == UPPER and tt_score <= alpha:
+                    return tt_score
+
+        moves = movegen.legal_moves(game)
+        if not moves:
+            return -MATE + ply if game.is_check() else 0
+
+        board_pieces = game.board._pieces
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        us = color_index(game.turn)
+        for move in self._order(moves, tt_move, ply):
+            is_quiet = board_pieces[(move >> 6) & 63] is None and not move >> 12
+            game._push(move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if is_quiet:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[us][move & 4095] += depth * depth
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, depth, _score_to_table(best_score, ply), flag, best_move)
+        if not ply:
+            self._root_move = best_move
+        return best_score
+
+    def _quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        """Only searches captures and promotions, until the position is
+        quiet, so that leaves are not evaluated in the middle of an
+        exchange.
+        """
+        self._count_node()
+        game = self.game
+        stand_pat = evaluate(game)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        board_pieces = game.board._pieces
+        ep_square = game.ep_square
+        ep = ep_square.index if ep_square is not None else -1
+        captures = [
+            move
+            for move in movegen.legal_moves(game)
+            if board_pieces[(move >> 6) & 63] is not None
+            or move >> 12
+            or (move >> 6) & 63 == ep
+        ]
+        for move in self._order(captures, 0, ply):
+            game._push(move)
+            try:
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _order(self, moves: List[int], tt_move: int, ply: int) -> List[int]:
+        """Sorts moves, most promising first"""
+        board_pieces = self.game.board._pieces
+        killers = self.killers[ply] if ply <= MAX_PLY else [0, 0]
+        history = self.history[color_index(self.game.turn)]
+
+        def priority(move: int) -> int:
+            if move == tt_move:
+                return 1 << 30
+            victim = board_pieces[(move >> 6) & 63]
+            if victim is not None:
+                attacker = board_pieces[move & 63]
+                # MVV-LVA: most valuable victim, least valuable attacker
+                return (1 << 28) + victim.kind * 8 - attacker.kind  # type: ignore
+            if move >> 12:
+                return (1 << 28) + (move >> 12)
+            if move == killers[0]:
+                return 1 << 27
+            if move == killers[1]:
+                return (1 << 27) - 1
+            return history[move & 4095]
+
+        return sorted(moves, key=priority, reverse=True)
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    """Mate scores are stored relative to the position, not the root"""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def analyse(
+    game,
+    limit: Limit = Limit(depth=4),
+    table: Optional[TranspositionTable] = None,
+    book: Optional[OpeningBook] = None,
+) -> SearchResult:
+    """Searches the best move of the game position within limit. Positions
+    found in the opening book, if any, are not searched: one of their
+    book moves is returned instead, with depth 0.
+    """
+    if book is not None:
+        move = book.weighted_choice(game)
+        if move is not None:
+            return SearchResult(move, 0, 0, 0, 0.0, [move])
+    return Searcher(game, table).search(limit)
+
+
+if __name__ == "__main__":
+    from escacs.game import Game
+
+    parser = argparse.ArgumentParser(description="Search the best move of a position")
+    parser.add_argument("fen", nargs="?", default=None)
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--nodes", type=int, default=None)
+    parser.add_argument("--time", type=float, default=None)
+    parser.add_argument("--book", default=None, help="Polyglot opening book")
+    args = parser.parse_args()
+    game = Game.from_fen(args.fen) if args.fen else Game()
+    limit = Limit(args.depth, args.nodes, args.time)
+    if limit == Limit():
+        limit = Limit(depth=4)
+    book = OpeningBook(args.book) if args.book else None
+    result = analyse(game, limit, book=book)
+    print(
+        f"bestmove {result.move} score {result.score} depth {result.depth} "
+        f"nodes {result.nodes} time {result.time:.2f}s nps {result.nps:.0f} "
+        f"pv {' '.join(str(move) for move in result.pv)}"
+    )
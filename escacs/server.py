@@ -0,0 +1,329 @@
+"""
+Game server.
+
+Hosts any number of games at once, one per connection, over TCP or
+stdin/stdout, with a UCI-like line protocol. Commands:
+
+- uci: identifies the server, answers "uciok".
+- isready: answers "readyok".
+- ucinewgame: starts a new game from the initial position.
+- position startpos|fen FEN [moves M1 M2 ...]: sets up a position.
+- move M: plays a move, in UCI or SAN notation. Answers "ok UCI" and,
+  if the game ended, "result 1-0|0-1|1/2-1/2 REASON".
+- legal: answers "legal M1 M2 ...", the legal moves in UCI notation.
+- fen: answers "fen FEN", the current position.
+- go [depth N] [nodes N] [movetime MS]: searches the current position
+  and answers "info ..." and "bestmove M" (or "bestmove (none)").
+- quit: closes the session.
+
+Errors are answered with "error MESSAGE" and leave the game as it was.
+They never end the session, not even unexpected ones.
+
+Connections are served by a single event loop, which only ever parses
+and validates moves. Searches run in a pool of worker processes, so
+that no session waits on another one's search.
+
+    $ python -m escacs.server --port 4000 --workers 4
+    $ python -m escacs.server --stdio
+
+"""
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from escacs.exceptions import CheckMate
+from escacs.exceptions import Draw
+from escacs.exceptions import InvalidFen
+from escacs.exceptions import InvalidMove
+from escacs.exceptions import InvalidNotation
+from escacs.exceptions import Stalemate
+from escacs.game import Game
+from escacs.notation import parse_move
+from escacs.polyglot import OpeningBook
+from escacs.search import analyse
+from escacs.search import Limit
+from escacs.search import MATE
+from escacs.search import MATE_THRESHOLD
+from escacs.search import TranspositionTable
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import argparse
+import asyncio
+import sys
+
+NAME = "escacs"
+DEFAULT_DEPTH = 4
+
+# Search outcome, as sent back by the workers: best move, score, depth,
+# nodes, time and principal variation, moves in UCI notation
+_Outcome = Tuple[Optional[str], int, int, int, float, List[str]]
+
+# Per worker process state: opening book and transposition table, shared
+# by all the searches it runs
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(book: Optional[str]) -> None:
+    _WORKER["book"] = OpeningBook(book) if book else None
+
+
+def _search(fen: str, limit: Limit) -> _Outcome:
+    """Worker side: searches a position, given by its FEN"""
+    table = _WORKER.get("table")
+    if table is None:
+        table = _WORKER["table"] = TranspositionTable()
+    result = analyse(Game.from_fen(fen), limit, table, _WORKER.get("book"))
+    return (
+        str(result.move) if result.move is not None else None,
+        result.score,
+        result.depth,
+        result.nodes,
+        result.time,
+        [str(move) for move in result.pv],
+    )
+
+
+def _score(score: int) -> str:
+    """UCI score: in centipawns, or in moves to mate"""
+    if score >= MATE_THRESHOLD:
+        return f"mate {(MATE - score + 1) // 2}"
+    if score <= -MATE_THRESHOLD:
+        return f"mate -{(MATE + score) // 2}"
+    return f"cp {score}"
+
+
+def _limit(args: List[str]) -> Limit:
+    options = dict(zip(args[::2], (int(value) for value in args[1::2])))
+    if set(options) - {"depth", "nodes", "movetime"}:
+        raise ValueError(args)
+    movetime = options.get("movetime")
+    limit = Limit(
+        options.get("depth"),
+        options.get("nodes"),
+        movetime / 1000 if movetime is not None else None,
+    )
+    return limit if limit != Limit() else Limit(depth=DEFAULT_DEPTH)
+
+
+class Session:
+    """
+    A game played over the line protocol.
+
+    Attributes
+    ----------
+    game: Game
+        the game of the session.
+    executor: Executor
+        where searches run. The default executor of the event loop
+        if None.
+
+    """
+
+    def __init__(self, executor: Optional[Executor] = None):
+        self.game = Game()
+        self.executor = executor
+        self.closed = False
+
+    async def handle(self, line: str) -> List[str]:
+        """Runs a command and returns its answer lines"""
+        words = line.split()
+        if not words:
+            return []
+        command, args = words[0], words[1:]
+        if command == "go":
+            try:
+                limit = _limit(args)
+            except ValueError:
+                return [f"error invalid limit {' '.join(args)}"]
+            return await self._go(limit)
+        handler = self._COMMANDS.get(command)
+        if handler is None:
+            return [f"error unknown command {command}"]
+        return handler(self, args)
+
+    def _uci(self, args: List[str]) -> List[str]:
+        return [f"id name {NAME}", "uciok"]
+
+    def _isready(self, args: List[str]) -> List[str]:
+        return ["readyok"]
+
+    def _new_game(self, args: List[str]) -> List[str]:
+        self.game = Game()
+        return []
+
+    def _position(self, args: List[str]) -> List[str]:
+        if "moves" in args:
+            end = args.index("moves")
+            moves = args[end + 1 :]  # noqa: E203
+            args = args[:end]
+        else:
+            moves = []
+        try:
+            if args == ["startpos"]:
+                game = Game()
+            elif args[:1] == ["fen"]:
+                game = Game.from_fen(" ".join(args[1:]))
+            else:
+                return [f"error invalid position {' '.join(args)}"]
+        except InvalidFen as exc:
+            return [f"error invalid fen {exc.fen}"]
+        for text in moves:
+            try:
+                _play(game, text)
+            except (InvalidNotation, InvalidMove):
+                return [f"error illegal move {text}"]
+        self.game = game
+        return []
+
+    def _move(self, args: List[str]) -> List[str]:
+        if len(args) != 1:
+            return ["error move expects a single move"]
+        try:
+            move, result = _play(self.game, args[0])
+        except (InvalidNotation, InvalidMove):
+            return [f"error illegal move {args[0]}"]
+        return [f"ok {move}"] + ([f"result {result}"] if result else [])
+
+    def _legal(self, args: List[str]) -> List[str]:
+        return [" ".join(["legal"] + [str(move) for move in self.game.legal_moves()])]
+
+    def _fen(self, args: List[str]) -> List[str]:
+        return [f"fen {self.game.fen()}"]
+
+    def _quit(self, args: List[str]) -> List[str]:
+        self.closed = True
+        return []
+
+    async def _go(self, limit: Limit) -> List[str]:
+        loop = asyncio.get_running_loop()
+        try:
+            move, score, depth, nodes, time, pv = await loop.run_in_executor(
+                self.executor, _search, self.game.fen(), limit
+            )
+        except Exception as exc:
+            return [f"error search failed {exc!r}"]
+        return [
+            f"info depth {depth} score {_score(score)} nodes {nodes} "
+            f"time {int(time * 1000)} pv {' '.join(pv)}".rstrip(),
+            f"bestmove {move or '(none)'}",
+        ]
+
+    _COMMANDS: Dict[str, Callable[["Session", List[str]], List[str]]] = {
+        "uci": _uci,
+        "isready": _isready,
+        "ucinewgame": _new_game,
+        "position": _position,
+        "move": _move,
+        "legal": _legal,
+        "fen": _fen,
+        "quit": _quit,
+    }
+
+
+def _play(game: Game, text: str) -> Tuple[str, Optional[str]]:
+    """Plays a move given in UCI or SAN notation. Returns it in UCI
+    notation, and how the game ended, if it did.
+    """
+    move = parse_move(game, text)
+    result = None
+    try:
+        game.player_move(move.from_square, move.to_square, move.promotion)
+    except CheckMate as exc:
+        result = f"{'1-0' if exc.color == 'white' else '0-1'} checkmate"
+    except Stalemate:
+        result = "1/2-1/2 stalemate"
+    except Draw:
+        result = "1/2-1/2 draw"
+    return str(move), result
+
+
+async def _serve(
+    readline: Callable[[], Awaitable[bytes]],
+    write: Callable[[List[str]], Awaitable[None]],
+    executor: Optional[Executor],
+) -> None:
+    session = Session(executor)
+    while not session.closed:
+        line = await readline()
+        if not line:
+            return
+        text = line.decode("utf-8", errors="replace")
+        try:
+            answers = await session.handle(text)
+        except Exception as exc:
+            # A failing command does not end the session
+            answers = [f"error {text.strip()} failed {exc!r}"]
+        await write(answers)
+
+
+async def serve_tcp(
+    host: str, port: int, executor: Optional[Executor] = None
+) -> asyncio.AbstractServer:
+    """Starts serving a session per TCP connection"""
+
+    async def client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def write(lines: List[str]) -> None:
+            writer.write("".join(f"{line}\n" for line in lines).encode())
+            await writer.drain()
+
+        try:
+            await _serve(reader.readline, write, executor)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(client, host, port)
+
+
+async def serve_stdio(executor: Optional[Executor] = None) -> None:
+    """Serves a single session over stdin and stdout"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+    )
+
+    async def write(lines: List[str]) -> None:
+        for line in lines:
+            print(line, flush=True)
+
+    await _serve(reader.readline, write, executor)
+
+
+async def _main(args: argparse.Namespace, executor: Executor) -> None:
+    if args.stdio:
+        await serve_stdio(executor)
+        return
+    server = await serve_tcp(args.host, args.port, executor)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve games over a UCI-like protocol")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument(
+        "--stdio", action="store_true", help="serve a single game over stdin/stdout"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="search processes")
+    parser.add_argument("--book", default=None, help="Polyglot opening book")
+    args = parser.parse_args(argv)
+
+    with ProcessPoolExecutor(
+        args.workers, initializer=_init_worker, initargs=(args.book,)
+    ) as executor:
+        try:
+            asyncio.run(_main(args, executor))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from .exceptions import InvalidSquare
+from typing import Dict
 from typing import Optional
 from typing import Tuple
 from typing import Union
@@ -8,42 +9,72 @@ class Square:
     """This represents a board square. Translates from/to matrix
     coordinates and chess notation.
 
+    Squares are immutable and interned: there are only 64 instances,
+    built once at import time (see SQUARES), and constructing a square
+    just looks up the right one. They can be safely used as dict keys
+    and compared by identity.
+
     Attributes
     ----------
     row: int
        number of the Square's row. row in {0, ..., 7}
     col: int
        number of the Square's column. col in {0, ..., 7}
+    index: int
+       bit index of the square in a bitboard. index in {0, ..., 63}
+       (a1=0, h1=7, h8=63)
 
     """
 
-    def __init__(
-        self,
-        pos: Optional[Union[str, Tuple[int, int]]] = None,
+    __slots__ = ("row", "col", "index", "_name")
+
+    row: int
+    col: int
+    index: int
+    _name: str
+
+    def __new__(
+        cls,
+        pos: Optional[Union[str, int, Tuple[int, int]]] = None,
         col: Optional[int] = None,
         row: Optional[int] = None,
-    ):
+    ) -> "Square":
         if pos is not None:
             if isinstance(pos, str):
-                col, row = _from_string(pos)
-            else:
-                col, row = pos
+                square = _BY_NAME.get(pos)
+                if square is None:
+                    raise InvalidSquare(pos)
+                return square
+            if isinstance(pos, int):
+                if 0 <= pos < 64:
+                    return SQUARES[pos]
+                raise InvalidSquare(pos)
+            col, row = pos
         else:
             col = col or 0
             row = row or 0
-        if row not in range(8) or col not in range(8):
+        square = _BY_COORDS.get((col, row))
+        if square is None:
             raise InvalidSquare((row, col))
-        self.row = row
-        self.col = col
+        return square
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __reduce__(self):
+        # Keep squares interned across copies and pickling
+        return (Square, (self.index,))
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}("{self}")'
 
     def __eq__(self, other) -> bool:
-        return self.row == other.row and self.col == other.col
+        if isinstance(other, Square):
+            return self.index == other.index
+        return NotImplemented
 
     def __hash__(self):
-        return hash(repr(self))
+        return self.index
 
     @property
     def color(self) -> str:
@@ -56,24 +87,19 @@ class Square:
         Translates matrix position to chess coordinates
         Square(row=0, col=0) --> a1'
         """
-        try:
-            col = "abcdefgh"[self.col]
-            row = range(1, 9)[self.row]
-            return "".join([col, str(row)])
-        except KeyError:
-            raise InvalidSquare((self.col, self.row))
+        return self._name
 
 
-def _from_string(pos: str) -> Tuple[int, int]:
-    """
-    Translates chess coordinates to a matrix position
-    'a1' --> Square(row=0, col=0)
-    """
-    if len(pos) != 2:
-        raise InvalidSquare(pos)
-    try:
-        col = "abcdefgh".index(pos[0])
-        row = range(1, 9).index(int(pos[1]))
-        return col, row
-    except ValueError:
-        raise InvalidSquare(pos)
+def _build_square(index: int) -> Square:
+    square = object.__new__(Square)
+    col, row = index % 8, index // 8
+    object.__setattr__(square, "col", col)
+    object.__setattr__(square, "row", row)
+    object.__setattr__(square, "index", index)
+    object.__setattr__(square, "_name", f"{'abcdefgh'[col]}{row + 1}")
+    return square
+
+
+SQUARES: Tuple[Square, ...] = tuple(_build_square(index) for index in range(64))
+_BY_NAME: Dict[str, Square] = {str(sq): sq for sq in SQUARES}
+_BY_COORDS: Dict[Tuple[int, int], Square] = {(sq.col, sq.row): sq for sq in SQUARES}
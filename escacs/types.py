@@ -1,5 +1,6 @@
 from enum import Enum
 from escacs.square import Square
+from typing import Tuple
 from typing import Union
 
 
@@ -8,4 +9,5 @@ class Color(str, Enum):
     black = "black"
 
 
-Coordinate = Union[str, Square]
+# A square, its chess notation ("e4"), its index or its (col, row) tuple
+Coordinate = Union[str, Square, int, Tuple[int, int]]
@@ -3,6 +3,9 @@ from escacs.types import Coordinate
 
 
 def get_square(pos: Coordinate) -> Square:
-    if isinstance(pos, str):
-        return Square(pos)  # type: ignore
-    return pos
+    """Returns the (interned) square for a coordinate: either a square,
+    its chess notation ("e4"), its (col, row) tuple or its index.
+    """
+    if pos.__class__ is Square:
+        return pos  # type: ignore
+    return Square(pos)  # type: ignore
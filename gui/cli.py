@@ -2,13 +2,14 @@ from escacs.board import Board
 from escacs.exceptions import CheckMate
 from escacs.exceptions import Draw
 from escacs.exceptions import InvalidMove
-from escacs.exceptions import InvalidSquare
+from escacs.exceptions import InvalidNotation
 from escacs.exceptions import Stalemate
 from escacs.game import Game
+from escacs.move import Move
+from escacs.notation import parse_move
 from escacs.square import Square
 from escacs.types import Color
 from typing import Optional
-from typing import Tuple
 
 import os
 
@@ -39,21 +40,20 @@ class ChessConsoleGUI:
         self.get_and_move()
 
     def get_and_move(self):
-        _from, _to = self.get_move()
+        move = self.get_move()
         try:
-            self.game.player_move(_from, _to)
+            self.game.player_move(move.from_square, move.to_square, move.promotion)
         except InvalidMove:
             print("Invalid move! Try again...")
             self.get_and_move()
 
-    def get_move(self) -> Tuple[Square, Square]:
-        move = input(f"[{self.game.turn}] >>> ")
-        if move == "exit":
+    def get_move(self) -> Move:
+        text = input(f"[{self.game.turn}] >>> ")
+        if text == "exit":
             raise KeyboardInterrupt
         try:
-            assert len(move) == 4
-            return Square(move[:2]), Square(move[2:])
-        except (AssertionError, InvalidSquare):
+            return parse_move(self.game, text)
+        except InvalidNotation:
             print("Invalid move! Try again...")
             return self.get_move()
 
@@ -114,7 +114,7 @@ if __name__ == "__main__":
     print("Welcome to escacs!")
     print("=" * 18)
     print()
-    print("State a move in coordinates notation (e.g. a3b4). 'exit' to leave")
+    print("State a move in SAN (e.g. Nf3) or coordinates (e.g. g1f3). 'exit' to leave")
     input("Press any key to start playing...")
     game = Game()
     run(game)
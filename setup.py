@@ -27,5 +27,5 @@ setup(
     include_package_data=True,
     packages=["escacs"],
     install_requires=["zope.interface"],
-    extras_require={"test": ["pytest"]},
+    extras_require={"numpy": ["numpy>=1.22"], "test": ["pytest"]},
 )
@@ -0,0 +1,113 @@
+from escacs.attacks import _sliding_attacks
+from escacs.attacks import BETWEEN
+from escacs.attacks import BETWEEN_SQUARES
+from escacs.attacks import bishop_attacks
+from escacs.attacks import BISHOP_DELTAS
+from escacs.attacks import KING_ATTACKS
+from escacs.attacks import KNIGHT_ATTACKS
+from escacs.attacks import PATHS
+from escacs.attacks import PAWN_ATTACKS
+from escacs.attacks import PAWN_PUSHES
+from escacs.attacks import queen_attacks
+from escacs.attacks import rook_attacks
+from escacs.attacks import ROOK_DELTAS
+from escacs.bitboard import bit
+from escacs.bitboard import BLACK
+from escacs.bitboard import popcount
+from escacs.bitboard import to_squares
+from escacs.bitboard import WHITE
+from escacs.board import Board
+from escacs.pieces import Pawn
+from escacs.pieces import Rook
+from escacs.square import Square
+
+import random
+import unittest
+
+
+def squares(*names):
+    return frozenset(Square(name) for name in names)
+
+
+class TestLeaperAttacks(unittest.TestCase):
+    def test_knight(self):
+        self.assertEqual(
+            to_squares(KNIGHT_ATTACKS[Square("a1").index]), squares("b3", "c2")
+        )
+        self.assertEqual(popcount(KNIGHT_ATTACKS[Square("d4").index]), 8)
+
+    def test_king(self):
+        self.assertEqual(
+            to_squares(KING_ATTACKS[Square("h8").index]), squares("g8", "g7", "h7")
+        )
+        self.assertEqual(popcount(KING_ATTACKS[Square("e4").index]), 8)
+
+
+class TestPawnTables(unittest.TestCase):
+    def test_white(self):
+        e2 = Square("e2").index
+        self.assertEqual(to_squares(PAWN_PUSHES[WHITE][e2]), squares("e3", "e4"))
+        self.assertEqual(to_squares(PAWN_ATTACKS[WHITE][e2]), squares("d3", "f3"))
+        self.assertEqual(PAWN_PUSHES[WHITE][Square("e8").index], 0)
+
+    def test_black(self):
+        a7 = Square("a7").index
+        self.assertEqual(to_squares(PAWN_PUSHES[BLACK][a7]), squares("a6", "a5"))
+        self.assertEqual(to_squares(PAWN_ATTACKS[BLACK][a7]), squares("b6"))
+
+
+class TestSlidingAttacks(unittest.TestCase):
+    def test_matches_ray_walking(self):
+        rand = random.Random(0)
+        for index in range(64):
+            for _ in range(20):
+                occupied = rand.getrandbits(64) & rand.getrandbits(64)
+                self.assertEqual(
+                    rook_attacks(index, occupied),
+                    _sliding_attacks(index, occupied, ROOK_DELTAS),
+                )
+                self.assertEqual(
+                    bishop_attacks(index, occupied),
+                    _sliding_attacks(index, occupied, BISHOP_DELTAS),
+                )
+
+    def test_blockers(self):
+        d4 = Square("d4").index
+        occupied = bit(Square("d6").index) | bit(Square("f4").index)
+        self.assertEqual(
+            to_squares(rook_attacks(d4, occupied)),
+            squares("d5", "d6", "e4", "f4", "d3", "d2", "d1", "c4", "b4", "a4"),
+        )
+        occupied = bit(Square("b2").index)
+        self.assertEqual(
+            to_squares(bishop_attacks(Square("a1").index, occupied)), squares("b2")
+        )
+        self.assertEqual(
+            queen_attacks(d4, occupied),
+            rook_attacks(d4, occupied) | bishop_attacks(d4, occupied),
+        )
+
+    def test_piece_attacks(self):
+        b = Board()
+        rook = Rook("white", board=b, pos="a1")
+        b["a1"] = rook
+        b["a3"] = Pawn("black", board=b, pos="a3")
+        self.assertIn(Square("a3"), rook.attacked_squares())
+        self.assertNotIn(Square("a4"), rook.attacked_squares())
+        self.assertEqual(len(rook.all_moves()), 14)
+
+
+class TestBetweenTables(unittest.TestCase):
+    def test_matches_bitboards(self):
+        for a in range(64):
+            for b in range(64):
+                squares = BETWEEN_SQUARES[a][b]
+                self.assertEqual(frozenset(squares), to_squares(BETWEEN[a][b]))
+                path = PATHS[a][b]
+                if path:
+                    self.assertEqual(path, squares + (Square(b),))
+                    # In order, away from a
+                    distances = [
+                        max(abs(s.col - a % 8), abs(s.row - a // 8)) for s in path
+                    ]
+                    self.assertEqual(distances, list(range(1, len(path) + 1)))
@@ -0,0 +1,162 @@
+from escacs import movegen
+from escacs.bitboard import BLACK
+from escacs.bitboard import color_index
+from escacs.bitboard import piece_index
+from escacs.bitboard import WHITE
+from escacs.encoding import encode_positions
+from escacs.exceptions import CheckMate
+from escacs.exceptions import Draw
+from escacs.exceptions import InvalidEncoding
+from escacs.exceptions import InvalidFen
+from escacs.exceptions import Stalemate
+from escacs.game import Game
+from escacs.game import STARTING_FEN
+
+import pytest
+import random
+import unittest
+
+np = pytest.importorskip("numpy")
+
+from escacs import batch  # noqa: E402 isort:skip
+
+
+def _random_games(count, seed=7):
+    """Positions reached by random play"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Game()
+        for _ in range(rng.randrange(60)):
+            moves = game.legal_moves()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            try:
+                game.player_move(move.from_square, move.to_square, move.promotion)
+            except (CheckMate, Stalemate, Draw):
+                break
+        games.append(game)
+    return games
+
+
+def _mobility(game):
+    """Pseudo-legal moves of the side to move, without castling nor en
+    passant, promotions counted once
+    """
+    moves = set()
+    ep = game.ep_square.index if game.ep_square is not None else None
+    for code in movegen.pseudo_legal_moves(game):
+        src, dst = code & 63, code >> 6 & 63
+        piece = game.board._pieces[src]
+        if piece.kind == 5 and abs(src - dst) == 2:
+            continue
+        if piece.kind == 0 and dst == ep:
+            continue
+        moves.add((src, dst))
+    return len(moves)
+
+
+class TestToArrays(unittest.TestCase):
+    def _makeOne(self, positions):
+        return batch.to_arrays(positions)
+
+    def test_sources(self):
+        games = _random_games(20)
+        expected = self._makeOne(games)
+        for positions in (
+            [game.fen() for game in games],
+            encode_positions(games),
+            expected,
+        ):
+            arrays = self._makeOne(positions)
+            for name in ("bitboards", "turn", "castling", "ep"):
+                np.testing.assert_array_equal(
+                    getattr(arrays, name), getattr(expected, name), name
+                )
+        for i, game in enumerate(games):
+            self.assertEqual(list(expected.bitboards[i]), game.board._bitboards)
+
+    def test_fen(self):
+        arrays = self._makeOne(
+            [
+                STARTING_FEN,
+                "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1",
+                "4k3/8/8/8/8/8/8/4K3 b - e3 0 1",
+                "4k3/8/8/8/8/8/3PQ3/4K3 w K e3 0 1",
+            ]
+        )
+        np.testing.assert_array_equal(arrays.turn, [WHITE, WHITE, BLACK, WHITE])
+        np.testing.assert_array_equal(arrays.castling, [15, 0, 0, 0])
+        # The en passant square is only kept if a pawn can capture
+        np.testing.assert_array_equal(arrays.ep, [-1, 43, -1, -1])
+        with self.assertRaises(InvalidFen):
+            self._makeOne(["8/8 w"])
+        for fen in (
+            "8/8/8/8/8/8/8/7X w - - 0 1",
+            "8/8/8 w - - 0 1",
+            "7K9/8/8/8/8/8/8/8 w - - 0 1",
+            "8/8/8/8/8/8/8/\u0667 w - - 0 1",
+        ):
+            with self.assertRaises(InvalidFen):
+                self._makeOne([fen])
+
+    def test_bitboards(self):
+        bitboards = np.array([Game().board._bitboards], dtype=np.uint64)
+        arrays = self._makeOne(bitboards)
+        self.assertIs(arrays.bitboards.dtype, np.dtype(np.uint64))
+        np.testing.assert_array_equal(arrays.ep, [-1])
+        with self.assertRaises(ValueError):
+            self._makeOne(np.zeros((2, 6), dtype=np.uint64))
+
+    def test_invalid_packed(self):
+        with self.assertRaises(InvalidEncoding):
+            self._makeOne(b"\x00" * 33)
+
+    def test_planes(self):
+        games = _random_games(5)
+        bitboards = self._makeOne(games).bitboards
+        planes = batch.planes(bitboards)
+        self.assertEqual(planes.shape, (5, 12, 64))
+        for i, game in enumerate(games):
+            for index, piece in enumerate(game.board._pieces):
+                expected = [0] * 12
+                if piece is not None:
+                    expected[piece_index(piece.kind, color_index(piece.color))] = 1
+                self.assertEqual(list(planes[i, :, index]), expected)
+        np.testing.assert_array_equal(batch.from_planes(planes), bitboards)
+
+
+class TestFeatures(unittest.TestCase):
+    def _makeOne(self, positions):
+        return batch.features(positions)
+
+    def test_starting_position(self):
+        result = self._makeOne([STARTING_FEN])
+        np.testing.assert_array_equal(result.material, [[39, 39]])
+        np.testing.assert_array_equal(result.mobility, [[20, 20]])
+        # f3 is attacked by the g1 knight and the e2 and g2 pawns
+        self.assertEqual(result.attacks[0, WHITE, 21], 3)
+        self.assertEqual(result.attacks[0, BLACK, 21], 0)
+
+    def test_empty(self):
+        result = self._makeOne([])
+        self.assertEqual(result.material.shape, (0, 2))
+        self.assertEqual(result.attacks.shape, (0, 2, 64))
+
+    def test_random_positions(self):
+        games = _random_games(40)
+        result = self._makeOne(encode_positions(games))
+        for i, game in enumerate(games):
+            board = game.board
+            bitboards = board._bitboards
+            occupied = board._occupied[WHITE] | board._occupied[BLACK]
+            for color, name in ((WHITE, "white"), (BLACK, "black")):
+                self.assertEqual(result.material[i, color], board.material(name))
+                attacks = [
+                    bin(movegen.attackers(bitboards, index, color, occupied)).count("1")
+                    for index in range(64)
+                ]
+                self.assertEqual(list(result.attacks[i, color]), attacks)
+            turn = WHITE if game.turn == "white" else BLACK
+            self.assertEqual(result.mobility[i, turn], _mobility(game))
@@ -1,6 +1,14 @@
+from copy import copy
+from escacs.bitboard import KNIGHT
+from escacs.bitboard import PAWN
 from escacs.board import Board
 from escacs.board import Square
 from escacs.exceptions import InvalidSquare
+from escacs.exceptions import PieceNotFound
+from escacs.game import Game
+from escacs.pieces import Knight
+from escacs.pieces import Pawn
+from escacs.utils import get_square
 from unittest.mock import Mock
 
 import pytest
@@ -28,6 +36,26 @@ class TestBoard(unittest.TestCase):
         b["a1"] = foo
         self.assertIs(b["a1"], foo)
 
+    def test_bitboards(self):
+        b = self._makeOne()
+        knight = Knight("white", board=b, pos="b1")
+        b["b1"] = knight
+        b["e7"] = Pawn("black", board=b, pos="e7")
+        self.assertEqual(b.bitboard(KNIGHT, "white"), 1 << 1)
+        self.assertEqual(b.bitboard(PAWN, "black"), 1 << 52)
+        self.assertEqual(b.occupancy("white"), 1 << 1)
+        self.assertEqual(b.occupied, (1 << 1) | (1 << 52))
+
+        b.move_piece("b1", "c3")
+        self.assertIsNone(b["b1"])
+        self.assertIs(b["c3"], knight)
+        self.assertEqual(knight.pos, Square("c3"))
+        self.assertEqual(b.bitboard(KNIGHT, "white"), 1 << 18)
+
+        b["c3"] = None
+        self.assertEqual(b.bitboard(KNIGHT, "white"), 0)
+        self.assertEqual(b.occupied, 1 << 52)
+
 
 class TestSquare_from_string(unittest.TestCase):
     def _makeOne(self, pos: str):
@@ -45,6 +73,28 @@ class TestSquare_from_string(unittest.TestCase):
                 self.assertIsInstance(self._makeOne(valid), Square)
 
 
+class TestSquare_interned(unittest.TestCase):
+    def test_same_instance(self):
+        sq = Square("e4")
+        self.assertIs(Square((4, 3)), sq)
+        self.assertIs(Square(col=4, row=3), sq)
+        self.assertIs(Square(28), sq)
+        self.assertIs(get_square("e4"), sq)
+        self.assertIs(copy(sq), sq)
+        self.assertEqual(sq.index, 28)
+        self.assertEqual(hash(sq), 28)
+
+    def test_immutable(self):
+        sq = Square("e4")
+        with pytest.raises(AttributeError):
+            sq.row = 5
+
+    def test_path_does_not_change_squares(self):
+        src = Square("a1")
+        Board().path(src, "a8")
+        self.assertEqual(str(src), "a1")
+
+
 class TestSquare_color(unittest.TestCase):
     def _makeOne(self, pos: str):
         p = Square(pos)
@@ -107,3 +157,78 @@ class TestSquare_path(unittest.TestCase):
         self.assertEqual(self._makeOne("a2", "f7"), expected[:5])
         self.assertEqual(self._makeOne("a2", "g8"), expected)
         self.assertEqual(self._makeOne("c4", "e6"), expected[2:4])
+        self.assertEqual(self._makeOne("g8", "e6"), [Square("f7"), Square("e6")])
+
+    def test_path_not_aligned(self):
+        self.assertEqual(self._makeOne("a1", "b3"), [])
+        self.assertEqual(self._makeOne("a1", "a1"), [])
+
+    def test_between(self):
+        b = Board()
+        self.assertEqual(b.between("a1", "d4"), (Square("b2"), Square("c3")))
+        self.assertEqual(b.between("h1", "e1"), (Square("g1"), Square("f1")))
+        self.assertEqual(b.between(Square("a1"), "a2"), ())
+        self.assertEqual(b.between("a1", "b3"), ())
+        self.assertIsInstance(b.between("a1", "d4"), tuple)
+
+
+class TestBoard_piece_sets(unittest.TestCase):
+    def _makeOne(self):
+        return Game().board
+
+    def test_king(self):
+        b = self._makeOne()
+        self.assertEqual(b.king("white"), Square("e1"))
+        self.assertEqual(b.king("black"), Square("e8"))
+        self.assertIsNone(Board().king("white"))
+
+    def test_pieces(self):
+        b = self._makeOne()
+        knights = b.pieces(KNIGHT, "white")
+        self.assertEqual([k.pos for k in knights], [Square("b1"), Square("g1")])
+        self.assertEqual(b.squares(PAWN, "black")[0], Square("a7"))
+        self.assertEqual(b.count(PAWN, "black"), 8)
+        self.assertEqual(len(list(b.items())), 32)
+        self.assertEqual(len(list(b.items("white"))), 16)
+
+    def test_get_square(self):
+        b = self._makeOne()
+        knight = b["g1"]
+        self.assertEqual(b.get_square(knight), Square("g1"))
+        b.move_piece("g1", "f3")
+        self.assertEqual(b.get_square(knight), Square("f3"))
+        b["f3"] = None
+        with pytest.raises(PieceNotFound):
+            b.get_square(knight)
+
+    def test_attackers(self):
+        b = self._makeOne()
+        self.assertEqual(
+            b.attackers("f3", "white"), [Square("g1"), Square("e2"), Square("g2")]
+        )
+        self.assertEqual(b.attackers("f3", "black"), [])
+        b.set_fen("4k3/8/8/1b6/8/8/4r3/R3K3")
+        self.assertEqual(b.attackers("e1", "black"), [Square("e2")])
+        self.assertEqual(b.attackers("e2", "white"), [Square("e1")])
+        self.assertEqual(b.attackers("e8", "white"), [])
+
+
+class TestBoard_fen(unittest.TestCase):
+    def test_set_fen(self):
+        b = Board()
+        b.set_fen("4k3/8/8/8/8/8/4P3/4K3")
+        self.assertEqual(b["e2"].abbr, "P")
+        self.assertIs(b["e2"].board, b)
+        self.assertEqual(b["e8"].color, "black")
+        self.assertEqual(b.occupied, (1 << 4) | (1 << 12) | (1 << 60))
+        self.assertEqual(b.material("white"), 1)
+        self.assertEqual(b.fen(), "4k3/8/8/8/8/8/4P3/4K3")
+
+    def test_fen_matches_place_piece(self):
+        b = Board()
+        b["e2"] = Pawn("white", board=b, pos="e2")
+        other = Board()
+        other.set_fen("8/8/8/8/8/8/4P3/8")
+        self.assertEqual(b.zobrist, other.zobrist)
+        self.assertEqual(b._bitboards, other._bitboards)
+        self.assertEqual(b._psqt, other._psqt)
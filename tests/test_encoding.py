@@ -0,0 +1,98 @@
+from escacs.encoding import decode_game
+from escacs.encoding import decode_move
+from escacs.encoding import decode_moves
+from escacs.encoding import decode_position
+from escacs.encoding import decode_positions
+from escacs.encoding import encode_game
+from escacs.encoding import encode_move
+from escacs.encoding import encode_moves
+from escacs.encoding import encode_position
+from escacs.encoding import encode_positions
+from escacs.encoding import POSITION_SIZE
+from escacs.exceptions import InvalidEncoding
+from escacs.game import Game
+from escacs.move import Move
+from escacs.perft import REFERENCE_POSITIONS
+from escacs.square import Square
+
+import pytest
+import unittest
+
+
+class TestMoves(unittest.TestCase):
+    def test_move(self):
+        move = Move(Square("e7"), Square("e8"), "N")
+        self.assertLess(encode_move(move), 1 << 16)
+        self.assertIs(decode_move(encode_move(move)), Move.from_code(move.code))
+
+    def test_moves(self):
+        moves = Game().legal_moves()
+        data = encode_moves(moves)
+        self.assertEqual(len(data), 2 * len(moves))
+        self.assertEqual(decode_moves(data), moves)
+        # Little-endian, whatever the platform
+        self.assertEqual(encode_moves([Move(Square("e2"), Square("e4"))]), b"\x0c\x07")
+
+    def test_invalid(self):
+        with pytest.raises(InvalidEncoding):
+            decode_moves(b"\x00")
+        with pytest.raises(InvalidEncoding):
+            decode_move(1 << 15)
+        for promotion in (5, 6, 7):
+            with pytest.raises(InvalidEncoding):
+                decode_move(promotion << 12 | 60 << 6 | 52)
+
+
+class TestPositions(unittest.TestCase):
+    def test_roundtrip(self):
+        for position in REFERENCE_POSITIONS:
+            game = Game.from_fen(position.fen)
+            data = encode_position(game)
+            self.assertEqual(len(data), POSITION_SIZE)
+            decoded = decode_position(data)
+            self.assertEqual(decoded.fen(), position.fen)
+            self.assertEqual(decoded.zobrist_key, game.zobrist_key)
+
+    def test_bulk(self):
+        games = [Game.from_fen(position.fen) for position in REFERENCE_POSITIONS]
+        data = encode_positions(games)
+        self.assertEqual(len(data), POSITION_SIZE * len(games))
+        self.assertEqual(
+            [game.fen() for game in decode_positions(data)],
+            [game.fen() for game in games],
+        )
+
+    def test_invalid(self):
+        data = encode_position(Game())
+        with pytest.raises(InvalidEncoding):
+            decode_position(data[:-1])
+        with pytest.raises(InvalidEncoding):
+            # Unknown piece nibble
+            decode_position(data[:8] + b"\xff" + data[9:])
+        with pytest.raises(InvalidEncoding):
+            list(decode_positions(data + b"\x00"))
+
+
+class TestGames(unittest.TestCase):
+    def test_roundtrip(self):
+        game = Game.from_fen(REFERENCE_POSITIONS[1].fen)
+        for uci in ("e1g1", "h3g2", "g1g2", "e8c8", "d5e6"):
+            game.push(next(m for m in game.legal_moves() if str(m) == uci))
+        fen = game.fen()
+        data = encode_game(game)
+        self.assertEqual(len(data), POSITION_SIZE + 2 * 5)
+        # The game is left as it was
+        self.assertEqual(game.fen(), fen)
+        decoded = decode_game(data)
+        self.assertEqual(decoded.fen(), fen)
+        self.assertEqual(decoded.moves, game.moves)
+        decoded.pop()
+        game.pop()
+        self.assertEqual(decoded.fen(), game.fen())
+
+    def test_illegal_move(self):
+        data = encode_position(Game())
+        for src, dst in (("a1", "a1"), ("e2", "e5"), ("e7", "e5")):
+            move = Move(Square(src), Square(dst))
+            with pytest.raises(InvalidEncoding):
+                decode_game(data + encode_moves([move]))
@@ -0,0 +1,127 @@
+from escacs.game import Game
+from escacs.move import Move
+from escacs.notation import parse_move
+from escacs.pgn import read_games
+
+import io
+import os
+import pytest
+import tempfile
+import unittest
+
+np = pytest.importorskip("numpy")
+
+from escacs.batch import to_arrays  # noqa: E402 isort:skip
+from escacs.export import encode_planes  # noqa: E402 isort:skip
+from escacs.export import export  # noqa: E402 isort:skip
+from escacs.export import main  # noqa: E402 isort:skip
+from escacs.export import PLANES  # noqa: E402 isort:skip
+from escacs.export import read_shards  # noqa: E402 isort:skip
+from escacs.export import ShardWriter  # noqa: E402 isort:skip
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES, "games.pgn")) as f:
+    PGN = f.read()
+
+GAMES = """[Event "En passant"]
+[Result "1/2-1/2"]
+
+1. e4 Nf6 2. e5 d5 3. exd6 1/2-1/2
+
+[Event "Illegal"]
+[Result "0-1"]
+
+1. e4 e5 2. Ke3 0-1
+"""
+
+
+class TestEncodePlanes(unittest.TestCase):
+    def _makeOne(self, fens):
+        return encode_planes(to_arrays(fens))
+
+    def test_planes(self):
+        planes = self._makeOne(
+            ["r3k3/8/8/3pP3/8/8/8/4K2R w Kq d6 0 1", "4k3/8/8/8/8/8/8/4K3 b - - 0 1"]
+        )
+        self.assertEqual(planes.shape, (2, PLANES, 8, 8))
+        self.assertEqual(planes[0, 0, 4, 4], 1)  # White pawn on e5
+        self.assertEqual(planes[0, 9, 7, 0], 1)  # Black rook on a8
+        self.assertEqual(planes[0, :12].sum(), 6)
+        # Side to move
+        self.assertEqual(planes[0, 12].sum(), 0)
+        self.assertEqual(planes[1, 12].sum(), 64)
+        # Castling rights
+        self.assertEqual([planes[0, 13 + i, 0, 0] for i in range(4)], [1, 0, 0, 1])
+        self.assertEqual(planes[1, 13:17].sum(), 0)
+        # En passant
+        self.assertEqual(planes[0, 17, 5, 3], 1)
+        self.assertEqual(planes[0, 17].sum(), 1)
+        self.assertEqual(planes[1, 17].sum(), 0)
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "shards")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _makeOne(self, **kwargs):
+        return export(io.StringIO(PGN + "\n" + GAMES), self.directory, **kwargs)
+
+    def _read(self):
+        shards = list(read_shards(self.directory))
+        return [np.concatenate(arrays) for arrays in zip(*shards)]
+
+    def test_export(self):
+        writer = self._makeOne(workers=1, shard_size=16)
+        # Only the games with a result and legal moves are exported
+        self.assertEqual(writer.positions, 45 + 5)
+        self.assertEqual(len(writer.shards), 4)
+        shards = list(read_shards(self.directory))
+        self.assertEqual([len(shard.moves) for shard in shards], [16, 16, 16, 2])
+        self.assertIsInstance(shards[0].planes, np.memmap)
+
+        planes, moves, results = self._read()
+        self.assertEqual(planes.shape, (50, PLANES, 8, 8))
+        self.assertEqual(list(results), [1] * 45 + [0] * 5)
+        (pgn_game,) = list(read_games(io.StringIO(PGN)))[:1]
+        game = pgn_game.start()
+        for i, move in enumerate(pgn_game.moves()):
+            self.assertEqual(Move.from_code(int(moves[i])), move)
+            expected = encode_planes(to_arrays([game]))[0]
+            np.testing.assert_array_equal(planes[i], expected)
+            game.push(move)
+        # The en passant capture of the last game
+        self.assertEqual(str(Move.from_code(int(moves[-1]))), "e5d6")
+        self.assertEqual(planes[-1, 17, 5, 3], 1)
+
+    def test_workers(self):
+        self._makeOne(workers=1)
+        serial = self._read()
+        self.tmp.cleanup()
+        self._makeOne(workers=2, chunk_size=1, shard_size=7)
+        for expected, array in zip(serial, self._read()):
+            np.testing.assert_array_equal(array, expected)
+
+    def test_writer(self):
+        with ShardWriter(self.directory, prefix="test", shard_size=2) as writer:
+            game = Game()
+            for text in ("e2e4", "e7e5", "g1f3"):
+                move = parse_move(game, text)
+                writer.add(game, move.code, -1)
+                game.push(move)
+        self.assertEqual(len(writer.shards), 2)
+        self.assertEqual(list(read_shards(self.directory)), [])
+        shards = list(read_shards(self.directory, prefix="test", mmap_mode=None))
+        self.assertEqual(list(shards[1].results), [-1])
+        self.assertEqual(str(Move.from_code(int(shards[1].moves[0]))), "g1f3")
+
+    def test_main(self):
+        path = os.path.join(self.tmp.name, "games.pgn")
+        with open(path, "w") as stream:
+            stream.write(PGN)
+        self.assertEqual(main([path, self.directory, "--workers", "1"]), 0)
+        self.assertEqual(len(self._read()[1]), 45)
@@ -1,5 +1,12 @@
+from escacs.evaluation import evaluate
+from escacs.exceptions import CheckMate
+from escacs.exceptions import Draw
+from escacs.exceptions import InvalidFen
 from escacs.exceptions import InvalidMove
+from escacs.exceptions import Stalemate
 from escacs.game import Game
+from escacs.move import Move
+from escacs.perft import REFERENCE_POSITIONS
 from escacs.square import Square
 
 import pytest
@@ -46,3 +53,297 @@ class TestGame(unittest.TestCase):
         # Try to move white pawn diagonally like a bishop
         with pytest.raises(InvalidMove):
             g.player_move(Square("a2"), Square("d4"))
+
+    def test_capture(self):
+        g = self.makeOne()
+        g.player_move("e2", "e4")
+        g.player_move("d7", "d5")
+        taken = g.player_move("e4", "d5")
+        self.assertEqual(taken.abbr, "P")
+        self.assertEqual(taken.color, "black")
+        self.assertEqual(g.board["d5"].color, "white")
+
+    def test_blocked_move(self):
+        g = self.makeOne()
+        with pytest.raises(InvalidMove):
+            g.player_move("a1", "a3")
+
+    def test_castling_and_en_passant(self):
+        g = Game.from_fen("r3k2r/pppppppp/8/4P3/8/8/PPPP1PPP/R3K2R b KQkq - 0 1")
+        g.player_move("d7", "d5")
+        self.assertEqual(g.ep_square, Square("d6"))
+        taken = g.player_move("e5", "d6")
+        self.assertEqual(taken.abbr, "P")
+        self.assertIsNone(g.board["d5"])
+        g.player_move("e8", "c8")
+        self.assertEqual(g.board["d8"].abbr, "R")
+        self.assertEqual(g.castling & 12, 0)
+
+    def test_promotion(self):
+        g = Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        with pytest.raises(Draw):
+            # Nobody can mate with a knight
+            g.player_move("a7", "a8", promotion="N")
+        self.assertEqual(g.board["a8"].abbr, "N")
+
+
+class TestGame_push_pop(unittest.TestCase):
+    def _state(self, game):
+        return (
+            list(game.board._pieces),
+            list(game.board._bitboards),
+            list(game.board._occupied),
+            game.turn,
+            game.castling,
+            game.ep_square,
+            game.halfmove_clock,
+            game.fullmove_number,
+        )
+
+    def test_pop_restores_position(self):
+        for position in REFERENCE_POSITIONS:
+            game = Game.from_fen(position.fen)
+            before = self._state(game)
+            for move in game.legal_moves():
+                game.push(move)
+                self.assertEqual(game.moves[-1], move)
+                self.assertIs(game.pop(), move)
+                self.assertEqual(self._state(game), before)
+                self.assertEqual(game.moves, [])
+
+    def test_pop_restores_piece_positions(self):
+        game = Game.from_fen("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        pawn = game.board["a7"]
+        game.push(Move(Square("a7"), Square("a8"), "Q"))
+        self.assertEqual(game.board["a8"].abbr, "Q")
+        game.pop()
+        self.assertIs(game.board["a7"], pawn)
+        self.assertEqual(pawn.pos, Square("a7"))
+
+
+class TestGame_points(unittest.TestCase):
+    def test_initial_points(self):
+        g = Game()
+        self.assertEqual(g.get_points("white"), 39)
+        self.assertEqual(g.get_points("black"), 39)
+        self.assertEqual(g.advantage("white"), 0)
+
+    def test_points_follow_captures(self):
+        g = Game()
+        for move in ("e2e4", "d7d5", "e4d5", "d8d5", "b1c3"):
+            g.player_move(move[:2], move[2:])
+        self.assertEqual(g.get_points("white"), 38)
+        self.assertEqual(g.get_points("black"), 38)
+        g.player_move("d5", "a2")
+        self.assertEqual(g.advantage("black"), 1)
+        g.pop()
+        self.assertEqual(g.advantage("black"), 0)
+
+    def test_evaluation_is_incremental(self):
+        g = Game.from_fen(REFERENCE_POSITIONS[1].fen)
+        expected = evaluate(Game.from_fen(REFERENCE_POSITIONS[1].fen))
+        for move in g.legal_moves():
+            g.push(move)
+            g.pop()
+        self.assertEqual(evaluate(g), expected)
+        self.assertEqual(evaluate(Game()), 0)
+
+
+class TestGame_fen(unittest.TestCase):
+    def test_roundtrip(self):
+        for position in REFERENCE_POSITIONS:
+            self.assertEqual(Game.from_fen(position.fen).fen(), position.fen)
+
+    def test_initial_position(self):
+        self.assertEqual(Game().fen(), REFERENCE_POSITIONS[0].fen)
+        self.assertEqual(
+            Game.from_fen(REFERENCE_POSITIONS[0].fen).zobrist_key, Game().zobrist_key
+        )
+
+    def test_after_moves(self):
+        g = Game()
+        g.player_move("e2", "e4")
+        g.player_move("g8", "f6")
+        g.player_move("e4", "e5")
+        g.player_move("d7", "d5")
+        self.assertEqual(
+            g.fen(), "rnbqkb1r/ppp1pppp/5n2/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 3"
+        )
+
+    def test_set_fen_reuses_game(self):
+        g = Game()
+        g.player_move("e2", "e4")
+        g.set_fen(REFERENCE_POSITIONS[2].fen)
+        self.assertEqual(g.moves, [])
+        self.assertEqual(g.fen(), REFERENCE_POSITIONS[2].fen)
+
+    def test_inconsistent_castling_and_ep(self):
+        # Rights whose king or rook are not on their squares are dropped
+        g = Game.from_fen("r3k3/8/8/8/8/8/8/1R2K2R w KQkq - 0 1")
+        self.assertEqual(g.fen(), "r3k3/8/8/8/8/8/8/1R2K2R w Kq - 0 1")
+        # So are en passant squares not behind an enemy pawn
+        g = Game.from_fen("4k3/8/8/8/8/8/3PQ3/4K3 w - e3 0 1")
+        self.assertIsNone(g.ep_square)
+        with pytest.raises(InvalidMove):
+            g.player_move("d2", "e3")
+        self.assertIsNone(Game.from_fen("4k3/8/8/3pP3/8/8/8/4K3 b - d6 0 1").ep_square)
+        self.assertIsNone(
+            Game.from_fen("4k3/8/3p4/3pP3/8/8/8/4K3 w - d6 0 1").ep_square
+        )
+        g = Game.from_fen("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        self.assertEqual(g.ep_square, Square("d6"))
+
+    def test_invalid(self):
+        for fen in (
+            "",
+            "8/8/8/8/8/8/8/8",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1",
+            "rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQxq - 0 1",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq z9 0 1",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - a 1",
+        ):
+            with pytest.raises(InvalidFen):
+                Game.from_fen(fen)
+
+
+class TestGame_draws(unittest.TestCase):
+    def makeOne(self, fen="4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"):
+        return Game.from_fen(fen)
+
+    def test_threefold_repetition(self):
+        g = self.makeOne("4k3/8/8/8/8/8/4P3/R3K3 w - - 0 1")
+        shuffle = [("a1", "a2"), ("e8", "d8"), ("a2", "a1"), ("d8", "e8")]
+        for _from, _to in shuffle:
+            g.player_move(_from, _to)
+        self.assertEqual(g.repetitions(), 2)
+        for _from, _to in shuffle[:3]:
+            g.player_move(_from, _to)
+        with pytest.raises(Draw):
+            g.player_move(*shuffle[3])
+        self.assertEqual(g.repetitions(), 3)
+        self.assertTrue(g.is_repetition())
+        g.pop()
+        self.assertEqual(g.repetitions(), 2)
+        self.assertFalse(g.is_draw())
+
+    def test_castling_rights_change_the_position(self):
+        g = self.makeOne("4k3/8/8/8/8/8/4P3/R3K3 w Q - 0 1")
+        for _ in range(2):
+            for _from, _to in [("a1", "a2"), ("e8", "d8"), ("a2", "a1"), ("d8", "e8")]:
+                g.player_move(_from, _to)
+        # The first position had castling rights, the others have not
+        self.assertEqual(g.repetitions(), 2)
+
+    def test_fifty_moves(self):
+        g = self.makeOne("4k3/8/8/8/8/8/4P3/4K3 w - - 99 80")
+        self.assertFalse(g.is_fifty_moves())
+        with pytest.raises(Draw):
+            g.player_move("e1", "d1")
+        self.assertTrue(g.is_fifty_moves())
+        g.pop()
+        g.player_move("e2", "e3")
+        self.assertFalse(g.is_draw())
+
+    def test_insufficient_material(self):
+        for fen, expected in (
+            ("4k3/8/8/8/8/8/8/4K3 w - - 0 1", True),
+            ("4k3/8/8/8/8/8/8/3NK3 w - - 0 1", True),
+            ("4k3/8/8/8/8/8/8/2B1K3 b - - 0 1", True),
+            # Bishops on squares of the same color
+            ("4kb2/8/8/8/8/8/8/2B1K3 w - - 0 1", True),
+            ("2b1k3/8/8/8/8/8/8/2B1K3 w - - 0 1", False),
+            ("3nk3/8/8/8/8/8/8/3NK3 w - - 0 1", False),
+            ("4k3/8/8/8/8/8/8/2BNK3 w - - 0 1", False),
+            ("4k3/8/8/8/8/8/8/3RK3 w - - 0 1", False),
+            ("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", False),
+        ):
+            self.assertEqual(
+                self.makeOne(fen).is_insufficient_material(), expected, fen
+            )
+
+    def test_capture_into_insufficient_material(self):
+        g = self.makeOne("4k3/8/8/8/8/8/3r4/4K3 w - - 0 1")
+        with pytest.raises(Draw):
+            g.player_move("e1", "d2")
+        self.assertTrue(g.is_draw())
+
+
+class TestGame_end(unittest.TestCase):
+    def makeOne(self, fen):
+        return Game.from_fen(fen)
+
+    def test_check(self):
+        g = Game()
+        self.assertFalse(g.is_check())
+        for _from, _to in [("e2", "e4"), ("f7", "f6"), ("d2", "d4")]:
+            g.player_move(_from, _to)
+        self.assertFalse(g.is_check())
+        g.player_move("g7", "g5")
+        with pytest.raises(CheckMate) as exc:
+            g.player_move("d1", "h5")
+        # The winner
+        self.assertEqual(exc.value.color, "white")
+        self.assertTrue(g.is_check())
+        self.assertTrue(g.is_checkmate())
+        self.assertFalse(g.is_stalemate())
+        g.pop()
+        self.assertFalse(g.is_checkmate())
+
+    def test_check_not_mate(self):
+        g = self.makeOne("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+        g.player_move("a1", "a8")
+        self.assertTrue(g.is_check())
+        self.assertFalse(g.is_checkmate())
+
+    def test_stalemate(self):
+        g = self.makeOne("k7/8/1K6/8/8/8/8/2Q5 w - - 0 1")
+        with pytest.raises(Stalemate):
+            g.player_move("c1", "c7")
+        self.assertTrue(g.is_stalemate())
+        self.assertFalse(g.is_check())
+        self.assertFalse(g.is_checkmate())
+
+    def test_mate_over_fifty_moves(self):
+        g = self.makeOne("k7/8/1K6/8/8/8/8/6Q1 w - - 99 80")
+        with pytest.raises(CheckMate):
+            g.player_move("g1", "g8")
+
+
+class TestGame_legal_codes(unittest.TestCase):
+    def makeOne(self, fen="4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"):
+        return Game.from_fen(fen)
+
+    def test_cached(self):
+        g = self.makeOne()
+        codes = g.legal_codes()
+        self.assertIs(g.legal_codes(), codes)
+        self.assertEqual([Move.from_code(c) for c in codes], g.legal_moves())
+
+    def test_moves(self):
+        g = self.makeOne()
+        codes = g.legal_codes()
+        g.player_move("e2", "e4")
+        self.assertEqual(
+            [str(move) for move in g.legal_moves()],
+            ["e8d7", "e8e7", "e8f7", "e8d8", "e8f8"],
+        )
+        g.pop()
+        self.assertEqual(g.legal_codes(), codes)
+
+    def test_board_changes(self):
+        g = self.makeOne()
+        self.assertIn("e2e4", [str(move) for move in g.legal_moves()])
+        g.board.move_piece("e2", "e3")
+        self.assertNotIn("e2e4", [str(move) for move in g.legal_moves()])
+        self.assertIn("e3e4", [str(move) for move in g.legal_moves()])
+        g.board["e3"] = None
+        self.assertEqual(len(g.legal_codes()), 5)
+
+    def test_fen(self):
+        g = self.makeOne()
+        g.legal_codes()
+        g.set_fen("4k3/8/8/8/8/8/4P3/4K3 b - - 0 1")
+        self.assertEqual(len(g.legal_codes()), 5)
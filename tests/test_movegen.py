@@ -0,0 +1,77 @@
+from escacs.game import Game
+from escacs.movegen import WHITE_KINGSIDE
+from escacs.perft import perft
+from escacs.perft import REFERENCE_POSITIONS
+
+import unittest
+
+
+class TestPerft(unittest.TestCase):
+    def _makeOne(self, fen: str, depth: int):
+        return perft(Game.from_fen(fen), depth)
+
+    def test_reference_positions(self):
+        for position in REFERENCE_POSITIONS:
+            for depth in (1, 2):
+                self.assertEqual(
+                    self._makeOne(position.fen, depth),
+                    position.nodes[depth],
+                    position.name,
+                )
+
+    def test_initial_position(self):
+        self.assertEqual(perft(Game(), 3), 8902)
+
+
+class TestLegalMoves(unittest.TestCase):
+    def _makeOne(self, fen: str):
+        return {str(move) for move in Game.from_fen(fen).legal_moves()}
+
+    def test_castling(self):
+        moves = self._makeOne("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        self.assertIn("e1g1", moves)
+        self.assertIn("e1c1", moves)
+        # Can not castle through an attacked square
+        moves = self._makeOne("r3k2r/8/8/8/8/8/5r2/R3K2R w KQkq - 0 1")
+        self.assertNotIn("e1g1", moves)
+
+    def test_castling_without_king(self):
+        # Castling rights left over with the king off its square
+        game = Game.from_fen("4k3/8/8/8/8/8/8/3K3R w - - 0 1")
+        game.castling = WHITE_KINGSIDE
+        self.assertNotIn("e1g1", {str(move) for move in game.legal_moves()})
+
+    def test_en_passant(self):
+        moves = self._makeOne("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        self.assertIn("e5d6", moves)
+
+    def test_promotions(self):
+        moves = self._makeOne("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertTrue({"a7a8q", "a7a8r", "a7a8b", "a7a8n"} <= moves)
+        self.assertNotIn("a7a8", moves)
+
+    def test_pinned_piece(self):
+        moves = self._makeOne("4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1")
+        self.assertFalse(any(move.startswith("e2") for move in moves))
+        # Moves along the pin line
+        moves = self._makeOne("4k3/4r3/8/8/8/8/4R3/4K3 w - - 0 1")
+        self.assertEqual(
+            {move for move in moves if move.startswith("e2")},
+            {"e2e3", "e2e4", "e2e5", "e2e6", "e2e7"},
+        )
+
+    def test_check(self):
+        # Block the check or move the king
+        moves = self._makeOne("4k3/8/8/8/1b6/8/8/3QK1N1 w - - 0 1")
+        self.assertEqual(moves, {"d1d2", "e1e2", "e1f1", "e1f2"})
+        # Or capture the checker
+        moves = self._makeOne("4k3/8/8/8/1b6/8/8/1R1QK1N1 w - - 0 1")
+        self.assertIn("b1b4", moves)
+        # Double check: only the king moves, and not away along the line
+        moves = self._makeOne("4k3/8/8/8/1b6/8/8/r3K2R w K - 0 1")
+        self.assertEqual(moves, {"e1e2", "e1f2"})
+
+    def test_en_passant_pin(self):
+        # Both pawns leave the row: the king would be in check
+        moves = self._makeOne("8/8/8/K2pP2r/8/8/8/4k3 w - d6 0 1")
+        self.assertNotIn("e5d6", moves)
@@ -0,0 +1,79 @@
+from escacs.exceptions import InvalidNotation
+from escacs.game import Game
+from escacs.notation import parse_move
+from escacs.notation import parse_san
+from escacs.notation import parse_uci
+from escacs.notation import san
+from escacs.notation import uci
+
+import pytest
+import unittest
+
+
+class TestNotation(unittest.TestCase):
+    def test_san(self):
+        game = Game.from_fen("r3k2r/8/8/8/8/2N3N1/4P3/R3K2R w KQkq - 0 1")
+        self.assertEqual(san(game, parse_san(game, "Nge4")), "Nge4")
+        self.assertEqual(san(game, parse_san(game, "O-O-O")), "O-O-O")
+        self.assertEqual(san(game, parse_san(game, "Rxa8+")), "Rxa8+")
+        self.assertEqual(san(game, parse_san(game, "e4")), "e4")
+
+    def test_promotion_and_mate(self):
+        game = Game.from_fen("7k/1P6/6K1/8/8/8/8/8 w - - 0 1")
+        move = parse_san(game, "b8=Q#")
+        self.assertEqual(str(move), "b7b8q")
+        self.assertEqual(san(game, move), "b8=Q#")
+
+    def test_invalid(self):
+        game = Game()
+        for text in ("e5", "Nf4", "O-O", "Xe4", "", "e4e5"):
+            with pytest.raises(InvalidNotation):
+                parse_san(game, text)
+
+    def test_en_passant_and_pins(self):
+        game = Game.from_fen("4k3/8/8/r2pP1K1/8/8/8/8 w - d6 0 1")
+        # The e5 pawn is pinned along the 5th row once d5 is taken
+        with pytest.raises(InvalidNotation):
+            parse_san(game, "exd6")
+        game = Game.from_fen("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        self.assertEqual(san(game, parse_san(game, "exd6")), "exd6")
+
+    def test_pawn_push_onto_piece(self):
+        game = Game.from_fen("4k3/8/8/8/4p3/3PP3/8/4K3 w - - 0 1")
+        # e4 is taken: the e3 pawn can not push, and d3 needs a capture
+        for text in ("e4", "exe4", "xe4"):
+            with pytest.raises(InvalidNotation):
+                parse_san(game, text)
+        self.assertEqual(str(parse_san(game, "dxe4")), "d3e4")
+
+    def test_disambiguation_ignores_pinned_pieces(self):
+        game = Game.from_fen("4k3/4r3/8/8/8/2N3N1/8/4K3 w - - 0 1")
+        # The c3 knight is not pinned, the g3 one neither: both can go
+        self.assertEqual(san(game, parse_uci(game, "c3e4")), "Nce4")
+        game = Game.from_fen("4k3/4r3/8/8/8/2N5/4N3/4K3 w - - 0 1")
+        # The e2 knight is pinned: no disambiguation needed
+        self.assertEqual(san(game, parse_uci(game, "c3e4")), "Ne4")
+        with pytest.raises(InvalidNotation):
+            parse_san(game, "Nd4")
+
+
+class TestUci(unittest.TestCase):
+    def test_parse(self):
+        game = Game()
+        move = parse_uci(game, "g1f3")
+        self.assertEqual(str(move), "g1f3")
+        self.assertEqual(uci(move), "g1f3")
+        for text in ("g1g3", "e2e5", "e7e5", "e2e4q", "g1f3 ", "O-O"):
+            with pytest.raises(InvalidNotation):
+                parse_uci(game, text)
+
+    def test_promotion(self):
+        game = Game.from_fen("7k/1P6/6K1/8/8/8/8/8 w - - 0 1")
+        self.assertEqual(parse_uci(game, "b7b8n").promotion, "N")
+        with pytest.raises(InvalidNotation):
+            parse_uci(game, "b7b8")
+
+    def test_parse_move(self):
+        game = Game()
+        self.assertEqual(parse_move(game, "Nf3"), parse_move(game, "g1f3"))
+        self.assertEqual(parse_move(game, " e4 "), parse_uci(game, "e2e4"))
@@ -0,0 +1,78 @@
+from escacs.game import Game
+from escacs.pgn import open_pgn
+from escacs.pgn import read_games
+from escacs.pgn import read_headers
+from escacs.pgn import to_pgn
+from escacs.pgn import write_game
+
+import io
+import os
+import tempfile
+import unittest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES, "games.pgn")) as f:
+    PGN = f.read()
+
+
+class TestReadGames(unittest.TestCase):
+    def _makeOne(self, **kwargs):
+        return list(read_games(io.StringIO(PGN), **kwargs))
+
+    def test_headers(self):
+        games = self._makeOne()
+        self.assertEqual(len(games), 3)
+        self.assertEqual(games[0].headers["White"], "Anderssen, Adolf")
+        self.assertEqual(games[0].result, "1-0")
+
+    def test_moves(self):
+        games = self._makeOne()
+        self.assertEqual(len(list(games[0].moves())), 45)
+        # Comments, variations and annotations are skipped
+        self.assertEqual(list(games[1].sans()), ["e4", "e5", "Nf3", "Nc6?!", "Bb5"])
+        self.assertEqual(games[2].game().fen(), "8/3k4/8/8/4P3/8/8/4K3 b - - 0 2")
+
+    def test_headers_only(self):
+        games = self._makeOne(headers_only=True)
+        self.assertEqual([g.movetext for g in games], [None, None, None])
+        self.assertEqual(
+            [h["Event"] for h in read_headers(io.StringIO(PGN))],
+            ["Casual game", "Annotated", "From position"],
+        )
+
+    def test_compressed_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("games.pgn", "games.pgn.gz", "games.pgn.bz2"):
+                path = os.path.join(tmp, name)
+                with open_pgn(path, "w") as stream:
+                    stream.write(PGN)
+                self.assertEqual(len(list(read_games(path))), 3)
+
+
+class TestWriteGame(unittest.TestCase):
+    def test_roundtrip(self):
+        for pgn_game in read_games(io.StringIO(PGN)):
+            game = pgn_game.game()
+            fen = game.fen()
+            text = to_pgn(game, pgn_game.headers)
+            # The game is left as it was
+            self.assertEqual(game.fen(), fen)
+            (again,) = read_games(io.StringIO(text))
+            self.assertEqual(again.headers, {**again.headers, **pgn_game.headers})
+            self.assertEqual(list(again.moves()), list(pgn_game.moves()))
+
+    def test_format(self):
+        game = Game()
+        game.player_move("e2", "e4")
+        stream = io.StringIO()
+        write_game(stream, game, {"White": 'A "quoted" name'})
+        self.assertEqual(
+            stream.getvalue(),
+            '[Event "?"]\n[Site "?"]\n[Date "????.??.??"]\n[Round "?"]\n'
+            '[White "A \\"quoted\\" name"]\n[Black "?"]\n[Result "*"]\n\n1. e4 *\n\n',
+        )
+        (pgn_game,) = read_games(io.StringIO(stream.getvalue()))
+        self.assertEqual(pgn_game.headers["White"], 'A "quoted" name')
+        lines = to_pgn(read_games(io.StringIO(PGN)).__next__().game()).splitlines()
+        self.assertTrue(all(len(line) <= 79 for line in lines))
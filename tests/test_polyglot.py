@@ -0,0 +1,95 @@
+from escacs.exceptions import InvalidEncoding
+from escacs.game import Game
+from escacs.polyglot import OpeningBook
+from escacs.search import analyse
+from escacs.search import Limit
+
+import os
+import pytest
+import random
+import struct
+import tempfile
+import unittest
+
+CASTLING_FEN = "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1"
+
+
+def _raw(uci: str) -> int:
+    """Polyglot encoding of a move: to square, then from square"""
+    src = (int(uci[1]) - 1) * 8 + ord(uci[0]) - 97
+    dst = (int(uci[3]) - 1) * 8 + ord(uci[2]) - 97
+    return dst | src << 6
+
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "book.bin")
+        start = Game().zobrist_key
+        castling = Game.from_fen(CASTLING_FEN).zobrist_key
+        entries = [
+            (start, _raw("e2e4"), 10, 0),
+            (start, _raw("d2d4"), 30, 0),
+            # Illegal: skipped
+            (start, _raw("e2e5"), 100, 0),
+            (start, _raw("a2a3"), 0, 0),
+            (castling, _raw("e1h1"), 1, 0),
+            (castling, _raw("e1a1"), 1, 0),
+        ]
+        with open(self.path, "wb") as f:
+            for entry in sorted(entries):
+                f.write(struct.pack(">QHHI", *entry))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _makeOne(self):
+        return OpeningBook(self.path)
+
+    def test_find_all(self):
+        with self._makeOne() as book:
+            self.assertEqual(len(book), 6)
+            entries = book.find_all(Game())
+            self.assertEqual(
+                [(str(e.move), e.weight) for e in entries],
+                [("d2d4", 30), ("e2e4", 10), ("a2a3", 0)],
+            )
+            game = Game()
+            game.player_move("g1", "f3")
+            self.assertNotIn(game, book)
+            self.assertEqual(book.find_all(game), [])
+
+    def test_castling(self):
+        with self._makeOne() as book:
+            entries = book.find_all(Game.from_fen(CASTLING_FEN))
+            self.assertEqual(sorted(str(e.move) for e in entries), ["e1c1", "e1g1"])
+
+    def test_weighted_choice(self):
+        with self._makeOne() as book:
+            rng = random.Random(0)
+            picks = [str(book.weighted_choice(Game(), rng)) for _ in range(400)]
+            self.assertEqual(set(picks), {"d2d4", "e2e4"})
+            self.assertGreater(picks.count("d2d4"), picks.count("e2e4"))
+            game = Game()
+            game.player_move("g1", "f3")
+            self.assertIsNone(book.weighted_choice(game))
+
+    def test_search_skips_book_positions(self):
+        with self._makeOne() as book:
+            result = analyse(Game(), Limit(depth=3), book=book)
+            self.assertIn(str(result.move), ("d2d4", "e2e4"))
+            self.assertEqual(result.nodes, 0)
+            game = Game.from_fen("4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+            self.assertGreater(analyse(game, Limit(depth=1), book=book).nodes, 0)
+            self.assertIn(str(Game().best_move(book=book)), ("d2d4", "e2e4"))
+
+    def test_invalid(self):
+        with open(self.path, "ab") as f:
+            f.write(b"\x00")
+        with pytest.raises(InvalidEncoding):
+            self._makeOne()
+
+    def test_empty(self):
+        open(self.path, "wb").close()
+        with self._makeOne() as book:
+            self.assertEqual(book.find_all(Game()), [])
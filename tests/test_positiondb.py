@@ -0,0 +1,108 @@
+from escacs.exceptions import InvalidEncoding
+from escacs.game import Game
+from escacs.pgn import read_games
+from escacs.positiondb import HEADER_SIZE
+from escacs.positiondb import PositionDatabase
+from escacs.positiondb import PositionDatabaseBuilder
+from escacs.positiondb import PositionStats
+from escacs.positiondb import RECORD_SIZE
+
+import io
+import os
+import pickle
+import pytest
+import tempfile
+import unittest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES, "games.pgn")) as f:
+    PGN = f.read()
+with open(os.path.join(FIXTURES, "illegal.pgn")) as f:
+    ILLEGAL = f.read()
+
+
+class TestPositionDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "positions.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _makeOne(self, **kwargs):
+        with PositionDatabaseBuilder(self.path, **kwargs) as builder:
+            for pgn_game in read_games(io.StringIO(PGN)):
+                builder.add_pgn_game(pgn_game)
+        return PositionDatabase(self.path)
+
+    def test_lookup(self):
+        with self._makeOne() as db:
+            game = Game()
+            self.assertIn(game, db)
+            self.assertEqual(db.get(game), PositionStats(2, 1, 0, 0))
+            (e4,) = db.moves(game)
+            self.assertEqual(str(e4.move), "e2e4")
+            self.assertEqual(e4.games, 2)
+            game.player_move("e2", "e4")
+            game.player_move("e7", "e5")
+            self.assertEqual(
+                sorted(str(stat.move) for stat in db.moves(game.zobrist_key)),
+                ["f2f4", "g1f3"],
+            )
+            game.player_move("a2", "a3")
+            self.assertNotIn(game, db)
+            self.assertIsNone(db.get(game))
+            self.assertEqual(db.moves(game), [])
+
+    def test_final_positions(self):
+        with self._makeOne() as db:
+            (pgn_game, *_) = read_games(io.StringIO(PGN))
+            final = pgn_game.game()
+            # Counted, without any move played from it
+            self.assertEqual(db.get(final), PositionStats(1, 1, 0, 0))
+            self.assertEqual(db.moves(final), [])
+
+    def test_spilled_runs(self):
+        with self._makeOne() as db:
+            expected = bytes(db._mmap)
+        # Tiny memory budget: counters are merged from many runs
+        with self._makeOne(max_entries=3) as db:
+            self.assertEqual(bytes(db._mmap), expected)
+            self.assertEqual(len(db), (len(expected) - HEADER_SIZE) // RECORD_SIZE)
+
+    def test_illegal_games(self):
+        with PositionDatabaseBuilder(self.path) as builder:
+            counted = [
+                builder.add_pgn_game(pgn_game)
+                for pgn_game in read_games(io.StringIO(ILLEGAL + "\n" + PGN))
+            ]
+        self.assertEqual(counted, [False, False, True, True, True])
+        with PositionDatabase(self.path) as db:
+            # Nothing of the illegal games is counted
+            self.assertEqual(db.get(Game()), PositionStats(2, 1, 0, 0))
+
+    def test_max_ply(self):
+        with self._makeOne(max_ply=2) as db:
+            self.assertEqual(len(db), 5)
+
+    def test_add_game(self):
+        game = Game()
+        game.player_move("d2", "d4")
+        with PositionDatabaseBuilder(self.path) as builder:
+            builder.add_game(game, "0-1")
+        self.assertEqual(len(game.moves), 1)
+        with PositionDatabase(self.path) as db:
+            self.assertEqual(db.get(Game()), PositionStats(1, 0, 0, 1))
+            self.assertEqual(db.get(game), PositionStats(1, 0, 0, 1))
+
+    def test_pickle(self):
+        with self._makeOne() as db:
+            with pickle.loads(pickle.dumps(db)) as copy:
+                self.assertEqual(copy.get(Game()), db.get(Game()))
+
+    def test_invalid(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a database")
+        with pytest.raises(InvalidEncoding):
+            PositionDatabase(self.path)
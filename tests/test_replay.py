@@ -0,0 +1,51 @@
+from escacs.pgn import read_games
+from escacs.replay import main
+from escacs.replay import replay
+from escacs.replay import replay_game
+
+import io
+import os
+import tempfile
+import unittest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES, "games.pgn")) as f:
+    PGN = f.read()
+with open(os.path.join(FIXTURES, "illegal.pgn")) as f:
+    ILLEGAL = f.read()
+
+
+class TestReplay(unittest.TestCase):
+    def _makeOne(self, **kwargs):
+        return list(replay(io.StringIO((PGN + "\n" + ILLEGAL) * 3), **kwargs))
+
+    def test_replay_game(self):
+        (pgn_game,) = read_games(io.StringIO(PGN.split("\n\n[")[0]))
+        result = replay_game(pgn_game)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.moves, 45)
+        self.assertEqual(len(result.advantage), 45)
+        self.assertEqual(result.fen, pgn_game.game().fen())
+        # Black is queen and rook up when mated
+        self.assertLess(result.advantage[-1], 0)
+
+    def test_errors(self):
+        results = self._makeOne(workers=1)
+        self.assertEqual(results[3].error, "illegal move 2. Ke3")
+        self.assertEqual(results[3].moves, 2)
+        self.assertIn("InvalidFen", results[4].error)
+        self.assertEqual(sum(1 for r in results if r.error), 6)
+
+    def test_workers(self):
+        serial = self._makeOne(workers=1)
+        parallel = self._makeOne(workers=2, chunk_size=2)
+        self.assertEqual([r.number for r in parallel], list(range(1, 16)))
+        self.assertEqual(parallel, serial)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "games.pgn")
+            with open(path, "w") as stream:
+                stream.write(PGN)
+            self.assertEqual(main([path, "--workers", "1"]), 0)
@@ -0,0 +1,62 @@
+from escacs.game import Game
+from escacs.game import STARTING_FEN
+from escacs.search import analyse
+from escacs.search import EXACT
+from escacs.search import Limit
+from escacs.search import MATE_THRESHOLD
+from escacs.search import TranspositionTable
+
+import unittest
+
+
+class TestSearch(unittest.TestCase):
+    def _makeOne(self, fen: str, limit: Limit):
+        return analyse(Game.from_fen(fen), limit)
+
+    def test_mate_in_one(self):
+        result = self._makeOne("6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1", Limit(depth=3))
+        self.assertEqual(str(result.move), "a1a8")
+        self.assertGreaterEqual(result.score, MATE_THRESHOLD)
+
+    def test_takes_hanging_queen(self):
+        result = self._makeOne("4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1", Limit(depth=2))
+        self.assertEqual(str(result.move), "d2d5")
+
+    def test_limits(self):
+        fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+        result = self._makeOne(fen, Limit(nodes=2000))
+        self.assertIsNotNone(result.move)
+        self.assertEqual(result.nodes, 2000)
+        # Small node limits are honoured exactly too
+        result = self._makeOne(STARTING_FEN, Limit(nodes=100))
+        self.assertEqual(result.nodes, 100)
+        self.assertLess(result.depth, 3)
+        self.assertGreater(result.nps, 0)
+
+    def test_game_left_untouched(self):
+        game = Game()
+        key = game.zobrist_key
+        move = game.best_move(Limit(depth=2))
+        self.assertIn(move, game.legal_moves())
+        self.assertEqual(game.zobrist_key, key)
+        self.assertEqual(game.moves, [])
+
+    def test_no_legal_moves(self):
+        game = Game.from_fen("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+        self.assertIsNone(game.best_move(Limit(depth=2)))
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_replacement(self):
+        table = TranspositionTable(size=4)
+        self.assertEqual(len(table), 4)
+        table.store(1, 5, 10, EXACT, 0)
+        # Shallower entries of other positions do not replace deeper ones
+        table.store(5, 1, 20, EXACT, 0)
+        self.assertIsNone(table.get(5))
+        self.assertEqual(table.get(1)[2], 10)
+        # Unless they come from an older search
+        table.new_search()
+        table.store(5, 1, 20, EXACT, 0)
+        self.assertIsNone(table.get(1))
+        self.assertEqual(table.get(5)[2], 20)
@@ -0,0 +1,188 @@
+from escacs.game import STARTING_FEN
+from escacs.server import _serve
+from escacs.server import serve_tcp
+from escacs.server import Session
+from unittest import mock
+
+import asyncio
+import os
+import subprocess
+import sys
+import unittest
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestSession(unittest.TestCase):
+    def _makeOne(self):
+        return Session()
+
+    def _handle(self, session, *lines):
+        answers = []
+        for line in lines:
+            answers.extend(_run(session.handle(line)))
+        return answers
+
+    def test_handshake(self):
+        session = self._makeOne()
+        self.assertEqual(
+            self._handle(session, "uci", "isready", ""),
+            ["id name escacs", "uciok", "readyok"],
+        )
+
+    def test_moves(self):
+        session = self._makeOne()
+        self.assertEqual(
+            self._handle(session, "move e2e4", "move e5"), ["ok e2e4", "ok e7e5"]
+        )
+        self.assertEqual(
+            self._handle(session, "move e2e4", "move Ke3"),
+            ["error illegal move e2e4", "error illegal move Ke3"],
+        )
+        self.assertEqual(
+            session.game.fen().split()[:2],
+            ["rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR", "w"],
+        )
+        self.assertEqual(
+            self._handle(session, "move g1f3", "move Nc6"), ["ok g1f3", "ok b8c6"]
+        )
+
+    def test_result(self):
+        session = self._makeOne()
+        answers = self._handle(session, "move f3", "move e5", "move g4", "move Qh4#")
+        self.assertEqual(answers[-2:], ["ok d8h4", "result 0-1 checkmate"])
+        answers = self._handle(
+            session, "position fen k7/8/1K6/8/8/8/8/2Q5 w - - 0 1", "move c1c7"
+        )
+        self.assertEqual(answers, ["ok c1c7", "result 1/2-1/2 stalemate"])
+
+    def test_position(self):
+        session = self._makeOne()
+        self.assertEqual(
+            self._handle(session, "position startpos", "fen"), [f"fen {STARTING_FEN}"]
+        )
+        self._handle(session, "position startpos moves e2e4 c7c5 g1f3")
+        self.assertEqual(len(session.game.moves), 3)
+        self._handle(session, "position fen 4k3/8/8/8/8/8/4P3/4K3 w - - 0 1 moves e2e4")
+        self.assertEqual(session.game.fen(), "4k3/8/8/8/4P3/8/8/4K3 b - - 0 1")
+        self.assertEqual(
+            self._handle(session, "legal"), ["legal e8d7 e8e7 e8f7 e8d8 e8f8"]
+        )
+        # Errors leave the game as it was
+        self.assertEqual(
+            self._handle(
+                session,
+                "position startpos moves e2e4 e2e4",
+                "position fen 8/8 w",
+                "position nowhere",
+            ),
+            [
+                "error illegal move e2e4",
+                "error invalid fen 8/8 w",
+                "error invalid position nowhere",
+            ],
+        )
+        self.assertEqual(session.game.fen(), "4k3/8/8/8/4P3/8/8/4K3 b - - 0 1")
+        self._handle(session, "ucinewgame")
+        self.assertEqual(session.game.fen(), STARTING_FEN)
+
+    def test_go(self):
+        session = self._makeOne()
+        self._handle(session, "position fen k7/8/1K6/8/8/8/8/6Q1 w - - 0 1")
+        info, bestmove = self._handle(session, "go depth 2")
+        self.assertTrue(info.startswith("info depth "), info)
+        self.assertIn(" score mate 1 nodes ", info)
+        self.assertTrue(info.endswith(" pv g1g8"), info)
+        self.assertEqual(bestmove, "bestmove g1g8")
+        self.assertEqual(
+            self._handle(session, "go movetime x"), ["error invalid limit movetime x"]
+        )
+        self.assertEqual(
+            self._handle(session, "go ponder 1"), ["error invalid limit ponder 1"]
+        )
+        self._handle(session, "move g1g8")
+        self.assertEqual(self._handle(session, "go")[-1], "bestmove (none)")
+
+    def test_search_error(self):
+        session = self._makeOne()
+        with mock.patch("escacs.server._search", side_effect=RuntimeError("boom")):
+            self.assertEqual(
+                self._handle(session, "go depth 1"),
+                ["error search failed RuntimeError('boom')"],
+            )
+        self.assertEqual(self._handle(session, "isready"), ["readyok"])
+
+    def test_unknown(self):
+        session = self._makeOne()
+        self.assertEqual(
+            self._handle(session, "castle"), ["error unknown command castle"]
+        )
+        self._handle(session, "quit")
+        self.assertTrue(session.closed)
+
+
+class TestServeTcp(unittest.TestCase):
+    def test_concurrent_sessions(self):
+        async def client(port, moves):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            answers = []
+            for move in moves:
+                writer.write(f"move {move}\n".encode())
+                answers.append((await reader.readline()).decode().strip())
+            writer.write(b"fen\nquit\n")
+            answers.append((await reader.readline()).decode().strip())
+            writer.close()
+            return answers
+
+        async def main():
+            server = await serve_tcp("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await asyncio.gather(
+                    client(port, ["e4", "e5"]), client(port, ["d4", "d4"])
+                )
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        first, second = _run(main())
+        self.assertEqual(first[:2], ["ok e2e4", "ok e7e5"])
+        self.assertTrue(first[2].startswith("fen rnbqkbnr/pppp1ppp/8/4p3/4P3/"))
+        # Sessions do not share their games
+        self.assertEqual(second[:2], ["ok d2d4", "error illegal move d4"])
+        self.assertTrue(second[2].startswith("fen rnbqkbnr/pppppppp/8/8/3P4/8/"))
+
+
+class TestServe(unittest.TestCase):
+    def test_command_error(self):
+        lines = [b"move e4\n", b"isready\n", b""]
+        answers = []
+
+        async def readline():
+            return lines.pop(0)
+
+        async def write(output):
+            answers.extend(output)
+
+        with mock.patch("escacs.server._play", side_effect=RuntimeError("boom")):
+            _run(_serve(readline, write, None))
+        self.assertEqual(
+            answers, ["error move e4 failed RuntimeError('boom')", "readyok"]
+        )
+
+
+class TestServeStdio(unittest.TestCase):
+    def test_process(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-m", "escacs.server", "--stdio", "--workers", "1"],
+            input=b"uci\nposition startpos moves e2e4\nmove e5\ngo depth 1\nquit\n",
+            stdout=subprocess.PIPE,
+            cwd=root,
+            timeout=60,
+        ).stdout.decode()
+        lines = output.splitlines()
+        self.assertEqual(lines[:3], ["id name escacs", "uciok", "ok e7e5"])
+        self.assertTrue(lines[-1].startswith("bestmove "), output)
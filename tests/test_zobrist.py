@@ -0,0 +1,49 @@
+from escacs.game import Game
+from escacs.zobrist import game_key
+
+import unittest
+
+# Keys from the Polyglot book format specification
+POLYGLOT_KEYS = [
+    ([], 0x463B96181691FC9C),
+    (["e2e4"], 0x823C9B50FD114196),
+    (["e2e4", "d7d5"], 0x0756B94461C50FB0),
+    (["e2e4", "d7d5", "e4e5"], 0x662FAFB965DB29D4),
+    (["e2e4", "d7d5", "e4e5", "f7f5"], 0x22A48B5A8E47FF78),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2"], 0x652A607CA3F242C1),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2", "e8f7"], 0x00FDD303C946BDD9),
+    (["a2a4", "b7b5", "h2h4", "b5b4", "c2c4"], 0x3C8123EA7B067637),
+    (["a2a4", "b7b5", "h2h4", "b5b4", "c2c4", "b4c3", "a1a3"], 0x5C3F9B829B279560),
+]
+
+
+class TestZobristKey(unittest.TestCase):
+    def _makeOne(self, moves):
+        game = Game()
+        for move in moves:
+            game.player_move(move[:2], move[2:])
+        return game
+
+    def test_polyglot_keys(self):
+        for moves, key in POLYGLOT_KEYS:
+            game = self._makeOne(moves)
+            self.assertEqual(game.zobrist_key, key, moves)
+            self.assertEqual(game_key(game), key, moves)
+
+    def test_incremental_on_pop(self):
+        moves, key = POLYGLOT_KEYS[-1]
+        game = self._makeOne(moves)
+        while game.moves:
+            game.pop()
+        self.assertEqual(game.zobrist_key, POLYGLOT_KEYS[0][1])
+
+    def test_from_fen(self):
+        game = Game.from_fen(
+            "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPPKPPP/RNBQ1BNR b kq - 0 3"
+        )
+        self.assertEqual(game.zobrist_key, 0x652A607CA3F242C1)
+        # The en passant square only counts when it can be captured
+        game = Game.from_fen(
+            "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+        )
+        self.assertEqual(game.zobrist_key, 0x823C9B50FD114196)